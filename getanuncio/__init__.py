@@ -0,0 +1 @@
+"""Núcleo sem interface do sistema de cadastro de cartuchos (Color Jet ADS)"""
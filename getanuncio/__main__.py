@@ -0,0 +1,6 @@
+"""`python -m getanuncio`: linha de comando do catálogo (ver `getanuncio.cli`)"""
+import sys
+
+from getanuncio.cli import main
+
+sys.exit(main())
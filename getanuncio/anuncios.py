@@ -0,0 +1,365 @@
+"""Geração de anúncios a partir do catálogo
+
+Cada combinação cartucho × capacidade × impressora compatível vira um
+anúncio com título, descrição, SKU e atributos montados por modelos de texto
+configuráveis (`{campo}` no estilo `str.format`). Os modelos são compilados
+uma vez em listas de (texto fixo, campo) e aplicados a colunas inteiras de
+um DataFrame por lote. O catálogo é percorrido em streaming, em faixas de
+ids de cartuchos com cerca de `lote` anúncios cada; com `processos > 1` as
+faixas são distribuídas entre processos, cada um com sua conexão somente
+leitura, mantendo poucas faixas em andamento para limitar a memória.
+
+Também pode ser usado pela linha de comando:
+
+    python -m getanuncio.anuncios anuncios.csv.gz --db cartuchos.db --processos 4
+"""
+import argparse
+import copy
+import gzip
+import json
+import multiprocessing
+import os
+import sqlite3
+import string
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+TAMANHO_LOTE_PADRAO = 50_000  # anúncios por faixa
+
+# Campos disponíveis nos modelos
+CAMPOS = (
+    "cartucho_id", "modelo_cartucho", "codigo_referencia", "cor", "codigo_hex",
+    "capacidade_ml", "modelo_impressora_id", "modelo_impressora", "fabricante",
+)
+
+MODELOS_PADRAO = {
+    "titulo": "Cartucho {modelo_cartucho} {cor} {capacidade_ml}ml para {fabricante} {modelo_impressora}",
+    "descricao": (
+        "Cartucho de tinta {cor} com {capacidade_ml}ml, modelo {modelo_cartucho} "
+        "(referência {codigo_referencia}). Compatível com a impressora {fabricante} {modelo_impressora}."
+    ),
+    "sku": "{codigo_referencia}-{capacidade_ml}ML-{modelo_impressora_id}-{cartucho_id}",
+    "atributos": {
+        "marca": "{fabricante}",
+        "cor": "{cor}",
+        "volume": "{capacidade_ml} ml",
+        "modelo": "{modelo_cartucho}",
+        "impressora_compativel": "{fabricante} {modelo_impressora}",
+    },
+}
+
+FORMATOS_SAIDA = ("csv", "jsonl")
+
+# Uma linha por cartucho × capacidade × impressora compatível
+SQL_BASE_ANUNCIOS = """
+    SELECT
+        c.id as cartucho_id,
+        c.modelo_cartucho,
+        coalesce(c.codigo_referencia, '') as codigo_referencia,
+        coalesce(cr.nome, '') as cor,
+        coalesce(cr.codigo_hex, '') as codigo_hex,
+        cap.capacidade_ml,
+        mi.id as modelo_impressora_id,
+        mi.nome as modelo_impressora,
+        coalesce(f.nome, '') as fabricante
+    FROM cartuchos c
+    JOIN cartucho_capacidades cc ON cc.cartucho_id = c.id
+    JOIN capacidades cap ON cap.id = cc.capacidade_id
+    JOIN cartucho_impressoras ci ON ci.cartucho_id = c.id
+    JOIN modelos_impressora mi ON mi.id = ci.modelo_impressora_id
+    LEFT JOIN cores_referencia cr ON c.cor_id = cr.id
+    LEFT JOIN fabricantes f ON mi.fabricante_id = f.id
+"""
+SQL_FAIXA_ANUNCIOS = (
+    SQL_BASE_ANUNCIOS + " WHERE c.id BETWEEN ? AND ? ORDER BY c.id, cap.capacidade_ml, mi.id"
+)
+SQL_PREVIA_ANUNCIOS = SQL_BASE_ANUNCIOS + " ORDER BY c.id, cap.capacidade_ml, mi.id LIMIT ?"
+
+# Anúncios de cada cartucho (capacidades × impressoras), pelas PKs das associações
+SQL_ANUNCIOS_POR_CARTUCHO = """
+    SELECT c.id,
+           (SELECT COUNT(*) FROM cartucho_capacidades WHERE cartucho_id = c.id)
+         * (SELECT COUNT(*) FROM cartucho_impressoras WHERE cartucho_id = c.id) as anuncios
+    FROM cartuchos c
+"""
+SQL_FAIXAS_ANUNCIOS = SQL_ANUNCIOS_POR_CARTUCHO + " ORDER BY c.id"
+SQL_CONTAR_ANUNCIOS = f"SELECT coalesce(SUM(anuncios), 0) FROM ({SQL_ANUNCIOS_POR_CARTUCHO})"
+
+ResultadoAnuncios = namedtuple(
+    "ResultadoAnuncios", ["caminho", "formato", "total", "tamanho_bytes", "duracao"]
+)
+
+
+class ErroModelo(ValueError):
+    """Modelo de texto inválido (sintaxe ou campo inexistente)"""
+
+
+class ModeloTexto:
+    """Modelo `{campo}` compilado uma vez e aplicado a colunas inteiras"""
+
+    __slots__ = ("texto", "partes")
+
+    def __init__(self, texto):
+        self.texto = texto
+        self.partes = []  # (texto fixo, campo ou None)
+        try:
+            analisado = list(string.Formatter().parse(texto))
+        except ValueError as e:
+            raise ErroModelo(f"Modelo inválido '{texto}': {e}") from None
+        for literal, campo, especificacao, conversao in analisado:
+            if campo is not None:
+                if campo not in CAMPOS:
+                    raise ErroModelo(f"Campo desconhecido {{{campo}}} em '{texto}'. Disponíveis: {', '.join(CAMPOS)}")
+                if especificacao or conversao:
+                    raise ErroModelo(f"Formatação não suportada em {{{campo}}}: use só {{{campo}}}")
+            self.partes.append((literal, campo))
+
+    def aplicar(self, colunas, n):
+        """Monta o texto das `n` linhas; `colunas` é campo -> Series de str"""
+        resultado = None
+        for literal, campo in self.partes:
+            if literal:
+                resultado = literal if resultado is None else resultado + literal
+            if campo is not None:
+                resultado = colunas[campo] if resultado is None else resultado + colunas[campo]
+        if resultado is None or isinstance(resultado, str):
+            # Modelo sem campos: o mesmo texto em todas as linhas
+            return pd.Series([resultado or ""] * n, dtype=str)
+        return resultado
+
+
+class ModelosCompilados:
+    """Título, descrição, SKU e atributos compilados"""
+
+    def __init__(self, modelos=None):
+        modelos = mesclar_modelos(modelos)
+        self.titulo = ModeloTexto(modelos["titulo"])
+        self.descricao = ModeloTexto(modelos["descricao"])
+        self.sku = ModeloTexto(modelos["sku"])
+        self.atributos = {nome: ModeloTexto(texto) for nome, texto in modelos["atributos"].items()}
+        self.campos = sorted({
+            campo
+            for modelo in (self.titulo, self.descricao, self.sku, *self.atributos.values())
+            for _, campo in modelo.partes if campo is not None
+        })
+
+    def renderizar(self, base):
+        """DataFrame de anúncios a partir do DataFrame base (colunas de CAMPOS)"""
+        n = len(base)
+        # Só os campos usados são convertidos para texto, uma vez por lote
+        colunas = {campo: base[campo].astype(str) for campo in self.campos}
+        anuncios = pd.DataFrame({
+            "sku": (self.sku.aplicar(colunas, n).str.upper()
+                    .str.replace(r"[^0-9A-Z]+", "-", regex=True).str.strip("-")),
+            "titulo": _limpar_espacos(self.titulo.aplicar(colunas, n)),
+            "descricao": _limpar_espacos(self.descricao.aplicar(colunas, n)),
+            "cartucho_id": base["cartucho_id"],
+            "capacidade_ml": base["capacidade_ml"],
+            "modelo_impressora_id": base["modelo_impressora_id"],
+        })
+        for nome, modelo in self.atributos.items():
+            anuncios[f"atributo_{nome}"] = _limpar_espacos(modelo.aplicar(colunas, n))
+        return anuncios
+
+
+def _limpar_espacos(serie):
+    # Campos vazios deixam espaços duplos no texto montado
+    return serie.str.replace(r"\s{2,}", " ", regex=True).str.strip()
+
+
+def mesclar_modelos(modelos=None):
+    """Modelos padrão sobrepostos pelos informados (atributos: o informado substitui)"""
+    resultado = copy.deepcopy(MODELOS_PADRAO)
+    for chave, valor in (modelos or {}).items():
+        if chave not in resultado:
+            raise ErroModelo(f"Chave de modelo desconhecida: {chave}")
+        resultado[chave] = dict(valor) if chave == "atributos" else valor
+    return resultado
+
+
+def carregar_modelos(caminho):
+    """Lê os modelos de um arquivo JSON ({"titulo": ..., "atributos": {...}})"""
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _base(cursor):
+    return pd.DataFrame(cursor.fetchall(), columns=[d[0] for d in cursor.description])
+
+
+def _faixas_cartuchos(conn, lote):
+    # (primeiro id, último id) de blocos de cartuchos com cerca de `lote`
+    # anúncios: um cartucho com muitas impressoras não estoura a memória
+    primeiro = ultimo = None
+    acumulado = 0
+    for cartucho_id, anuncios in conn.execute(SQL_FAIXAS_ANUNCIOS):
+        if not anuncios:
+            continue
+        if primeiro is not None and acumulado + anuncios > lote:
+            yield primeiro, ultimo
+            primeiro, acumulado = None, 0
+        if primeiro is None:
+            primeiro = cartucho_id
+        ultimo = cartucho_id
+        acumulado += anuncios
+    if primeiro is not None:
+        yield primeiro, ultimo
+
+
+# Estado de cada processo de trabalho: conexão e modelos compilados uma vez
+_trabalhador = {}
+
+
+def _iniciar_trabalhador(db_path, modelos):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.execute("PRAGMA query_only=ON")
+    _trabalhador["conn"] = conn
+    _trabalhador["modelos"] = ModelosCompilados(modelos)
+
+
+def _gerar_faixa(faixa):
+    conn = _trabalhador["conn"]
+    return _trabalhador["modelos"].renderizar(_base(conn.execute(SQL_FAIXA_ANUNCIOS, faixa)))
+
+
+def gerar_anuncios(gerenciador, modelos=None, lote=TAMANHO_LOTE_PADRAO, processos=1):
+    """Gera os anúncios do catálogo inteiro como DataFrames, um por faixa de cartuchos
+
+    Com `processos > 1` as faixas são renderizadas em paralelo; os lotes
+    saem sempre na ordem dos ids.
+    """
+    compilados = ModelosCompilados(modelos)  # valida antes de começar
+    with gerenciador.leitura() as conn:
+        faixas = list(_faixas_cartuchos(conn, lote))
+
+    if processos <= 1 or len(faixas) <= 1:
+        for faixa in faixas:
+            with gerenciador.leitura() as conn:
+                base = _base(conn.execute(SQL_FAIXA_ANUNCIOS, faixa))
+            yield compilados.renderizar(base)
+        return
+
+    # spawn: o processo pai pode ter threads (servidor do Streamlit, pool de conexões)
+    with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_iniciar_trabalhador,
+                             initargs=(gerenciador.db_path, modelos)) as executor:
+        # Poucas faixas em andamento: memória limitada mesmo com saída lenta
+        pendentes = deque()
+        faixas = iter(faixas)
+        for faixa in faixas:
+            pendentes.append(executor.submit(_gerar_faixa, faixa))
+            if len(pendentes) >= 2 * processos:
+                break
+        while pendentes:
+            anuncios = pendentes.popleft().result()
+            faixa = next(faixas, None)
+            if faixa is not None:
+                pendentes.append(executor.submit(_gerar_faixa, faixa))
+            yield anuncios
+
+
+def previa_anuncios(gerenciador, modelos=None, limite=20):
+    """Os primeiros `limite` anúncios, para conferir os modelos"""
+    with gerenciador.leitura() as conn:
+        base = _base(conn.execute(SQL_PREVIA_ANUNCIOS, (limite,)))
+    return ModelosCompilados(modelos).renderizar(base)
+
+
+def contar_anuncios(gerenciador):
+    """Quantos anúncios o catálogo gera"""
+    with gerenciador.leitura() as conn:
+        return conn.execute(SQL_CONTAR_ANUNCIOS).fetchone()[0]
+
+
+def formato_da_saida(caminho):
+    """('csv' ou 'jsonl', compactado?) pela extensão do arquivo"""
+    nome = caminho.lower()
+    compactado = nome.endswith(".gz")
+    if compactado:
+        nome = nome[:-3]
+    extensao = os.path.splitext(nome)[1].lstrip(".")
+    if extensao not in FORMATOS_SAIDA:
+        raise ValueError(f"Extensão não suportada: {caminho} (use .csv, .jsonl, .csv.gz ou .jsonl.gz)")
+    return extensao, compactado
+
+
+def exportar_anuncios(gerenciador, destino, modelos=None, lote=TAMANHO_LOTE_PADRAO, processos=1,
+                      progresso=None):
+    """Grava todos os anúncios em `destino` (.csv/.jsonl, opcionalmente .gz)
+
+    `progresso(total_ate_agora)` é chamado a cada lote gravado, se informado.
+    """
+    inicio = time.perf_counter()
+    formato, compactado = formato_da_saida(destino)
+    diretorio = os.path.dirname(os.path.abspath(destino))
+    os.makedirs(diretorio, exist_ok=True)
+    parcial = destino + ".parcial"
+
+    total = 0
+    if compactado:
+        abrir = lambda caminho: gzip.open(caminho, "wt", encoding="utf-8", newline="", compresslevel=6)
+    else:
+        abrir = lambda caminho: open(caminho, "w", encoding="utf-8", newline="")
+    try:
+        with abrir(parcial) as saida:
+            for anuncios in gerar_anuncios(gerenciador, modelos, lote=lote, processos=processos):
+                if formato == "csv":
+                    anuncios.to_csv(saida, index=False, header=(total == 0))
+                else:
+                    anuncios.to_json(saida, orient="records", lines=True, force_ascii=False)
+                total += len(anuncios)
+                if progresso is not None:
+                    progresso(total)
+        os.replace(parcial, destino)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+
+    return ResultadoAnuncios(destino, formato, total, os.path.getsize(destino),
+                             time.perf_counter() - inicio)
+
+
+def main(argv=None, prog=None):
+    """Ponto de entrada da linha de comando"""
+    from getanuncio.conexao import GerenciadorConexoes
+    from getanuncio.migracoes import migrar
+
+    parser = argparse.ArgumentParser(prog=prog, description="Gera os anúncios do catálogo de cartuchos")
+    parser.add_argument("saida", help="arquivo .csv, .jsonl, .csv.gz ou .jsonl.gz")
+    parser.add_argument("--db", default="cartuchos.db", help="arquivo do banco SQLite")
+    parser.add_argument("--modelos", help="JSON com os modelos de título, descrição, SKU e atributos")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE_PADRAO, help="anúncios por lote")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1, help="processos em paralelo")
+    args = parser.parse_args(argv)
+
+    def mostrar(total):
+        duracao = time.perf_counter() - inicio
+        print(f"\r{total} anúncios | {total / duracao if duracao else 0:,.0f} anúncios/s",
+              end="", file=sys.stderr, flush=True)
+
+    inicio = time.perf_counter()
+    gerenciador = GerenciadorConexoes(args.db, ao_abrir_escritor=migrar)
+    try:
+        modelos = carregar_modelos(args.modelos) if args.modelos else None
+        resultado = exportar_anuncios(gerenciador, args.saida, modelos, lote=args.lote,
+                                      processos=args.processos, progresso=mostrar)
+    except (ErroModelo, ValueError, OSError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+    finally:
+        gerenciador.fechar()
+    print(file=sys.stderr)
+
+    print(f"{resultado.total} anúncios em {resultado.duracao:.2f}s "
+          f"({resultado.total / resultado.duracao if resultado.duracao else 0:,.0f} anúncios/s, "
+          f"{resultado.tamanho_bytes / 1024 / 1024:.1f} MB): {resultado.caminho}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Backup do banco de dados sem carregar tabelas inteiras na memória
+
+Dois formatos:
+
+- snapshot binário (.db) pela API de backup online do SQLite, copiado em
+  passos de algumas páginas, sem bloquear quem está escrevendo (WAL);
+- dump SQL compactado (.sql.gz) no formato do `iterdump`, gravado em blocos
+  direto num arquivo gzip, dentro de uma única transação de leitura para que
+  todas as tabelas saiam do mesmo instante.
+"""
+import gzip
+import os
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from getanuncio.migracoes import objetos_derivados, versao_atual
+
+FORMATO_SQL_GZ = "sql.gz"
+FORMATO_BINARIO = "db"
+
+PAGINAS_POR_PASSO = 1024
+LINHAS_POR_BLOCO = 2000
+
+ResultadoBackup = namedtuple(
+    "ResultadoBackup", ["caminho", "formato", "tamanho_bytes", "duracao"]
+)
+
+
+def nome_arquivo_backup(formato, momento=None):
+    """backup_cartuchos_AAAAMMDD_HHMMSS.<formato>"""
+    momento = momento or datetime.now()
+    return f"backup_cartuchos_{momento.strftime('%Y%m%d_%H%M%S')}.{formato}"
+
+
+def _substituir_atomicamente(destino, gravar):
+    # Grava num temporário no mesmo diretório e só então renomeia,
+    # para nunca deixar um backup pela metade com o nome final
+    diretorio = os.path.dirname(os.path.abspath(destino))
+    os.makedirs(diretorio, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=diretorio, suffix=".parcial")
+    os.close(fd)
+    try:
+        gravar(temporario)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def backup_binario(gerenciador, destino, paginas_por_passo=PAGINAS_POR_PASSO, progresso=None):
+    """Copia o banco página a página para `destino` (arquivo .db)
+
+    `progresso(restantes, total)` é chamado a cada passo, se informado.
+    """
+    inicio = time.perf_counter()
+
+    def gravar(temporario):
+        alvo = sqlite3.connect(temporario)
+        try:
+            with gerenciador.leitura() as conn:
+                conn.backup(alvo, pages=paginas_por_passo, sleep=0,
+                            progress=(lambda status, restantes, total: progresso(restantes, total))
+                            if progresso else None)
+        finally:
+            alvo.close()
+
+    _substituir_atomicamente(destino, gravar)
+    return ResultadoBackup(destino, FORMATO_BINARIO, os.path.getsize(destino),
+                           time.perf_counter() - inicio)
+
+
+def dump_sql_gzip(gerenciador, destino, db_path=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Gera um dump SQL compactado com gzip em `destino` (arquivo .sql.gz)"""
+    inicio = time.perf_counter()
+    cabecalho = (
+        "-- Backup do Sistema de Cartuchos\n"
+        f"-- Banco: {db_path or gerenciador.db_path}\n"
+        f"-- Data: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n\n"
+    )
+
+    def gravar(temporario):
+        with gerenciador.leitura() as conn, \
+                gzip.open(temporario, "wt", encoding="utf-8", compresslevel=6) as saida:
+            saida.write(cabecalho)
+            # Transação de leitura: snapshot consistente sem bloquear escritas (WAL)
+            conn.execute("BEGIN")
+            try:
+                # Versão do esquema: a restauração aplica só as migrações seguintes
+                saida.write(f"PRAGMA user_version={versao_atual(conn)};\n")
+                bloco = []
+                for comando in _comandos_dump(conn, objetos_derivados(conn)):
+                    bloco.append(comando)
+                    if len(bloco) >= linhas_por_bloco:
+                        saida.write("\n".join(bloco))
+                        saida.write("\n")
+                        bloco.clear()
+                if bloco:
+                    saida.write("\n".join(bloco))
+                    saida.write("\n")
+            finally:
+                conn.rollback()
+
+    _substituir_atomicamente(destino, gravar)
+    return ResultadoBackup(destino, FORMATO_SQL_GZ, os.path.getsize(destino),
+                           time.perf_counter() - inicio)
+
+
+def _comandos_dump(conn, excluidos):
+    """Mesma saída de `conn.iterdump()`, sem ler as tabelas em `excluidos`
+
+    O índice FTS5 (tabela virtual, tabelas-sombra e triggers) é reconstruído
+    pelas migrações na restauração; percorrê-lo dobraria o tempo do dump.
+    """
+    yield "BEGIN TRANSACTION;"
+    sequencias = []
+    tabelas = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE sql NOT NULL AND type = 'table' ORDER BY name"
+    ).fetchall()
+    for tabela, sql in tabelas:
+        if tabela in excluidos:
+            continue
+        if tabela == "sqlite_sequence":
+            sequencias = ['DELETE FROM "sqlite_sequence";'] + [
+                f"INSERT INTO \"sqlite_sequence\" VALUES('{nome}',{valor});"
+                for nome, valor in conn.execute('SELECT * FROM "sqlite_sequence"')
+            ]
+            continue
+        if tabela == "sqlite_stat1":
+            yield 'ANALYZE "sqlite_master";'
+        elif tabela.startswith("sqlite_"):
+            continue
+        else:
+            yield f"{sql};"
+
+        identificador = tabela.replace('"', '""')
+        colunas = [linha[1] for linha in conn.execute(f'PRAGMA table_info("{identificador}")')]
+        valores = ",".join("'||quote(\"{0}\")||'".format(c.replace('"', '""')) for c in colunas)
+        consulta = f"""SELECT 'INSERT INTO "{identificador}" VALUES({valores})' FROM "{identificador}" """
+        for (comando,) in conn.execute(consulta):
+            yield f"{comando};"
+
+    for nome, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE sql NOT NULL AND type IN ('index', 'trigger', 'view')"
+    ).fetchall():
+        if nome not in excluidos:
+            yield f"{sql};"
+
+    yield from sequencias
+    yield "COMMIT;"
+
+
+def gerar_backup(gerenciador, diretorio, formato=FORMATO_SQL_GZ):
+    """Gera um backup no formato pedido dentro de `diretorio`"""
+    destino = os.path.join(diretorio, nome_arquivo_backup(formato))
+    if formato == FORMATO_BINARIO:
+        return backup_binario(gerenciador, destino)
+    if formato == FORMATO_SQL_GZ:
+        return dump_sql_gzip(gerenciador, destino)
+    raise ValueError(f"Formato de backup desconhecido: {formato}")
+
+
+def previa_backup(caminho, limite_bytes=20_000):
+    """Primeiros `limite_bytes` do dump SQL (descompactado), para visualização
+
+    Retorna (texto, truncado).
+    """
+    abrir = gzip.open if caminho.endswith(".gz") else open
+    with abrir(caminho, "rb") as f:
+        dados = f.read(limite_bytes + 1)
+    truncado = len(dados) > limite_bytes
+    return dados[:limite_bytes].decode("utf-8", errors="replace"), truncado
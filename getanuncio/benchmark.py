@@ -0,0 +1,349 @@
+"""Benchmark dos caminhos de consulta do app sobre catálogos sintéticos
+
+Para cada tamanho de catálogo um banco é gerado por `getanuncio.sintetico`
+(e reaproveitado nas execuções seguintes com a mesma semente) e cada
+cenário roda as mesmas funções que as páginas usam: as contagens e
+agregados do Dashboard, as listagens dos Cadastros, as combinações de
+filtros da página de Consultas (página, contagem e facetas, sem os caches),
+a busca textual, a exportação CSV e os dois formatos de backup.
+
+Cada cenário roda uma vez para aquecer e depois até `repeticoes` vezes (ou
+até esgotar `tempo_maximo` segundos); o relatório JSON traz p50/p95 por
+cenário e o pico de memória (RSS) do processo ao fim de cada um — o pico só
+cresce, então o cenário que o aumenta é o que mais aloca. Comparar com um
+relatório anterior aponta os cenários cujo p95 piorou além da tolerância:
+
+    python -m getanuncio.benchmark --tamanhos 1000 100000 --saida atual.json --comparar base.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from getanuncio.backup import FORMATO_BINARIO, FORMATO_SQL_GZ, gerar_backup
+from getanuncio.busca import buscar_cartuchos
+from getanuncio.conexao import GerenciadorConexoes
+from getanuncio.consultas import montar_contagem_cartuchos, montar_facetas_cartuchos, montar_filtro_cartuchos
+from getanuncio.instrumentacao import percentil
+from getanuncio.paginacao import buscar_pagina
+from getanuncio.referencias import CacheReferencias
+from getanuncio.repositorio import Repositorio
+from getanuncio.sintetico import SEMENTE_PADRAO, gerar_catalogo
+
+TAMANHOS_PADRAO = (1_000, 100_000, 1_000_000)
+REPETICOES_PADRAO = 20
+TEMPO_MAXIMO_PADRAO = 10.0
+TAMANHO_PAGINA = 50
+TEXTO_BUSCA = "black epson"
+# Um cenário regrediu se o p95 piorou mais que a tolerância e mais que este tanto
+TOLERANCIA_PADRAO = 0.25
+DIFERENCA_MINIMA_MS = 1.0
+
+# Filtros da página de Consultas: nome -> campos usados
+COMBINACOES_FILTROS = {
+    "sem_filtro": (),
+    "cor": ("cor",),
+    "fabricante": ("fabricante",),
+    "capacidade": ("capacidade_ml",),
+    "impressora": ("modelo_impressora_id",),
+    "cor_fabricante": ("cor", "fabricante"),
+    "cor_capacidade": ("cor", "capacidade_ml"),
+    "fabricante_capacidade": ("fabricante", "capacidade_ml"),
+    "cor_fabricante_capacidade": ("cor", "fabricante", "capacidade_ml"),
+    "todos": ("cor", "fabricante", "capacidade_ml", "modelo_impressora_id"),
+}
+
+
+def rss_pico_kb():
+    """Pico de memória residente do processo até agora, em KB (None se indisponível)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS, em bytes
+    return pico // 1024 if sys.platform == "darwin" else pico
+
+
+def _valores_filtros(conn):
+    """Valores reais para os filtros: a cor, o fabricante e a impressora mais frequentes"""
+    cor = conn.execute(
+        "SELECT cr.nome FROM cartuchos c JOIN cores_referencia cr ON cr.id = c.cor_id "
+        "GROUP BY cr.nome ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()
+    fabricante = conn.execute(
+        "SELECT f.nome FROM cartucho_impressoras ci JOIN modelos_impressora mi ON mi.id = ci.modelo_impressora_id "
+        "JOIN fabricantes f ON f.id = mi.fabricante_id GROUP BY f.nome ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()
+    capacidade = conn.execute(
+        "SELECT cap.capacidade_ml FROM cartucho_capacidades cc JOIN capacidades cap ON cap.id = cc.capacidade_id "
+        "GROUP BY cap.capacidade_ml ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()
+    impressora = conn.execute(
+        "SELECT modelo_impressora_id FROM cartucho_impressoras GROUP BY modelo_impressora_id "
+        "ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()
+    return {
+        "cor": cor and cor[0],
+        "fabricante": fabricante and fabricante[0],
+        "capacidade_ml": capacidade and capacidade[0],
+        "modelo_impressora_id": impressora and impressora[0],
+    }
+
+
+def _ler(gerenciador, funcao, *args, **kwargs):
+    with gerenciador.leitura() as conn:
+        return funcao(conn, *args, **kwargs)
+
+
+def _contar(conn, sql, params):
+    return conn.execute(sql, params).fetchone()[0]
+
+
+def _todas(conn, sql, params):
+    return conn.execute(sql, params).fetchall()
+
+
+def _exportar_csv(repositorio, destino):
+    # Mesmo caminho do botão "Preparar exportação CSV" da página de Consultas
+    sql, params = montar_filtro_cartuchos()
+    quadro = repositorio.tabela(sql, params or None).to_pandas()
+    quadro.to_csv(destino, index=False)
+    return len(quadro)
+
+
+def _backup(gerenciador, diretorio, formato):
+    resultado = gerar_backup(gerenciador, diretorio, formato)
+    os.remove(resultado.caminho)
+    return resultado.tamanho_bytes
+
+
+def cenarios(gerenciador, diretorio_temporario):
+    """Cenários do benchmark: lista de (nome, função sem argumentos que devolve linhas ou bytes)"""
+    repositorio = Repositorio(gerenciador)
+    valores = _ler(gerenciador, _valores_filtros)
+    primeira = _ler(gerenciador, buscar_pagina, "modelo_asc", TAMANHO_PAGINA)
+
+    lista = [
+        ("dashboard.contar_cartuchos", repositorio.contar_cartuchos),
+        ("dashboard.contar_compatibilidades", repositorio.contar_compatibilidades),
+        ("dashboard.cartuchos_por_cor", repositorio.cartuchos_por_cor),
+        ("dashboard.cartuchos_por_impressora", lambda: repositorio.cartuchos_por_impressora(10)),
+        ("dashboard.referencias", lambda: len(CacheReferencias(gerenciador).obter().modelos)),
+        ("cadastros.fabricantes", repositorio.fabricantes),
+        ("cadastros.modelos", repositorio.modelos),
+        ("cadastros.cores", repositorio.cores),
+        ("cadastros.capacidades", repositorio.capacidades),
+        ("cadastros.cartuchos.primeira_pagina",
+         lambda: _ler(gerenciador, buscar_pagina, "modelo_asc", TAMANHO_PAGINA).linhas),
+        ("cadastros.cartuchos.pagina_seguinte",
+         lambda: _ler(gerenciador, buscar_pagina, "modelo_asc", TAMANHO_PAGINA, apos=primeira.ultima).linhas),
+        ("cadastros.cartuchos.ultima_pagina",
+         lambda: _ler(gerenciador, buscar_pagina, "modelo_asc", TAMANHO_PAGINA, do_fim=True).linhas),
+        ("cadastros.cartuchos.recentes",
+         lambda: _ler(gerenciador, buscar_pagina, "recentes", TAMANHO_PAGINA).linhas),
+    ]
+
+    for nome, campos in COMBINACOES_FILTROS.items():
+        filtros = {campo: valores[campo] for campo in campos}
+        lista += [
+            (f"consultas.{nome}.pagina",
+             lambda filtros=filtros: _ler(gerenciador, buscar_pagina, "modelo_asc", TAMANHO_PAGINA, **filtros).linhas),
+            (f"consultas.{nome}.contagem",
+             lambda filtros=filtros: _ler(gerenciador, _contar, *montar_contagem_cartuchos(**filtros))),
+            (f"consultas.{nome}.facetas",
+             lambda filtros=filtros: _ler(gerenciador, _todas, *montar_facetas_cartuchos(**filtros))),
+        ]
+
+    lista += [
+        ("consultas.busca_textual", lambda: _ler(gerenciador, buscar_cartuchos, TEXTO_BUSCA)[1]),
+        ("exportacao.csv",
+         lambda: _exportar_csv(repositorio, os.path.join(diretorio_temporario, "cartuchos_filtrados.csv"))),
+        ("backup.sql_gz", lambda: _backup(gerenciador, diretorio_temporario, FORMATO_SQL_GZ)),
+        ("backup.db", lambda: _backup(gerenciador, diretorio_temporario, FORMATO_BINARIO)),
+    ]
+    return lista
+
+
+def _tamanho(resultado):
+    if isinstance(resultado, int):
+        return resultado
+    try:
+        return len(resultado)
+    except TypeError:
+        return None
+
+
+def medir(funcao, repeticoes=REPETICOES_PADRAO, tempo_maximo=TEMPO_MAXIMO_PADRAO):
+    """Roda `funcao` uma vez para aquecer e depois até `repeticoes` vezes; retorna o resumo"""
+    inicio_total = time.perf_counter()
+    linhas = _tamanho(funcao())
+    duracoes = []
+    prazo = time.perf_counter() + tempo_maximo
+    while len(duracoes) < repeticoes and (not duracoes or time.perf_counter() < prazo):
+        inicio = time.perf_counter()
+        funcao()
+        duracoes.append((time.perf_counter() - inicio) * 1000)
+    duracoes.sort()
+    return {
+        "amostras": len(duracoes),
+        "linhas": linhas,
+        "p50_ms": round(percentil(duracoes, 50), 3),
+        "p95_ms": round(percentil(duracoes, 95), 3),
+        "media_ms": round(sum(duracoes) / len(duracoes), 3),
+        "maximo_ms": round(duracoes[-1], 3),
+        "total_s": round(time.perf_counter() - inicio_total, 3),
+        "rss_pico_kb": rss_pico_kb(),
+    }
+
+
+def preparar_banco(diretorio, cartuchos, semente=SEMENTE_PADRAO, progresso=None):
+    """Caminho do banco sintético com `cartuchos` cartuchos, gerando-o se ainda não existir
+
+    Retorna (caminho, duração da geração ou None se reaproveitado).
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, f"sintetico_{cartuchos}_s{semente}.db")
+    if os.path.exists(caminho):
+        return caminho, None
+    return caminho, gerar_catalogo(caminho, cartuchos, semente, progresso=progresso).duracao
+
+
+def executar(tamanhos=TAMANHOS_PADRAO, diretorio="benchmarks", semente=SEMENTE_PADRAO,
+             repeticoes=REPETICOES_PADRAO, tempo_maximo=TEMPO_MAXIMO_PADRAO, filtro=None, progresso=None):
+    """Roda todos os cenários em cada tamanho; retorna o relatório (dicionário serializável em JSON)
+
+    `filtro`, se informado, restringe aos cenários cujo nome contém o texto.
+    `progresso(cartuchos, nome, resumo)` é chamado depois de cada cenário.
+    """
+    relatorio = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "semente": semente,
+        "repeticoes": repeticoes,
+        "tempo_maximo_s": tempo_maximo,
+        "tamanhos": [],
+    }
+    for cartuchos in tamanhos:
+        caminho, geracao = preparar_banco(diretorio, cartuchos, semente)
+        resultado_tamanho = {
+            "cartuchos": cartuchos,
+            "banco": caminho,
+            "tamanho_bytes": os.path.getsize(caminho),
+            "geracao_s": None if geracao is None else round(geracao, 3),
+            "cenarios": {},
+        }
+        gerenciador = GerenciadorConexoes(caminho)
+        temporario = tempfile.mkdtemp(prefix="benchmark_")
+        try:
+            for nome, funcao in cenarios(gerenciador, temporario):
+                if filtro and filtro not in nome:
+                    continue
+                try:
+                    resumo = medir(funcao, repeticoes, tempo_maximo)
+                except Exception as e:
+                    # Um cenário quebrado (ex.: sem pandas/pyarrow) não impede os demais
+                    resumo = {"erro": f"{type(e).__name__}: {e}"}
+                resultado_tamanho["cenarios"][nome] = resumo
+                if progresso is not None:
+                    progresso(cartuchos, nome, resumo)
+        finally:
+            gerenciador.fechar()
+            shutil.rmtree(temporario, ignore_errors=True)
+        relatorio["tamanhos"].append(resultado_tamanho)
+    relatorio["rss_pico_kb"] = rss_pico_kb()
+    return relatorio
+
+
+def comparar(atual, base, tolerancia=TOLERANCIA_PADRAO, diferenca_minima_ms=DIFERENCA_MINIMA_MS):
+    """Cenários cujo p95 piorou: lista de (cartuchos, cenário, p95 base, p95 atual)
+
+    Conta como regressão o p95 acima de `base * (1 + tolerancia)` e pelo menos
+    `diferenca_minima_ms` mais lento. Cenários com erro agora (e sem erro na
+    base) também entram, com p95 atual None.
+    """
+    base_por_tamanho = {t["cartuchos"]: t["cenarios"] for t in base.get("tamanhos", [])}
+    regressoes = []
+    for tamanho in atual.get("tamanhos", []):
+        anteriores = base_por_tamanho.get(tamanho["cartuchos"], {})
+        for nome, resumo in tamanho["cenarios"].items():
+            anterior = anteriores.get(nome)
+            if anterior is None or "erro" in anterior:
+                continue
+            if "erro" in resumo:
+                regressoes.append((tamanho["cartuchos"], nome, anterior["p95_ms"], None))
+                continue
+            limite = anterior["p95_ms"] * (1 + tolerancia)
+            if resumo["p95_ms"] > limite and resumo["p95_ms"] - anterior["p95_ms"] >= diferenca_minima_ms:
+                regressoes.append((tamanho["cartuchos"], nome, anterior["p95_ms"], resumo["p95_ms"]))
+    return regressoes
+
+
+def main(argv=None, prog=None):
+    """Ponto de entrada da linha de comando"""
+    parser = argparse.ArgumentParser(prog=prog, description="Benchmark das consultas do app em catálogos sintéticos")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=list(TAMANHOS_PADRAO),
+                        help="quantidades de cartuchos dos catálogos")
+    parser.add_argument("--diretorio", default="benchmarks", help="pasta dos bancos sintéticos")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO, help="semente do gerador")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_PADRAO, help="execuções medidas por cenário")
+    parser.add_argument("--tempo-maximo", type=float, default=TEMPO_MAXIMO_PADRAO,
+                        help="segundos por cenário (ao menos uma execução medida)")
+    parser.add_argument("--filtro", help="só os cenários cujo nome contém este texto")
+    parser.add_argument("--saida", help="grava o relatório JSON neste arquivo (padrão: saída padrão)")
+    parser.add_argument("--comparar", help="relatório JSON anterior; sai com código 1 se algum p95 piorou")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO,
+                        help="piora relativa aceita no p95 (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    def mostrar(cartuchos, nome, resumo):
+        if "erro" in resumo:
+            print(f"{cartuchos:>9,} {nome:<45} ERRO {resumo['erro']}", file=sys.stderr)
+        else:
+            print(f"{cartuchos:>9,} {nome:<45} p50 {resumo['p50_ms']:>10.2f} ms  p95 {resumo['p95_ms']:>10.2f} ms",
+                  file=sys.stderr)
+
+    for cartuchos in args.tamanhos:
+        _, geracao = preparar_banco(
+            args.diretorio, cartuchos, args.semente,
+            progresso=lambda gerados, total: print(f"\rGerando {gerados:,}/{total:,} cartuchos", end="",
+                                                   file=sys.stderr, flush=True)
+        )
+        if geracao is not None:
+            print(f" em {geracao:.1f}s", file=sys.stderr)
+
+    relatorio = executar(args.tamanhos, args.diretorio, args.semente, args.repeticoes, args.tempo_maximo,
+                         args.filtro, progresso=mostrar)
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regressoes = comparar(relatorio, base, args.tolerancia)
+        for cartuchos, nome, antes, depois in regressoes:
+            depois_texto = "erro" if depois is None else f"{depois:.2f} ms"
+            print(f"REGRESSÃO {cartuchos:,} {nome}: p95 {antes:.2f} ms → {depois_texto}", file=sys.stderr)
+        if regressoes:
+            return 1
+        print("Nenhuma regressão de p95 acima da tolerância.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Busca textual de cartuchos pelo índice FTS5 `busca_cartuchos`
+
+O texto digitado ("t664 epson l355") vira uma consulta FTS5 em que cada
+palavra é um prefixo e todas precisam aparecer em alguma coluna (modelo,
+código, impressoras compatíveis, fabricantes ou cor). O resultado vem ordenado por
+relevância (bm25 com os pesos definidos na migração).
+"""
+import re
+
+LIMITE_PADRAO = 50
+
+# Letras, dígitos e os separadores que o tokenizador unicode61 descarta
+_RE_TERMO = re.compile(r"\w+", re.UNICODE)
+
+SQL_BUSCAR_CARTUCHOS = """
+    WITH resultado AS (
+        SELECT rowid AS id, rank AS relevancia
+        FROM busca_cartuchos
+        WHERE busca_cartuchos MATCH ?
+        ORDER BY rank
+        LIMIT ?
+    )
+    SELECT
+        c.id,
+        c.modelo_cartucho,
+        c.codigo_referencia,
+        cr.nome as cor,
+        (SELECT GROUP_CONCAT(mi.nome, ', ')
+           FROM cartucho_impressoras ci
+           JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+          WHERE ci.cartucho_id = c.id) as impressoras,
+        (SELECT GROUP_CONCAT(DISTINCT f.nome)
+           FROM cartucho_impressoras ci
+           JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+           JOIN fabricantes f ON mi.fabricante_id = f.id
+          WHERE ci.cartucho_id = c.id) as fabricantes,
+        (SELECT GROUP_CONCAT(cap.capacidade_ml)
+           FROM cartucho_capacidades cc
+           JOIN capacidades cap ON cc.capacidade_id = cap.id
+          WHERE cc.cartucho_id = c.id) as capacidades,
+        round(-resultado.relevancia, 2) as relevancia
+    FROM resultado
+    JOIN cartuchos c ON c.id = resultado.id
+    LEFT JOIN cores_referencia cr ON c.cor_id = cr.id
+    ORDER BY resultado.relevancia
+"""
+
+# Só id e rótulo, para os seletores de cartuchos
+SQL_SUGERIR_CARTUCHOS = """
+    WITH resultado AS (
+        SELECT rowid AS id, rank AS relevancia
+        FROM busca_cartuchos
+        WHERE busca_cartuchos MATCH ?
+        ORDER BY rank
+        LIMIT ?
+    )
+    SELECT
+        c.id,
+        c.modelo_cartucho || coalesce(' · ' || c.codigo_referencia, '')
+            || coalesce(' · ' || cr.nome, '') as rotulo
+    FROM resultado
+    JOIN cartuchos c ON c.id = resultado.id
+    LEFT JOIN cores_referencia cr ON c.cor_id = cr.id
+    ORDER BY resultado.relevancia
+"""
+
+
+def preparar_consulta(texto):
+    """'T664 epson-L355' -> '"t664"* "epson"* "l355"*' (None se não houver termos)
+
+    Cada termo vai entre aspas para que a sintaxe do FTS5 (AND, OR, NEAR,
+    aspas, parênteses) digitada pelo usuário seja tratada como texto.
+    """
+    termos = _RE_TERMO.findall(texto.lower())
+    if not termos:
+        return None
+    return " ".join(f'"{termo}"*' for termo in termos)
+
+
+def buscar_cartuchos(conn, texto, limite=LIMITE_PADRAO):
+    """Cartuchos que casam com o texto, mais relevantes primeiro; retorna (colunas, linhas)"""
+    consulta = preparar_consulta(texto)
+    if consulta is None:
+        return [], []
+    cursor = conn.execute(SQL_BUSCAR_CARTUCHOS, (consulta, limite))
+    return [d[0] for d in cursor.description], cursor.fetchall()
+
+
+def sugerir_cartuchos(conn, texto, limite=LIMITE_PADRAO):
+    """Lista de (id, rótulo) dos cartuchos que casam com o texto, mais relevantes primeiro"""
+    consulta = preparar_consulta(texto)
+    if consulta is None:
+        return []
+    return conn.execute(SQL_SUGERIR_CARTUCHOS, (consulta, limite)).fetchall()
@@ -0,0 +1,388 @@
+"""Teste de carga do app com várias sessões simultâneas (Streamlit AppTest)
+
+Cada sessão simulada é um `AppTest` do `streamlit_app.py` na sua própria
+thread, todas no mesmo processo: como num servidor de verdade, elas dividem
+o que está em `st.cache_resource` (gerenciador de conexões, caches) e só o
+estado da sessão é de cada uma. As sessões seguem roteiros sorteados com
+pesos parecidos com o uso da equipe: olhar o Dashboard, cadastrar cartuchos,
+filtrar e paginar nas Consultas, buscar e exportar CSV. Cada mudança de
+widget é um rerun cronometrado, como no navegador.
+
+Tudo roda numa pasta temporária com um catálogo sintético
+(`getanuncio.sintetico`): o app abre `cartuchos.db`, backups e logs
+relativos à pasta atual, então o banco real nunca é tocado e nada precisa de
+rede. Para cada nível de concorrência o relatório JSON traz a distribuição
+da latência dos reruns (geral e por roteiro), a taxa de erros, quantos foram
+"database is locked" e a contenção no pool (esperas pelo escritor e por
+leitores):
+
+    python -m getanuncio.carga --sessoes 1 4 8 16 --cartuchos 10000 --saida carga.json
+
+O runtime simulado do AppTest é global ao processo; erros dele (ex.:
+"Runtime hasn't been created" num download) aparecem nas mensagens do
+relatório e não são do app.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from getanuncio.conexao import GerenciadorConexoes, gerenciadores_ativos
+from getanuncio.instrumentacao import percentil
+from getanuncio.repositorio import Repositorio
+from getanuncio.sintetico import SEMENTE_PADRAO, gerar_catalogo
+
+APP_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+# O app abre DB_PATH relativo à pasta atual
+DB_APP = "cartuchos.db"
+SESSOES_PADRAO = (1, 2, 4, 8)
+CARTUCHOS_PADRAO = 10_000
+ITERACOES_PADRAO = 10
+TEMPO_LIMITE_PADRAO = 30.0
+MENSAGENS_RELATORIO = 10
+BLOQUEIO = "database is locked"
+
+PAGINA_DASHBOARD = "📊 Dashboard"
+PAGINA_CADASTROS = "📝 Cadastros"
+PAGINA_CONSULTAS = "🔍 Consultas"
+ABA_CARTUCHOS = "🖨️ Cartuchos"
+BUSCAS_COR = ("Black", "Cyan", "Magenta", "Yellow", "Light", "Red")
+TEXTOS_BUSCA = ("black", "T000", "impressora 001", "fabricante 01 cyan", "REF-1")
+
+Medicao = namedtuple("Medicao", ["roteiro", "passo", "duracao", "erro"])
+
+
+def _por_rotulo(widgets, rotulo):
+    """Widget de uma lista do AppTest pelo rótulo (para os que não têm key)"""
+    for widget in widgets:
+        if widget.label == rotulo:
+            return widget
+    raise KeyError(f"Widget não encontrado: {rotulo}")
+
+
+def _erro_na_tela(app):
+    """Primeira exceção ou `st.error` mostrada pelo último rerun, se houver"""
+    mensagens = [e.message for e in app.exception] + [e.value for e in app.error]
+    return str(mensagens[0]) if mensagens else None
+
+
+class Sessao:
+    """Uma sessão simulada: um AppTest e os reruns que ele fez"""
+
+    def __init__(self, numero, caminho_app, valores, semente, tempo_limite):
+        from streamlit.testing.v1 import AppTest
+
+        self.numero = numero
+        self.valores = valores
+        self.rng = random.Random(f"{semente}-{numero}")
+        self.app = AppTest.from_file(caminho_app, default_timeout=tempo_limite)
+        self.medicoes = []
+        self.cadastros = 0
+
+    def rerun(self, roteiro, passo, acao=None):
+        """Aplica `acao(app)` aos widgets e reexecuta o script; retorna se deu certo"""
+        inicio = time.perf_counter()
+        try:
+            if acao is not None:
+                acao(self.app)
+            self.app.run()
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+        else:
+            erro = _erro_na_tela(self.app)
+        self.medicoes.append(Medicao(roteiro, passo, time.perf_counter() - inicio, erro))
+        return erro is None
+
+
+def _ir_para(pagina):
+    return lambda app: app.radio(key="menu_principal").set_value(pagina)
+
+
+def roteiro_dashboard(sessao):
+    """Abre o Dashboard: contagens e os dois agregados"""
+    sessao.rerun("dashboard", "abrir", _ir_para(PAGINA_DASHBOARD))
+
+
+def roteiro_cadastro(sessao):
+    """Busca impressoras e cor nos seletores e cadastra um cartucho"""
+    rng = sessao.rng
+    passos = [
+        ("abrir", _ir_para(PAGINA_CADASTROS)),
+        ("aba", lambda app: app.radio(key="aba_cadastro").set_value(ABA_CARTUCHOS)),
+        ("buscar_impressora",
+         lambda app: app.text_input(key="cartucho_modelos_texto").input(f"Impressora {rng.randrange(100):03d}")),
+        ("escolher_impressoras", _escolher_impressoras(rng)),
+        ("buscar_cor", lambda app: app.text_input(key="cartucho_cor_texto").input(rng.choice(BUSCAS_COR))),
+        ("enviar", _preencher_cartucho(sessao)),
+    ]
+    for passo, acao in passos:
+        if not sessao.rerun("cadastro", passo, acao):
+            return
+
+
+def _escolher_impressoras(rng):
+    def acao(app):
+        sugeridos = list(app.session_state["cartucho_modelos_rotulos"])
+        app.multiselect(key="cartucho_modelos_ids").set_value(rng.sample(sugeridos, min(2, len(sugeridos))))
+    return acao
+
+
+def _preencher_cartucho(sessao):
+    def acao(app):
+        sessao.cadastros += 1
+        _por_rotulo(app.text_input, "Modelo do Cartucho*").input(f"CARGA-{sessao.numero}-{sessao.cadastros}")
+        _por_rotulo(app.text_input, "Código de Referência").input(f"{sessao.rng.randrange(10**7):07d}")
+        _por_rotulo(app.button, "✅ Cadastrar Cartucho").click()
+    return acao
+
+
+def _filtrar(sessao, roteiro):
+    """Abre as Consultas, muda alguns filtros (um rerun cada) e aplica; retorna se deu certo"""
+    rng = sessao.rng
+    if not sessao.rerun(roteiro, "abrir", _ir_para(PAGINA_CONSULTAS)):
+        return False
+    for chave, campo in (("filtro_cor", "cores"), ("filtro_fabricante", "fabricantes"),
+                         ("filtro_capacidade", "capacidades")):
+        if rng.random() < 0.5 and sessao.valores[campo]:
+            valor = rng.choice(sessao.valores[campo])
+            if not sessao.rerun(roteiro, chave, lambda app, c=chave, v=valor: app.selectbox(key=c).set_value(v)):
+                return False
+    return sessao.rerun(roteiro, "aplicar", lambda app: _por_rotulo(app.button, "🔍 Aplicar Filtros").click())
+
+
+def roteiro_consultas(sessao):
+    """Filtra nas Consultas e às vezes avança algumas páginas"""
+    if not _filtrar(sessao, "consultas"):
+        return
+    for _ in range(sessao.rng.choice((0, 0, 1, 2))):
+        try:
+            proxima = sessao.app.button(key="consulta_proxima")
+        except KeyError:  # sem resultados, sem paginação
+            return
+        if proxima.disabled or not sessao.rerun("consultas", "proxima", lambda app: proxima.click()):
+            return
+
+
+def roteiro_busca(sessao):
+    """Busca textual na página de Consultas"""
+    if sessao.rerun("busca", "abrir", _ir_para(PAGINA_CONSULTAS)):
+        texto = sessao.rng.choice(TEXTOS_BUSCA)
+        sessao.rerun("busca", "buscar", lambda app: app.text_input(key="texto_busca").input(texto))
+
+
+def roteiro_exportacao(sessao):
+    """Filtra nas Consultas e prepara a exportação CSV do resultado"""
+    if _filtrar(sessao, "exportacao"):
+        sessao.rerun("exportacao", "preparar_csv",
+                     lambda app: _por_rotulo(app.button, "📥 Preparar exportação CSV").click())
+
+
+# Nome -> (roteiro, peso no sorteio)
+ROTEIROS = {
+    "dashboard": (roteiro_dashboard, 30),
+    "consultas": (roteiro_consultas, 30),
+    "busca": (roteiro_busca, 20),
+    "cadastro": (roteiro_cadastro, 10),
+    "exportacao": (roteiro_exportacao, 10),
+}
+
+
+def rodar_sessao(sessao, iteracoes, pausa=0.0):
+    """Primeira execução do app e `iteracoes` roteiros sorteados; retorna as medições"""
+    nomes = list(ROTEIROS)
+    pesos = [peso for _, peso in ROTEIROS.values()]
+    sessao.rerun("inicio", "primeira_execucao")
+    for _ in range(iteracoes):
+        roteiro, _ = ROTEIROS[sessao.rng.choices(nomes, weights=pesos)[0]]
+        roteiro(sessao)
+        if pausa:
+            # Tempo de leitura entre uma ação e outra, em média `pausa` segundos
+            time.sleep(sessao.rng.uniform(0, 2 * pausa))
+    return sessao.medicoes
+
+
+def _pool(db_path):
+    """Contadores somados dos pools abertos sobre `db_path` neste processo"""
+    total = Counter()
+    for gerenciador in gerenciadores_ativos(db_path):
+        estatisticas = gerenciador.estatisticas()
+        for campo in ("checkouts", "esperas", "esperas_escrita", "espera_escrita_ms"):
+            total[campo] += estatisticas[campo]
+    return total
+
+
+def _latencias(duracoes):
+    duracoes = sorted(d * 1000 for d in duracoes)
+    return {
+        "p50_ms": round(percentil(duracoes, 50), 3),
+        "p95_ms": round(percentil(duracoes, 95), 3),
+        "p99_ms": round(percentil(duracoes, 99), 3),
+        "media_ms": round(sum(duracoes) / len(duracoes), 3) if duracoes else 0.0,
+        "maximo_ms": round(duracoes[-1], 3) if duracoes else 0.0,
+    }
+
+
+def resumir(sessoes, medicoes, duracao, pool):
+    """Resumo de um nível de concorrência (dicionário serializável em JSON)
+
+    A primeira execução de cada sessão fica só em `por_roteiro["inicio"]`.
+    """
+    reruns = [m for m in medicoes if m.roteiro != "inicio"]
+    erros = [m.erro for m in medicoes if m.erro is not None]
+    por_roteiro = {}
+    for nome in ["inicio"] + list(ROTEIROS):
+        do_roteiro = [m for m in medicoes if m.roteiro == nome]
+        if do_roteiro:
+            por_roteiro[nome] = dict(
+                reruns=len(do_roteiro),
+                erros=sum(m.erro is not None for m in do_roteiro),
+                **_latencias([m.duracao for m in do_roteiro]),
+            )
+    return {
+        "sessoes": sessoes,
+        "reruns": len(reruns),
+        "duracao_s": round(duracao, 3),
+        "reruns_por_s": round(len(reruns) / duracao, 2) if duracao else 0.0,
+        "latencia": _latencias([m.duracao for m in reruns]),
+        "por_roteiro": por_roteiro,
+        "erros": len(erros),
+        "taxa_erro": round(len(erros) / len(medicoes), 4) if medicoes else 0.0,
+        "bloqueios": sum(BLOQUEIO in erro for erro in erros),
+        "mensagens_erro": dict(Counter(erro[:200] for erro in erros).most_common(MENSAGENS_RELATORIO)),
+        "pool": {
+            "checkouts": pool["checkouts"],
+            "esperas_leitor": pool["esperas"],
+            "esperas_escrita": pool["esperas_escrita"],
+            "espera_escrita_ms": round(pool["espera_escrita_ms"], 3),
+        },
+    }
+
+
+def _valores_filtros(db_path):
+    """Opções reais dos filtros das Consultas, para os roteiros sortearem"""
+    gerenciador = GerenciadorConexoes(db_path)
+    try:
+        repositorio = Repositorio(gerenciador)
+        return {
+            "cores": [c.nome for c in repositorio.cores()],
+            "fabricantes": [f.nome for f in repositorio.fabricantes()],
+            "capacidades": [c.capacidade_ml for c in repositorio.capacidades()],
+        }
+    finally:
+        gerenciador.fechar()
+
+
+def executar(niveis=SESSOES_PADRAO, cartuchos=CARTUCHOS_PADRAO, iteracoes=ITERACOES_PADRAO,
+             semente=SEMENTE_PADRAO, tempo_limite=TEMPO_LIMITE_PADRAO, pausa=0.0, caminho_app=APP_PADRAO,
+             manter=False, progresso=None):
+    """Roda os roteiros com cada quantidade de sessões simultâneas; retorna o relatório
+
+    Os níveis rodam em sequência sobre o mesmo banco temporário e o mesmo
+    `st.cache_resource`, como um servidor que continua no ar (os cartuchos
+    cadastrados num nível ficam para os seguintes). `progresso(resumo)` é
+    chamado ao fim de cada nível. Com `manter`, a pasta temporária não é
+    apagada e o caminho dela vai no relatório.
+    """
+    import streamlit as st
+
+    caminho_app = os.path.abspath(caminho_app)
+    pasta = tempfile.mkdtemp(prefix="carga_")
+    db_path = os.path.join(pasta, DB_APP)
+    relatorio = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "streamlit": st.__version__,
+        "plataforma": platform.platform(),
+        "cartuchos": cartuchos,
+        "semente": semente,
+        "iteracoes": iteracoes,
+        "pausa_s": pausa,
+        "niveis": [],
+    }
+    pasta_original = os.getcwd()
+    try:
+        relatorio["geracao_s"] = round(gerar_catalogo(db_path, cartuchos, semente).duracao, 3)
+        valores = _valores_filtros(db_path)
+        os.chdir(pasta)
+        # Recursos de outra execução no mesmo processo apontariam para outro banco
+        st.cache_resource.clear()
+        for sessoes in niveis:
+            antes = _pool(db_path)
+            grupo = [Sessao(numero, caminho_app, valores, semente, tempo_limite) for numero in range(sessoes)]
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessoes, thread_name_prefix="sessao") as executor:
+                resultados = list(executor.map(lambda sessao: rodar_sessao(sessao, iteracoes, pausa), grupo))
+            duracao = time.perf_counter() - inicio
+            pool = _pool(db_path)
+            pool.subtract(antes)
+            resumo = resumir(sessoes, [m for medicoes in resultados for m in medicoes], duracao, pool)
+            relatorio["niveis"].append(resumo)
+            if progresso is not None:
+                progresso(resumo)
+    finally:
+        os.chdir(pasta_original)
+        st.cache_resource.clear()
+        if manter:
+            relatorio["pasta"] = pasta
+        else:
+            shutil.rmtree(pasta, ignore_errors=True)
+    return relatorio
+
+
+def main(argv=None, prog=None):
+    """Ponto de entrada da linha de comando"""
+    parser = argparse.ArgumentParser(prog=prog, description="Teste de carga do app com sessões simultâneas")
+    parser.add_argument("--sessoes", type=int, nargs="+", default=list(SESSOES_PADRAO),
+                        help="quantidades de sessões simultâneas, uma rodada para cada")
+    parser.add_argument("--cartuchos", type=int, default=CARTUCHOS_PADRAO, help="tamanho do catálogo sintético")
+    parser.add_argument("--iteracoes", type=int, default=ITERACOES_PADRAO, help="roteiros por sessão")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO, help="semente do catálogo e dos sorteios")
+    parser.add_argument("--pausa", type=float, default=0.0, help="pausa média entre roteiros, em segundos")
+    parser.add_argument("--tempo-limite", type=float, default=TEMPO_LIMITE_PADRAO,
+                        help="segundos que um rerun pode levar antes de contar como erro")
+    parser.add_argument("--app", default=APP_PADRAO, help="script Streamlit a testar")
+    parser.add_argument("--manter", action="store_true", help="não apaga a pasta temporária no fim")
+    parser.add_argument("--saida", help="grava o relatório JSON neste arquivo (padrão: saída padrão)")
+    parser.add_argument("--max-taxa-erro", type=float,
+                        help="sai com código 1 se algum nível passar desta taxa de erros (0.01 = 1%%)")
+    args = parser.parse_args(argv)
+
+    def mostrar(resumo):
+        latencia = resumo["latencia"]
+        print(f"{resumo['sessoes']:>3} sessões  {resumo['reruns']:>5} reruns  "
+              f"p50 {latencia['p50_ms']:>9.1f} ms  p95 {latencia['p95_ms']:>9.1f} ms  "
+              f"p99 {latencia['p99_ms']:>9.1f} ms  erros {resumo['taxa_erro']:>6.1%}  "
+              f"locked {resumo['bloqueios']:>3}  esperas escritor {resumo['pool']['esperas_escrita']:>5}",
+              file=sys.stderr)
+
+    relatorio = executar(args.sessoes, args.cartuchos, args.iteracoes, args.semente, args.tempo_limite,
+                         args.pausa, args.app, args.manter, progresso=mostrar)
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    if args.max_taxa_erro is not None:
+        acima = [n for n in relatorio["niveis"] if n["taxa_erro"] > args.max_taxa_erro]
+        for nivel in acima:
+            print(f"ACIMA DO LIMITE {nivel['sessoes']} sessões: {nivel['taxa_erro']:.1%} de erros",
+                  file=sys.stderr)
+        if acima:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Escrita no catálogo de cartuchos
+
+As chaves estrangeiras são resolvidas pelos mapas do cache de referências
+(sem varrer DataFrames) e cada cadastro é um pedido da fila de escrita do
+gerenciador: atômico, e gravado junto com os de outras sessões que chegarem
+ao mesmo tempo.
+"""
+import sqlite3
+from collections import namedtuple
+
+SQL_INSERIR_FABRICANTE = "INSERT INTO fabricantes (nome) VALUES (?)"
+SQL_INSERIR_MODELO = "INSERT INTO modelos_impressora (nome, fabricante_id) VALUES (?, ?)"
+SQL_INSERIR_COR = "INSERT INTO cores_referencia (nome, codigo_hex) VALUES (?, ?)"
+SQL_INSERIR_CAPACIDADE = "INSERT INTO capacidades (capacidade_ml) VALUES (?)"
+SQL_INSERIR_CARTUCHO = (
+    "INSERT INTO cartuchos (modelo_cartucho, cor_id, codigo_referencia) VALUES (?, ?, ?)"
+)
+SQL_ASSOCIAR_CAPACIDADE = (
+    "INSERT OR IGNORE INTO cartucho_capacidades (cartucho_id, capacidade_id) VALUES (?, ?)"
+)
+SQL_ASSOCIAR_IMPRESSORA = (
+    "INSERT OR IGNORE INTO cartucho_impressoras (cartucho_id, modelo_impressora_id) VALUES (?, ?)"
+)
+SQL_DESASSOCIAR_IMPRESSORA = (
+    "DELETE FROM cartucho_impressoras WHERE cartucho_id = ? AND modelo_impressora_id = ?"
+)
+
+ReferenciaCadastrada = namedtuple("ReferenciaCadastrada", ["id", "comando"])
+ReferenciaCadastrada.__doc__ = """Resultado do cadastro de um item de referência
+
+`comando` é o (sql, parâmetros) executado.
+"""
+
+CartuchoCadastrado = namedtuple(
+    "CartuchoCadastrado", ["cartucho_id", "capacidade_ids", "modelo_ids", "comandos"]
+)
+CartuchoCadastrado.__doc__ = """Resultado de `cadastrar_cartucho`
+
+`comandos` é a lista de (sql, parâmetros) efetivamente executados.
+"""
+
+
+def sql_literal(valor):
+    """Formata um valor Python como literal SQL (apenas para exibição)"""
+    if valor is None:
+        return "NULL"
+    if isinstance(valor, (int, float)):
+        return str(valor)
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def formatar_comando(sql, params):
+    """Substitui os placeholders `?` pelos valores, para exibir o SQL executado"""
+    partes = sql.split("?")
+    if len(partes) != len(params) + 1:
+        return f"{sql} -- {params!r}"
+    texto = partes[0]
+    for valor, parte in zip(params, partes[1:]):
+        texto += sql_literal(valor) + parte
+    return texto
+
+
+def _resolver(tabela, valor, descricao):
+    try:
+        return tabela.id_por_nome[valor]
+    except KeyError:
+        raise ValueError(f"{descricao} não cadastrado(a): {valor}") from None
+
+
+def _resolver_id(tabela, valor, descricao):
+    # Ids vêm prontos do seletor com busca: só confere se existem
+    if isinstance(valor, int):
+        if valor not in tabela.nome_por_id:
+            raise ValueError(f"{descricao} não cadastrado(a): id {valor}")
+        return valor
+    return _resolver(tabela, valor, descricao)
+
+
+def _cadastrar_referencia(gerenciador, sql, params):
+    resultado = gerenciador.executar_escrita(sql, params).result()
+    return ReferenciaCadastrada(resultado.lastrowid, (sql, params))
+
+
+def cadastrar_fabricante(gerenciador, nome):
+    """Cadastra um fabricante"""
+    return _cadastrar_referencia(gerenciador, SQL_INSERIR_FABRICANTE, (nome,))
+
+
+def cadastrar_modelo(gerenciador, nome, fabricante_id):
+    """Cadastra um modelo de impressora de um fabricante já cadastrado"""
+    return _cadastrar_referencia(gerenciador, SQL_INSERIR_MODELO, (nome, fabricante_id))
+
+
+def cadastrar_cor(gerenciador, nome, codigo_hex):
+    """Cadastra uma cor de referência"""
+    return _cadastrar_referencia(gerenciador, SQL_INSERIR_COR, (nome, codigo_hex))
+
+
+def cadastrar_capacidade(gerenciador, capacidade_ml):
+    """Cadastra uma capacidade (em ml)"""
+    return _cadastrar_referencia(gerenciador, SQL_INSERIR_CAPACIDADE, (int(capacidade_ml),))
+
+
+def cadastrar_cartucho(gerenciador, referencias, modelo_cartucho, cor, modelos_impressora,
+                       capacidades=(), codigo_referencia=None):
+    """Cadastra um cartucho, suas impressoras compatíveis e capacidades numa única transação
+
+    `cor` e cada item de `modelos_impressora` são nomes ou ids e `capacidades`
+    é uma lista de valores em ml; nomes e capacidades são resolvidos para ids
+    pelos mapas de `referencias`. Se qualquer INSERT falhar nada é gravado.
+    """
+    cor_id = _resolver_id(referencias.cores, cor, "Cor")
+    # dict.fromkeys remove repetidas mantendo a ordem (as PKs são compostas)
+    modelo_ids = list(dict.fromkeys(
+        _resolver_id(referencias.modelos, modelo, "Modelo de impressora") for modelo in modelos_impressora
+    ))
+    if not modelo_ids:
+        raise ValueError("Informe ao menos uma impressora compatível")
+    capacidade_ids = list(dict.fromkeys(
+        _resolver(referencias.capacidades, ml, "Capacidade") for ml in capacidades
+    ))
+
+    params_cartucho = (modelo_cartucho, cor_id, codigo_referencia or None)
+
+    def gravar(conn):
+        cartucho_id = conn.execute(SQL_INSERIR_CARTUCHO, params_cartucho).lastrowid
+        conn.executemany(SQL_ASSOCIAR_IMPRESSORA, [(cartucho_id, modelo_id) for modelo_id in modelo_ids])
+        if capacidade_ids:
+            conn.executemany(SQL_ASSOCIAR_CAPACIDADE, [(cartucho_id, c) for c in capacidade_ids])
+        return cartucho_id
+
+    try:
+        cartucho_id = gerenciador.enfileirar(gravar).result()
+    except sqlite3.IntegrityError as e:
+        if "ux_cartuchos_chave" in str(e):
+            raise ValueError(
+                f"Cartucho '{modelo_cartucho}' já cadastrado com essa cor e código; "
+                "adicione as impressoras na aba Compatibilidade"
+            ) from None
+        raise
+
+    comandos = [(SQL_INSERIR_CARTUCHO, params_cartucho)]
+    comandos += [(SQL_ASSOCIAR_IMPRESSORA, (cartucho_id, modelo_id)) for modelo_id in modelo_ids]
+    comandos += [(SQL_ASSOCIAR_CAPACIDADE, (cartucho_id, c)) for c in capacidade_ids]
+    return CartuchoCadastrado(cartucho_id, capacidade_ids, modelo_ids, comandos)
+
+
+def editar_compatibilidade(gerenciador, cartucho_ids, modelo_ids, remover=False):
+    """Associa (ou, com `remover=True`, desassocia) todos os cartuchos a todos os modelos
+
+    Edição em massa numa única transação; associações já existentes (ou
+    inexistentes, ao remover) são ignoradas. Retorna quantas mudaram.
+    """
+    pares = [(cartucho_id, modelo_id) for cartucho_id in dict.fromkeys(cartucho_ids)
+             for modelo_id in dict.fromkeys(modelo_ids)]
+    if not pares:
+        return 0
+    sql = SQL_DESASSOCIAR_IMPRESSORA if remover else SQL_ASSOCIAR_IMPRESSORA
+    # rowcount soma só as linhas dos comandos, sem as gravadas pelos triggers
+    return gerenciador.enfileirar(lambda conn: conn.executemany(sql, pares).rowcount).result()
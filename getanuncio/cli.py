@@ -0,0 +1,149 @@
+"""Linha de comando do catálogo, sem Streamlit
+
+    python -m getanuncio init --db cartuchos.db
+    python -m getanuncio import planilha.xlsx
+    python -m getanuncio export feed.xml.gz --nome mercado
+    python -m getanuncio backup --formato db
+    python -m getanuncio generate-ads anuncios.csv.gz --processos 4
+    python -m getanuncio stats
+    python -m getanuncio bench --tamanhos 1000 100000 --saida atual.json --comparar base.json
+    python -m getanuncio load-test --sessoes 1 4 8 --cartuchos 10000
+
+Cada comando importa só os módulos que usa, na hora em que roda: `init`,
+`backup`, `stats`, `import` e `export` usam apenas a biblioteca padrão, e
+pandas é carregado somente por `generate-ads` (e pelo cenário de exportação
+do `bench`) e Streamlit só pelo `load-test`. `import`, `export`,
+`generate-ads`, `generate-data`, `bench` e `load-test` repassam os argumentos
+às linhas de comando de `getanuncio.importacao`, `getanuncio.feed`,
+`getanuncio.anuncios`, `getanuncio.sintetico`, `getanuncio.benchmark` e
+`getanuncio.carga`.
+"""
+import argparse
+import importlib
+import os
+import sys
+
+DB_PADRAO = "cartuchos.db"
+BACKUP_DIR_PADRAO = "backups"
+PROG = "getanuncio"
+
+
+def _gerenciador(db_path, migrar=True):
+    from getanuncio.conexao import GerenciadorConexoes
+    from getanuncio.migracoes import migrar as aplicar_migracoes
+
+    return GerenciadorConexoes(db_path, ao_abrir_escritor=aplicar_migracoes if migrar else None)
+
+
+def comando_init(argv):
+    """Cria ou migra o esquema e insere os dados iniciais"""
+    from getanuncio.repositorio import Repositorio
+
+    parser = argparse.ArgumentParser(prog=f"{PROG} init", description=comando_init.__doc__)
+    parser.add_argument("--db", default=DB_PADRAO, help="arquivo do banco SQLite")
+    args = parser.parse_args(argv)
+
+    # Sem migrar ao abrir: o relatório das fases mostra as migrações aplicadas
+    gerenciador = _gerenciador(args.db, migrar=False)
+    try:
+        fases = Repositorio(gerenciador).inicializar()
+    finally:
+        gerenciador.fechar()
+    for fase in fases:
+        print(f"{fase.nome}: {fase.detalhe} ({fase.duracao * 1000:.1f} ms)")
+    return 0
+
+
+def comando_backup(argv):
+    """Gera um backup do banco (dump SQL compactado ou snapshot binário)"""
+    from getanuncio.backup import FORMATO_BINARIO, FORMATO_SQL_GZ, gerar_backup
+
+    parser = argparse.ArgumentParser(prog=f"{PROG} backup", description=comando_backup.__doc__)
+    parser.add_argument("--db", default=DB_PADRAO, help="arquivo do banco SQLite")
+    parser.add_argument("--diretorio", default=BACKUP_DIR_PADRAO, help="pasta dos backups")
+    parser.add_argument("--formato", choices=(FORMATO_SQL_GZ, FORMATO_BINARIO), default=FORMATO_SQL_GZ)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Erro: banco não encontrado: {args.db}", file=sys.stderr)
+        return 2
+    gerenciador = _gerenciador(args.db)
+    try:
+        resultado = gerar_backup(gerenciador, args.diretorio, args.formato)
+    except OSError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+    finally:
+        gerenciador.fechar()
+    print(f"Backup gerado em {resultado.duracao:.2f}s ({resultado.tamanho_bytes / 1024:.1f} KB): "
+          f"{resultado.caminho}")
+    return 0
+
+
+def comando_stats(argv):
+    """Mostra a versão do esquema e quantas linhas tem cada tabela do catálogo"""
+    from getanuncio.migracoes import versao_atual
+    from getanuncio.repositorio import Repositorio
+
+    parser = argparse.ArgumentParser(prog=f"{PROG} stats", description=comando_stats.__doc__)
+    parser.add_argument("--db", default=DB_PADRAO, help="arquivo do banco SQLite")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Erro: banco não encontrado: {args.db}", file=sys.stderr)
+        return 2
+    gerenciador = _gerenciador(args.db)
+    try:
+        estatisticas = Repositorio(gerenciador).estatisticas()
+        with gerenciador.leitura() as conn:
+            versao = versao_atual(conn)
+    finally:
+        gerenciador.fechar()
+    print(f"{args.db}: {os.path.getsize(args.db) / 1024:.1f} KB, esquema versão {versao}")
+    largura = max(map(len, estatisticas._fields))
+    for nome, total in zip(estatisticas._fields, estatisticas):
+        print(f"  {nome:<{largura}}  {total:>10,}")
+    return 0
+
+
+def _repassar(nome, modulo):
+    """Comando que importa `modulo` só quando chamado e roda o `main` dele"""
+    def comando(argv):
+        return importlib.import_module(modulo).main(argv, prog=f"{PROG} {nome}")
+    return comando
+
+
+# Nome -> (função que recebe os argumentos restantes, descrição)
+COMANDOS = {
+    "init": (comando_init, "cria ou migra o esquema e insere os dados iniciais"),
+    "import": (_repassar("import", "getanuncio.importacao"), "importa cartuchos de uma planilha CSV/XLSX"),
+    "export": (_repassar("export", "getanuncio.feed"), "exporta o feed incremental (CSV, JSONL ou XML)"),
+    "backup": (comando_backup, "gera um backup .sql.gz ou .db"),
+    "generate-ads": (_repassar("generate-ads", "getanuncio.anuncios"), "gera os anúncios do catálogo"),
+    "stats": (comando_stats, "versão do esquema e contagens das tabelas"),
+    "generate-data": (_repassar("generate-data", "getanuncio.sintetico"), "cria um catálogo sintético"),
+    "bench": (_repassar("bench", "getanuncio.benchmark"), "benchmark das consultas em catálogos sintéticos"),
+    "load-test": (_repassar("load-test", "getanuncio.carga"), "sessões simultâneas do app (Streamlit AppTest)"),
+}
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = argparse.ArgumentParser(
+        prog=PROG,
+        description="Catálogo de cartuchos (Color Jet ADS) pela linha de comando",
+        epilog="comandos:\n" + "\n".join(f"  {nome:<15}{descricao}" for nome, (_, descricao) in COMANDOS.items())
+               + f"\n\nUse '{PROG} <comando> --help' para as opções de cada comando.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("comando", choices=COMANDOS, metavar="comando")
+    parser.add_argument("argumentos", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    comando, _ = COMANDOS[args.comando]
+    return comando(args.argumentos)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,454 @@
+"""Gerenciador de conexões SQLite compartilhado entre as sessões do app
+
+Mantém uma única conexão de escrita (serializada por um lock) e um pool de
+conexões de leitura reaproveitadas entre reruns. Todas as conexões são abertas
+já ajustadas (WAL, synchronous=NORMAL, busy_timeout, mmap e cache) e com as
+chaves estrangeiras ligadas, para que os ON DELETE CASCADE do esquema valham.
+
+As escritas curtas das sessões (cadastros, edições, comandos do SQL
+Executor) vão para uma fila limitada atendida por uma thread de escrita:
+pedidos que chegam juntos são gravados numa única transação (group commit)
+e cada um recebe um `Future` com o seu resultado. Operações longas e
+administrativas (migrações, importação, restauração) continuam usando
+`escrita()` diretamente; as duas formas se revezam no mesmo lock.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+from collections import namedtuple
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# PRAGMAs aplicados em toda conexão aberta pelo gerenciador
+PRAGMAS_PADRAO = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -16000,  # negativo = KiB (~16 MB por conexão)
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+ResultadoEscrita = namedtuple("ResultadoEscrita", ["lastrowid", "rowcount"])
+
+# Um pedido da fila de escrita; `sozinho` grava numa transação só dele
+_Pedido = namedtuple("_Pedido", ["funcao", "args", "futuro", "sozinho"])
+# Último item da fila: a thread de escrita termina ao recebê-lo (ver `fechar`)
+_PARAR = object()
+
+# Gerenciadores vivos no processo, para diagnóstico (ex.: o teste de carga)
+_GERENCIADORES = weakref.WeakSet()
+
+
+def gerenciadores_ativos(db_path=None):
+    """Gerenciadores vivos neste processo; só os de `db_path`, se informado"""
+    alvo = None if db_path is None else os.path.abspath(db_path)
+    return [g for g in list(_GERENCIADORES) if alvo is None or os.path.abspath(g.db_path) == alvo]
+
+
+class GerenciadorConexoes:
+    """Pool de conexões: um escritor e até `max_leitores` leitores
+
+    `ao_abrir_escritor(conn)`, se informado, é chamado sempre que a conexão de
+    escrita é (re)aberta, antes de qualquer leitor; o app usa isso para rodar
+    as migrações de esquema. O retorno fica em `relatorio_inicializacao`.
+    A fila de escrita aceita até `max_fila` pedidos pendentes e grava até
+    `max_lote` por transação.
+    """
+
+    def __init__(self, db_path, max_leitores=4, timeout_espera=10.0, pragmas=None,
+                 ao_abrir_escritor=None, max_fila=256, max_lote=64):
+        self.db_path = db_path
+        self.max_leitores = max_leitores
+        self.max_fila = max_fila
+        self.max_lote = max_lote
+        self.timeout_espera = timeout_espera
+        self.pragmas = dict(PRAGMAS_PADRAO if pragmas is None else pragmas)
+        self.ao_abrir_escritor = ao_abrir_escritor
+        self.relatorio_inicializacao = None
+
+        self._lock = threading.Lock()
+        self._lock_escrita = threading.RLock()
+        self._leitores_livres = queue.LifoQueue()
+        self._escritor = None
+        # Conexão só para `versao_dados`, com lock próprio: não disputa o escritor
+        self._sentinela = None
+        self._lock_sentinela = threading.Lock()
+        self._geracao = 0
+        self._versao_escrita = 0
+        # Quantos locks de escrita a thread atual tem (o RLock é reentrante)
+        self._local = threading.local()
+        self._fila_escrita = queue.Queue(maxsize=max_fila)
+        self._thread_escrita = None
+
+        # Contadores para as estatísticas do pool
+        self._leitores_abertos = 0
+        self._leitores_em_uso = 0
+        self._checkouts = 0
+        self._reusos = 0
+        self._esperas = 0
+        self._esperas_escrita = 0
+        self._tempo_espera_escrita = 0.0
+        self._lotes = 0
+        self._pedidos = 0
+        self._maior_lote = 0
+        self._filas_cheias = 0
+        _GERENCIADORES.add(self)
+
+    @contextmanager
+    def _escritor_exclusivo(self):
+        """Adquire o lock de escrita, contando quando foi preciso esperar por ele"""
+        if not self._lock_escrita.acquire(blocking=False):
+            inicio = time.perf_counter()
+            self._lock_escrita.acquire()
+            with self._lock:
+                self._esperas_escrita += 1
+                self._tempo_espera_escrita += time.perf_counter() - inicio
+        self._local.profundidade = getattr(self._local, "profundidade", 0) + 1
+        try:
+            yield
+        finally:
+            self._local.profundidade -= 1
+            self._lock_escrita.release()
+
+    def _abrir(self):
+        """Abre uma nova conexão já com os PRAGMAs de desempenho"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma}={valor}")
+        return conn
+
+    def _obter_escritor(self):
+        # Chamado sempre com o lock de escrita adquirido
+        if self._escritor is None:
+            conn = self._abrir()
+            if self.ao_abrir_escritor is not None:
+                try:
+                    self.relatorio_inicializacao = self.ao_abrir_escritor(conn)
+                except BaseException:
+                    conn.close()
+                    raise
+            self._escritor = conn
+        return self._escritor
+
+    @contextmanager
+    def escrita(self):
+        """Empresta a conexão de escrita; faz commit na saída ou rollback em erro"""
+        with self._escritor_exclusivo():
+            conn = self._obter_escritor()
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            else:
+                if conn.in_transaction:
+                    conn.commit()
+            finally:
+                self._versao_escrita += 1
+
+    def enfileirar(self, funcao, *args, sozinho=False):
+        """Agenda `funcao(conn, *args)` na thread de escrita; retorna um `Future` com o retorno dela
+
+        Pedidos que chegam juntos são gravados numa única transação, cada um
+        num SAVEPOINT: o erro de um desfaz só ele, e os Futures só são
+        resolvidos depois do COMMIT. `sozinho=True` grava o pedido numa
+        transação só dele (scripts longos, que podem ser interrompidos).
+        Com a fila cheia, espera até `timeout_espera` segundos por espaço e
+        então levanta `sqlite3.OperationalError`. De dentro de `escrita()`
+        (ou de outro pedido), roda na hora, na transação já aberta.
+        """
+        futuro = Future()
+        if getattr(self._local, "profundidade", 0):
+            try:
+                futuro.set_result(self._aplicar(self._obter_escritor(), funcao, args))
+            except Exception as e:
+                futuro.set_exception(e)
+            return futuro
+
+        with self._lock:
+            if self._thread_escrita is None:
+                self._thread_escrita = threading.Thread(
+                    target=self._atender_fila, args=(self._fila_escrita,), name="escritor-sqlite", daemon=True
+                )
+                self._thread_escrita.start()
+            fila = self._fila_escrita
+        pedido = _Pedido(funcao, args, futuro, sozinho)
+        try:
+            fila.put_nowait(pedido)
+        except queue.Full:
+            # Back-pressure: quem escreve espera o escritor abrir espaço
+            with self._lock:
+                self._filas_cheias += 1
+            try:
+                fila.put(pedido, timeout=self.timeout_espera)
+            except queue.Full:
+                raise sqlite3.OperationalError(
+                    f"Fila de escrita cheia ({self.max_fila} pedidos pendentes)"
+                ) from None
+        return futuro
+
+    def executar_escrita(self, sql, params=()):
+        """Enfileira um comando; o `Future` traz `ResultadoEscrita(lastrowid, rowcount)`"""
+        return self.enfileirar(_executar_comando, sql, params)
+
+    @staticmethod
+    def _aplicar(conn, funcao, args):
+        """Roda um pedido num SAVEPOINT: se falhar, só ele é desfeito"""
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        conn.execute("SAVEPOINT pedido")
+        try:
+            resultado = funcao(conn, *args)
+        except BaseException:
+            # Interrupções e erros graves já desfazem a transação inteira
+            if conn.in_transaction:
+                conn.execute("ROLLBACK TO pedido")
+                conn.execute("RELEASE pedido")
+            raise
+        conn.execute("RELEASE pedido")
+        return resultado
+
+    def _atender_fila(self, fila):
+        adiado = None
+        while True:
+            lote, adiado = self._proximo_lote(fila, adiado)
+            if lote is None:
+                return
+            self._gravar_lote(lote)
+
+    def _proximo_lote(self, fila, adiado):
+        """O próximo pedido e os que já estiverem esperando, até `max_lote`
+
+        Retorna `(lote, adiado)`: o pedido que não coube no lote fica para o
+        próximo. O lote é None quando a fila chegou ao `_PARAR`.
+        """
+        primeiro = adiado or fila.get()
+        if primeiro is _PARAR:
+            return None, None
+        lote = [primeiro]
+        while not primeiro.sozinho and len(lote) < self.max_lote:
+            try:
+                pedido = fila.get_nowait()
+            except queue.Empty:
+                break
+            if pedido is _PARAR or pedido.sozinho:
+                return lote, pedido
+            lote.append(pedido)
+        return lote, None
+
+    def _parar_escritor(self):
+        """Grava os pedidos já enfileirados e encerra a thread de escrita
+
+        A fila é trocada por uma nova: pedidos feitos depois disso sobem outra
+        thread. Os que ainda chegarem na fila antiga depois do `_PARAR`
+        recebem erro em vez de esperar para sempre.
+        """
+        with self._lock:
+            thread, fila = self._thread_escrita, self._fila_escrita
+            if thread is None or thread is threading.current_thread() or getattr(self._local, "profundidade", 0):
+                # Chamado com o lock de escrita: esperar a thread seria um deadlock
+                return
+            self._thread_escrita = None
+            self._fila_escrita = queue.Queue(maxsize=self.max_fila)
+        fila.put(_PARAR)
+        thread.join()
+        while True:
+            try:
+                pedido = fila.get_nowait()
+            except queue.Empty:
+                break
+            if pedido is not _PARAR and pedido.futuro.set_running_or_notify_cancel():
+                pedido.futuro.set_exception(sqlite3.OperationalError("Gerenciador de conexões fechado"))
+
+    def _gravar_lote(self, lote):
+        """Grava os pedidos numa transação e resolve os Futures depois do COMMIT"""
+        lote = [pedido for pedido in lote if pedido.futuro.set_running_or_notify_cancel()]
+        if not lote:
+            return
+        respostas = []  # (futuro, erro, resultado)
+        try:
+            with self._escritor_exclusivo():
+                conn = self._obter_escritor()
+                try:
+                    for pedido in lote:
+                        try:
+                            respostas.append((pedido.futuro, None, self._aplicar(conn, pedido.funcao, pedido.args)))
+                        except Exception as e:
+                            if not conn.in_transaction:
+                                # O SQLite desfez a transação: os pedidos anteriores também se perderam
+                                perdido = sqlite3.OperationalError(f"Transação desfeita por erro em outro pedido: {e}")
+                                respostas = [(futuro, erro or perdido, None) for futuro, erro, _ in respostas]
+                            respostas.append((pedido.futuro, e, None))
+                    if conn.in_transaction:
+                        conn.commit()
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    raise
+                finally:
+                    self._versao_escrita += 1
+        except Exception as e:
+            # Sem COMMIT nada foi gravado
+            for pedido in lote:
+                pedido.futuro.set_exception(e)
+            return
+
+        with self._lock:
+            self._lotes += 1
+            self._pedidos += len(lote)
+            self._maior_lote = max(self._maior_lote, len(lote))
+        for futuro, erro, resultado in respostas:
+            if erro is None:
+                futuro.set_result(resultado)
+            else:
+                futuro.set_exception(erro)
+
+    def versao_dados(self):
+        """Retorna uma chave que muda sempre que o banco pode ter sido alterado
+
+        Combina o contador de escritas deste processo com o `PRAGMA data_version`
+        de uma conexão sentinela, que muda quando qualquer outra conexão (o
+        escritor, um leitor que fez commit, a CLI, outro processo) altera o
+        arquivo. Não usa o lock de escrita, então não espera importações,
+        restaurações nem os lotes da fila de escrita.
+        """
+        if self._sentinela is None:
+            # Só na primeira vez: o escritor aplica as migrações e ativa o WAL
+            with self._escritor_exclusivo():
+                self._obter_escritor()
+        with self._lock_sentinela:
+            if self._sentinela is None:
+                self._sentinela = self._abrir()
+            versao_externa = self._sentinela.execute("PRAGMA data_version").fetchone()[0]
+        return (self._geracao, self._versao_escrita, versao_externa)
+
+    @contextmanager
+    def leitura(self):
+        """Empresta uma conexão de leitura do pool e a devolve na saída"""
+        conn, geracao = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn, geracao)
+
+    def _checkout(self):
+        with self._lock:
+            self._checkouts += 1
+            geracao = self._geracao
+            try:
+                conn = self._leitores_livres.get_nowait()
+                self._reusos += 1
+                self._leitores_em_uso += 1
+                return conn, geracao
+            except queue.Empty:
+                pode_abrir = self._leitores_abertos < self.max_leitores
+                if pode_abrir:
+                    self._leitores_abertos += 1
+                    self._leitores_em_uso += 1
+
+        if pode_abrir:
+            # O escritor é aberto antes para que o modo WAL já esteja ativo
+            with self._escritor_exclusivo():
+                self._obter_escritor()
+            try:
+                return self._abrir(), geracao
+            except BaseException:
+                with self._lock:
+                    self._leitores_abertos -= 1
+                    self._leitores_em_uso -= 1
+                raise
+
+        # Pool esgotado: aguarda alguma sessão devolver uma conexão
+        try:
+            conn = self._leitores_livres.get(timeout=self.timeout_espera)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Pool de conexões esgotado ({self.max_leitores} leitores em uso)"
+            ) from None
+        with self._lock:
+            self._esperas += 1
+            self._reusos += 1
+            self._leitores_em_uso += 1
+            return conn, self._geracao
+
+    def _checkin(self, conn, geracao):
+        # Conexões com transação pendente não voltam para o pool nesse estado
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            geracao = -1
+
+        with self._lock:
+            self._leitores_em_uso -= 1
+            if geracao == self._geracao:
+                self._leitores_livres.put_nowait(conn)
+                return
+            self._leitores_abertos -= 1
+        conn.close()
+
+    def fechar(self):
+        """Fecha todas as conexões ociosas (ex.: antes de apagar o arquivo do banco)
+
+        Antes, a thread de escrita grava os pedidos já enfileirados e termina.
+        Conexões emprestadas no momento são fechadas quando forem devolvidas.
+        O gerenciador continua utilizável e reabre conexões (e a thread de
+        escrita) sob demanda.
+        """
+        self._parar_escritor()
+        with self._escritor_exclusivo():
+            if self._escritor is not None:
+                self._escritor.close()
+                self._escritor = None
+            with self._lock_sentinela:
+                if self._sentinela is not None:
+                    self._sentinela.close()
+                    self._sentinela = None
+            with self._lock:
+                self._geracao += 1
+                while True:
+                    try:
+                        conn = self._leitores_livres.get_nowait()
+                    except queue.Empty:
+                        break
+                    self._leitores_abertos -= 1
+                    conn.close()
+
+    def estatisticas(self):
+        """Retorna um dicionário com o estado atual do pool"""
+        with self._lock:
+            escritor_aberto = 1 if self._escritor is not None else 0
+            return {
+                "conexoes_abertas": self._leitores_abertos + escritor_aberto,
+                "leitores_abertos": self._leitores_abertos,
+                "leitores_em_uso": self._leitores_em_uso,
+                "leitores_ociosos": self._leitores_livres.qsize(),
+                "max_leitores": self.max_leitores,
+                "checkouts": self._checkouts,
+                "reusos": self._reusos,
+                "esperas": self._esperas,
+                "taxa_acerto": self._reusos / self._checkouts if self._checkouts else 0.0,
+                "esperas_escrita": self._esperas_escrita,
+                "espera_escrita_ms": self._tempo_espera_escrita * 1000,
+                "fila_escrita": self._fila_escrita.qsize(),
+                "max_fila": self.max_fila,
+                "lotes_escrita": self._lotes,
+                "pedidos_escrita": self._pedidos,
+                "media_lote": self._pedidos / self._lotes if self._lotes else 0.0,
+                "maior_lote": self._maior_lote,
+                "filas_cheias": self._filas_cheias,
+            }
+
+
+def _executar_comando(conn, sql, params):
+    cursor = conn.execute(sql, params or ())
+    try:
+        return ResultadoEscrita(cursor.lastrowid, cursor.rowcount)
+    finally:
+        cursor.close()
@@ -0,0 +1,326 @@
+"""Consultas SQL usadas pelas páginas do app
+
+Ficam num só lugar para que o relatório de planos de execução
+(`getanuncio.migracoes.planos_consultas`) verifique exatamente o SQL que o
+app executa.
+"""
+
+SQL_LISTAR_FABRICANTES = (
+    "SELECT id, nome, unixepoch(data_criacao) as data_criacao "
+    "FROM fabricantes ORDER BY nome"
+)
+
+SQL_LISTAR_MODELOS = """
+    SELECT mi.id, mi.nome, f.nome as fabricante,
+           unixepoch(mi.data_criacao) as data_criacao
+    FROM modelos_impressora mi
+    JOIN fabricantes f ON mi.fabricante_id = f.id
+    ORDER BY mi.nome
+"""
+
+SQL_LISTAR_CORES = (
+    "SELECT id, nome, codigo_hex, unixepoch(data_criacao) as data_criacao "
+    "FROM cores_referencia ORDER BY nome"
+)
+
+SQL_LISTAR_CAPACIDADES = (
+    "SELECT id, capacidade_ml, unixepoch(data_criacao) as data_criacao "
+    "FROM capacidades ORDER BY capacidade_ml"
+)
+
+# Contagens e agregados do Dashboard vêm do resumo `estatisticas_catalogo`,
+# mantido por triggers (migração 0009): leituras pela chave primária, sem
+# varrer o catálogo
+SQL_CONTAR_CARTUCHOS = (
+    "SELECT quantidade as total FROM estatisticas_catalogo WHERE dimensao = 'tabela' AND chave = 'cartuchos'"
+)
+
+SQL_CARTUCHOS_POR_COR = """
+    SELECT cr.nome as cor, e.quantidade
+    FROM estatisticas_catalogo e
+    JOIN cores_referencia cr ON cr.id = e.chave
+    WHERE e.dimensao = 'cor' AND e.quantidade > 0
+    ORDER BY e.quantidade DESC
+"""
+
+# Pelo índice parcial de quantidade: lê só as `limite` primeiras
+SQL_CARTUCHOS_POR_IMPRESSORA = """
+    SELECT mi.nome as modelo_impressora, f.nome as fabricante, e.quantidade
+    FROM estatisticas_catalogo e
+    JOIN modelos_impressora mi ON mi.id = e.chave
+    LEFT JOIN fabricantes f ON mi.fabricante_id = f.id
+    WHERE e.dimensao = 'impressora' AND e.quantidade > 0
+    ORDER BY e.quantidade DESC
+    LIMIT ?
+"""
+
+SQL_CONTAR_COMPATIBILIDADES = (
+    "SELECT quantidade as total FROM estatisticas_catalogo "
+    "WHERE dimensao = 'tabela' AND chave = 'cartucho_impressoras'"
+)
+
+SQL_ESTATISTICAS = """
+    SELECT
+        coalesce(sum(quantidade) FILTER (WHERE chave = 'fabricantes'), 0) as fabricantes,
+        coalesce(sum(quantidade) FILTER (WHERE chave = 'modelos_impressora'), 0) as modelos,
+        coalesce(sum(quantidade) FILTER (WHERE chave = 'cores_referencia'), 0) as cores,
+        coalesce(sum(quantidade) FILTER (WHERE chave = 'capacidades'), 0) as capacidades,
+        coalesce(sum(quantidade) FILTER (WHERE chave = 'cartuchos'), 0) as cartuchos,
+        coalesce(sum(quantidade) FILTER (WHERE chave = 'cartucho_capacidades'), 0) as associacoes,
+        coalesce(sum(quantidade) FILTER (WHERE chave = 'cartucho_impressoras'), 0) as compatibilidades
+    FROM estatisticas_catalogo
+    WHERE dimensao = 'tabela'
+"""
+
+# Tudo o que o Dashboard mostra numa consulta: (dimensão, chave, quantidade,
+# rótulo, fabricante). Itens de referência excluídos ficam com rótulo NULL.
+SQL_PAINEL = """
+    SELECT e.dimensao, e.chave, e.quantidade,
+           CASE e.dimensao WHEN 'cor' THEN cr.nome WHEN 'fabricante' THEN f.nome
+                           WHEN 'capacidade' THEN c.capacidade_ml ELSE e.chave END as rotulo,
+           NULL as fabricante
+    FROM estatisticas_catalogo e
+    LEFT JOIN cores_referencia cr ON e.dimensao = 'cor' AND cr.id = e.chave
+    LEFT JOIN fabricantes f ON e.dimensao = 'fabricante' AND f.id = e.chave
+    LEFT JOIN capacidades c ON e.dimensao = 'capacidade' AND c.id = e.chave
+    WHERE e.dimensao IN ('tabela', 'cor', 'fabricante', 'capacidade', 'dia')
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'impressora', e.chave, e.quantidade, mi.nome, fi.nome
+        FROM estatisticas_catalogo e
+        JOIN modelos_impressora mi ON mi.id = e.chave
+        LEFT JOIN fabricantes fi ON mi.fabricante_id = fi.id
+        WHERE e.dimensao = 'impressora' AND e.quantidade > 0
+        ORDER BY e.quantidade DESC
+        LIMIT ?
+    )
+"""
+
+# Tabelas do usuário, sem as tabelas internas do FTS5
+SQL_LISTAR_TABELAS = (
+    "SELECT name FROM pragma_table_list "
+    "WHERE schema = 'main' AND type != 'shadow' AND name != 'sqlite_schema' ORDER BY name"
+)
+
+# Impressoras compatíveis de um cartucho: busca pela PK de cartucho_impressoras
+SQL_IMPRESSORAS_DO_CARTUCHO = """
+    SELECT mi.id, mi.nome as modelo_impressora, f.nome as fabricante
+    FROM cartucho_impressoras ci
+    JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+    LEFT JOIN fabricantes f ON mi.fabricante_id = f.id
+    WHERE ci.cartucho_id = ?
+    ORDER BY mi.nome
+"""
+
+SQL_FILTRO_CARTUCHOS_BASE = """
+    SELECT
+        c.modelo_cartucho,
+        c.codigo_referencia,
+        cr.nome as cor,
+        (SELECT GROUP_CONCAT(mi.nome, ', ')
+           FROM cartucho_impressoras ci
+           JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+          WHERE ci.cartucho_id = c.id) as impressoras,
+        (SELECT GROUP_CONCAT(DISTINCT f.nome)
+           FROM cartucho_impressoras ci
+           JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+           JOIN fabricantes f ON mi.fabricante_id = f.id
+          WHERE ci.cartucho_id = c.id) as fabricantes,
+        (SELECT GROUP_CONCAT(cap.capacidade_ml)
+           FROM cartucho_capacidades cc
+           JOIN capacidades cap ON cc.capacidade_id = cap.id
+          WHERE cc.cartucho_id = c.id) as capacidades
+    FROM cartuchos c
+    LEFT JOIN cores_referencia cr ON c.cor_id = cr.id
+"""
+
+
+def montar_filtro_cartuchos(cor=None, fabricante=None, capacidade_ml=None, modelo_impressora_id=None):
+    """Monta a consulta completa (sem paginação) da página de Consultas; retorna (sql, parâmetros)"""
+    condicoes, params = condicoes_filtro_cartuchos(cor, fabricante, capacidade_ml, modelo_impressora_id)
+    where = f" WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return f"{SQL_FILTRO_CARTUCHOS_BASE}{where} ORDER BY c.modelo_cartucho", params
+
+
+# Ordenações da listagem paginada: nome -> (expressão da chave, descendente).
+# Toda ordenação termina em c.id, que desempata e torna a chave única.
+ORDENACOES_CARTUCHOS = {
+    "modelo_asc": ("c.modelo_cartucho", False),
+    "modelo_desc": ("c.modelo_cartucho", True),
+    "recentes": ("c.id", True),
+    "antigos": ("c.id", False),
+}
+
+SQL_DETALHAR_PAGINA = """
+    SELECT
+        pagina.id,
+        pagina.modelo_cartucho,
+        pagina.codigo_referencia,
+        cr.nome as cor,
+        (SELECT GROUP_CONCAT(mi.nome, ', ')
+           FROM cartucho_impressoras ci
+           JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+          WHERE ci.cartucho_id = pagina.id) as impressoras,
+        (SELECT GROUP_CONCAT(DISTINCT f.nome)
+           FROM cartucho_impressoras ci
+           JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+           JOIN fabricantes f ON mi.fabricante_id = f.id
+          WHERE ci.cartucho_id = pagina.id) as fabricantes,
+        (SELECT GROUP_CONCAT(cap.capacidade_ml)
+           FROM cartucho_capacidades cc
+           JOIN capacidades cap ON cc.capacidade_id = cap.id
+          WHERE cc.cartucho_id = pagina.id) as capacidades,
+        unixepoch(pagina.data_criacao) as data_criacao,
+        pagina.chave
+    FROM pagina
+    LEFT JOIN cores_referencia cr ON pagina.cor_id = cr.id
+"""
+
+
+def _condicoes_por_filtro(cor=None, fabricante=None, capacidade_ml=None, modelo_impressora_id=None):
+    """Condição SQL e parâmetro de cada filtro informado, por nome do filtro"""
+    condicoes = {}
+
+    if cor is not None:
+        # Subconsulta escalar: avaliada uma vez, depois busca no índice de cor_id
+        condicoes["cor"] = ("c.cor_id = (SELECT id FROM cores_referencia WHERE nome = ?)", cor)
+
+    if fabricante is not None:
+        condicoes["fabricante"] = (
+            "EXISTS (SELECT 1 FROM cartucho_impressoras ci "
+            "JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id "
+            "WHERE ci.cartucho_id = c.id "
+            "AND mi.fabricante_id = (SELECT id FROM fabricantes WHERE nome = ?))",
+            fabricante,
+        )
+
+    if modelo_impressora_id is not None:
+        # Consulta reversa, em geral seletiva: parte do índice (modelo_impressora_id, cartucho_id)
+        condicoes["modelo_impressora_id"] = (
+            "c.id IN (SELECT cartucho_id FROM cartucho_impressoras WHERE modelo_impressora_id = ?)",
+            modelo_impressora_id,
+        )
+
+    if capacidade_ml is not None:
+        # Semi-junção pela PK (cartucho_id, capacidade_id): uma busca por cartucho
+        condicoes["capacidade_ml"] = (
+            "EXISTS (SELECT 1 FROM cartucho_capacidades cc WHERE cc.cartucho_id = c.id "
+            "AND cc.capacidade_id = (SELECT id FROM capacidades WHERE capacidade_ml = ?))",
+            capacidade_ml,
+        )
+
+    return condicoes
+
+
+def condicoes_filtro_cartuchos(cor=None, fabricante=None, capacidade_ml=None, modelo_impressora_id=None):
+    """Condições sobre `cartuchos c` para os filtros da página de Consultas
+
+    Retorna (lista de condições SQL, parâmetros). Cada filtro é uma
+    semi-junção (EXISTS ou IN) que não multiplica as linhas de cartuchos, para
+    que a paginação e a contagem leiam só `cartuchos` e as colunas agregadas
+    (capacidades, impressoras) continuem completas.
+    """
+    condicoes = _condicoes_por_filtro(cor, fabricante, capacidade_ml, modelo_impressora_id)
+    return [sql for sql, _ in condicoes.values()], [param for _, param in condicoes.values()]
+
+
+# Facetas: numa só consulta, cada filtro vira uma coluna ok_* e cada
+# faceta conta os cartuchos que passam nos *outros* filtros, para que as
+# demais opções do mesmo seletor continuem com contagem. NOT MATERIALIZED:
+# reler o índice de cartuchos em cada ramo sai mais barato que gravar e
+# reler a tabela temporária.
+SQL_FACETAS_CARTUCHOS = """
+    WITH filtrados AS NOT MATERIALIZED (
+        SELECT c.id, c.cor_id, {ok_cor} as ok_cor, {ok_fabricante} as ok_fabricante,
+               {ok_capacidade} as ok_capacidade
+        FROM cartuchos c{where}
+    )
+    SELECT 'cor' as faceta, cr.nome as valor, COUNT(*) as quantidade
+    FROM filtrados
+    JOIN cores_referencia cr ON cr.id = filtrados.cor_id
+    WHERE ok_fabricante AND ok_capacidade
+    GROUP BY cr.nome
+    UNION ALL
+    SELECT 'fabricante', f.nome, COUNT(DISTINCT filtrados.id)
+    FROM filtrados
+    JOIN cartucho_impressoras ci ON ci.cartucho_id = filtrados.id
+    JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+    JOIN fabricantes f ON mi.fabricante_id = f.id
+    WHERE ok_cor AND ok_capacidade
+    GROUP BY f.nome
+    UNION ALL
+    SELECT 'capacidade_ml', cap.capacidade_ml, COUNT(*)
+    FROM filtrados
+    JOIN cartucho_capacidades cc ON cc.cartucho_id = filtrados.id
+    JOIN capacidades cap ON cc.capacidade_id = cap.id
+    WHERE ok_cor AND ok_fabricante
+    GROUP BY cap.capacidade_ml
+"""
+
+
+def montar_facetas_cartuchos(cor=None, fabricante=None, capacidade_ml=None, modelo_impressora_id=None):
+    """Contagens por cor, fabricante e capacidade sob os filtros, numa só passada; retorna (sql, parâmetros)
+
+    Cada linha é (faceta, valor, quantidade). O filtro por impressora não tem
+    faceta e restringe todas.
+    """
+    condicoes = _condicoes_por_filtro(cor, fabricante, capacidade_ml, modelo_impressora_id)
+    colunas = {}
+    params = []
+    for nome, coluna in (("cor", "ok_cor"), ("fabricante", "ok_fabricante"), ("capacidade_ml", "ok_capacidade")):
+        if nome in condicoes:
+            sql, param = condicoes[nome]
+            colunas[coluna] = sql
+            params.append(param)
+        else:
+            colunas[coluna] = "1"
+    where = ""
+    if "modelo_impressora_id" in condicoes:
+        sql, param = condicoes["modelo_impressora_id"]
+        where = f" WHERE {sql}"
+        params.append(param)
+    return SQL_FACETAS_CARTUCHOS.format(where=where, **colunas), params
+
+
+def montar_contagem_cartuchos(cor=None, fabricante=None, capacidade_ml=None, modelo_impressora_id=None):
+    """COUNT(*) dos cartuchos que passam nos filtros; retorna (sql, parâmetros)"""
+    condicoes, params = condicoes_filtro_cartuchos(cor, fabricante, capacidade_ml, modelo_impressora_id)
+    where = f" WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return f"SELECT COUNT(*) FROM cartuchos c{where}", params
+
+
+def montar_pagina_cartuchos(ordenacao="modelo_asc", tamanho=50, apos=None, antes=None, do_fim=False,
+                            cor=None, fabricante=None, capacidade_ml=None, modelo_impressora_id=None):
+    """Uma página da listagem de cartuchos por keyset; retorna (sql, parâmetros)
+
+    `apos`/`antes` são a chave (valor, id) da última/primeira linha da página
+    vista: a consulta continua a partir dela pelo índice, sem OFFSET. Com
+    `antes` ou `do_fim` a página é buscada no sentido inverso (quem chama
+    reinverte as linhas). Só as linhas da página passam pelos JOINs de exibição.
+    """
+    expressao, descendente = ORDENACOES_CARTUCHOS[ordenacao]
+    condicoes, params = condicoes_filtro_cartuchos(cor, fabricante, capacidade_ml, modelo_impressora_id)
+
+    if antes is not None or do_fim:
+        descendente = not descendente
+    cursor = apos if apos is not None else antes
+    if cursor is not None:
+        operador = "<" if descendente else ">"
+        if expressao == "c.id":
+            condicoes.append(f"c.id {operador} ?")
+            params.append(cursor[1])
+        else:
+            condicoes.append(f"({expressao}, c.id) {operador} (?, ?)")
+            params.extend(cursor)
+
+    direcao = "DESC" if descendente else "ASC"
+    ordem = f"{expressao} {direcao}" if expressao == "c.id" else f"{expressao} {direcao}, c.id {direcao}"
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    sql = (
+        "WITH pagina AS ("
+        f"SELECT c.*, {expressao} as chave FROM cartuchos c {where} ORDER BY {ordem} LIMIT ?"
+        f"){SQL_DETALHAR_PAGINA}"
+        f"    ORDER BY pagina.chave {direcao}, pagina.id {direcao}"
+    )
+    params.append(tamanho)
+    return sql, params
@@ -0,0 +1,320 @@
+"""Execução protegida do SQL digitado pelo usuário (SQL Executor e consulta personalizada)
+
+Uma consulta roda numa conexão própria, aberta em `mode=ro` no modo somente
+leitura, e é lida em blocos de `fetchmany` até um teto de linhas, guardados
+como arrays Arrow (`MontadorTabela`): o resto fica no cursor e só é buscado
+quando pedido ("carregar mais"). Cada busca
+tem um prazo; o progress handler do SQLite confere o prazo e o pedido de
+cancelamento a cada `INSTRUCOES_POR_VERIFICACAO` instruções da VM e
+interrompe a consulta. As buscas rodam num pool pequeno de threads, o que
+também limita quantas consultas pesadas rodam ao mesmo tempo no servidor.
+
+Scripts com vários comandos são divididos com `sqlite3.complete_statement`
+e rodam numa única transação, desfeita inteira se algum comando falhar;
+cada comando devolve seu tempo, as linhas afetadas e, se produzir linhas,
+uma grade própria.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from getanuncio.resultados import MontadorTabela
+
+TEMPO_LIMITE_PADRAO = 5.0
+LINHAS_POR_BLOCO = 1000
+LIMITE_LINHAS = 100_000
+INSTRUCOES_POR_VERIFICACAO = 10_000
+CONSULTAS_SIMULTANEAS = 2
+
+_RE_COMENTARIO = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_RE_PRIMEIRA_PALAVRA = re.compile(r"\s*(\w+)")
+_RE_FIM_COMANDO = re.compile(r"(;)")
+# Comandos que certamente só leem (WITH pode terminar em INSERT/UPDATE/DELETE)
+COMANDOS_LEITURA = {"SELECT", "VALUES", "EXPLAIN"}
+# O script já roda numa transação; VACUUM não roda dentro de uma
+COMANDOS_PROIBIDOS_SCRIPT = {"BEGIN", "COMMIT", "END", "ROLLBACK", "VACUUM"}
+
+ResultadoComando = namedtuple(
+    "ResultadoComando", ["sql", "colunas", "linhas", "truncado", "linhas_afetadas", "duracao", "plano"]
+)
+
+_pool = ThreadPoolExecutor(max_workers=CONSULTAS_SIMULTANEAS, thread_name_prefix="sql-executor")
+
+
+class ErroExecucao(Exception):
+    """Consulta interrompida (prazo esgotado ou cancelada) ou recusada"""
+
+
+class ErroScript(ErroExecucao):
+    """Comando de um script que falhou; a transação inteira foi desfeita"""
+
+    def __init__(self, indice, sql, erro, resultados):
+        super().__init__(f"Comando {indice + 1}: {erro}")
+        self.indice = indice
+        self.sql = sql
+        self.erro = erro
+        self.resultados = resultados
+
+
+def comando_principal(sql):
+    """Primeira palavra do comando, em maiúsculas, ignorando comentários ('' se vazio)"""
+    encontrado = _RE_PRIMEIRA_PALAVRA.match(_RE_COMENTARIO.sub(" ", sql))
+    return encontrado.group(1).upper() if encontrado else ""
+
+
+def e_leitura(sql):
+    """O comando certamente só lê (SELECT, VALUES, EXPLAIN)?"""
+    return comando_principal(sql) in COMANDOS_LEITURA
+
+
+def dividir_comandos(texto):
+    """Divide um script em comandos completos, pelo `sqlite3.complete_statement`
+
+    Pontos e vírgulas dentro de textos, comentários e corpos de trigger não
+    separam comandos. Trechos só com comentários ou espaços são descartados;
+    o último comando pode vir sem ponto e vírgula.
+    """
+    comandos = []
+    atual = ""
+    for parte in _RE_FIM_COMANDO.split(texto):
+        atual += parte
+        if parte == ";" and sqlite3.complete_statement(atual):
+            if comando_principal(atual):
+                comandos.append(atual.strip())
+            atual = ""
+    if comando_principal(atual):
+        comandos.append(atual.strip())
+    return comandos
+
+
+def abrir_somente_leitura(db_path):
+    """Conexão `mode=ro`: o SQLite recusa qualquer escrita feita por ela"""
+    uri = f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only = 1")
+    return conn
+
+
+class _Prazo:
+    """Progress handler: interrompe quando o prazo acaba ou o cancelamento é pedido"""
+
+    def __init__(self):
+        self.limite = None
+        self.cancelado = threading.Event()
+        self.esgotado = False
+
+    def iniciar(self, segundos):
+        self.limite = time.monotonic() + segundos
+        self.esgotado = False
+
+    def __call__(self):
+        if self.cancelado.is_set():
+            return 1
+        if self.limite is not None and time.monotonic() > self.limite:
+            self.esgotado = True
+            return 1
+        return 0
+
+
+class ExecucaoProtegida:
+    """Consulta aberta num cursor próprio, lida em blocos com prazo e cancelamento
+
+    O cursor fica aberto entre as buscas ("carregar mais") e é fechado ao
+    chegar ao fim, ao atingir `limite_linhas` ou em `fechar()`.
+    """
+
+    def __init__(self, db_path, sql, params=None, tempo_limite=TEMPO_LIMITE_PADRAO,
+                 limite_linhas=LIMITE_LINHAS):
+        self.sql = sql
+        self.params = params
+        self.tempo_limite = tempo_limite
+        self.limite_linhas = limite_linhas
+        self.colunas = []
+        self.terminada = False
+        self.truncada = False           # parou no teto de linhas, pode haver mais
+        self.duracao_execucao = None   # execute() até a primeira linha disponível
+        self.duracao_busca = 0.0       # soma dos fetchmany
+        self._prazo = _Prazo()
+        self._lock = threading.Lock()
+        self._cursor = None
+        self._montador = MontadorTabela([])
+        self._conn = abrir_somente_leitura(db_path)
+        self._conn.set_progress_handler(self._prazo, INSTRUCOES_POR_VERIFICACAO)
+
+    @property
+    def linhas_buscadas(self):
+        """Quantas linhas já foram buscadas"""
+        return self._montador.linhas
+
+    @property
+    def memoria_estimada(self):
+        """Bytes dos arrays Arrow com as linhas já buscadas"""
+        return self._montador.nbytes
+
+    def tabela(self):
+        """As linhas já buscadas como `pyarrow.Table`"""
+        return self._montador.tabela()
+
+    def buscar(self, max_linhas=LINHAS_POR_BLOCO):
+        """Busca até `max_linhas` novas linhas dentro do prazo; retorna quantas vieram"""
+        with self._lock:
+            if self.terminada or self._conn is None:
+                return 0
+            self._prazo.iniciar(self.tempo_limite)
+            try:
+                if self._cursor is None:
+                    inicio = time.perf_counter()
+                    self._cursor = self._conn.execute(self.sql, self.params or ())
+                    self.colunas = [d[0] for d in self._cursor.description or ()]
+                    self._montador = MontadorTabela(self.colunas)
+                    self.duracao_execucao = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                restante = self.limite_linhas - self.linhas_buscadas
+                pedido = min(max_linhas, restante)
+                bloco = self._cursor.fetchmany(pedido)
+                no_teto = len(bloco) == restante
+                # No teto, uma linha a mais diz se o resultado foi cortado
+                sobrou = no_teto and self._cursor.fetchone() is not None
+                self.duracao_busca += time.perf_counter() - inicio
+            except sqlite3.OperationalError as e:
+                self._fechar_conexao()
+                self.terminada = True
+                if self._prazo.cancelado.is_set():
+                    raise ErroExecucao("Consulta cancelada") from None
+                if self._prazo.esgotado:
+                    raise ErroExecucao(f"Tempo limite de {self.tempo_limite:g}s excedido") from None
+                if "readonly" in str(e):
+                    raise ErroExecucao(f"Modo somente leitura: {e}") from None
+                raise
+            except BaseException:
+                self._fechar_conexao()
+                self.terminada = True
+                raise
+
+            self._montador.adicionar(bloco)
+            fim = len(bloco) < pedido or (no_teto and not sobrou)
+            self.truncada = sobrou
+            if fim or self.truncada:
+                # A conexão (e o snapshot de leitura que ela segura) é liberada
+                self._fechar_conexao()
+                self.terminada = True
+            return len(bloco)
+
+    def buscar_em_segundo_plano(self, max_linhas=LINHAS_POR_BLOCO):
+        """Agenda `buscar` no pool de consultas; retorna o Future"""
+        return _pool.submit(self.buscar, max_linhas)
+
+    def cancelar(self):
+        """Interrompe a busca em andamento (seguro a partir de outra thread)"""
+        self._prazo.cancelado.set()
+        conn = self._conn
+        if conn is not None:
+            conn.interrupt()
+
+    def fechar(self):
+        """Cancela o que estiver rodando e fecha o cursor e a conexão"""
+        self.cancelar()
+        with self._lock:
+            self._fechar_conexao()
+            self.terminada = True
+
+    def _fechar_conexao(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._cursor = None
+
+
+class ExecucaoScript:
+    """Vários comandos numa única transação, com prazo total e cancelamento
+
+    Na conexão de escrita a transação é confirmada no fim; na somente
+    leitura, sempre desfeita. Comandos que produzem linhas guardam até
+    `max_linhas` delas.
+    """
+
+    def __init__(self, comandos, tempo_limite=TEMPO_LIMITE_PADRAO, explicar=False,
+                 max_linhas=LINHAS_POR_BLOCO):
+        self.comandos = comandos
+        self.tempo_limite = tempo_limite
+        self.explicar = explicar
+        self.max_linhas = max_linhas
+        self._prazo = _Prazo()
+        self._conn = None
+
+    def executar(self, gerenciador, somente_leitura=True):
+        """Roda o script; retorna um `ResultadoComando` por comando ou levanta `ErroScript`"""
+        for indice, sql in enumerate(self.comandos):
+            if comando_principal(sql) in COMANDOS_PROIBIDOS_SCRIPT:
+                raise ErroScript(indice, sql, f"{comando_principal(sql)} não é permitido num script "
+                                 "(ele já roda numa transação)", [])
+        if somente_leitura:
+            conn = abrir_somente_leitura(gerenciador.db_path)
+            try:
+                return self._executar(conn, confirmar=False)
+            finally:
+                conn.close()
+        # Na fila de escrita, numa transação só do script: o escritor faz o COMMIT
+        # ou, se um comando falhar, desfaz tudo o que o script gravou
+        return gerenciador.enfileirar(self._executar, True, sozinho=True).result()
+
+    def _executar(self, conn, confirmar):
+        resultados = []
+        self._prazo.iniciar(self.tempo_limite)
+        self._conn = conn
+        conn.set_progress_handler(self._prazo, INSTRUCOES_POR_VERIFICACAO)
+        try:
+            if not confirmar:
+                conn.execute("BEGIN")
+            for indice, sql in enumerate(self.comandos):
+                try:
+                    resultados.append(self._executar_comando(conn, sql))
+                except sqlite3.Error as e:
+                    if not confirmar:
+                        conn.rollback()
+                    if self._prazo.cancelado.is_set():
+                        e = "script cancelado"
+                    elif self._prazo.esgotado:
+                        e = f"tempo limite de {self.tempo_limite:g}s excedido"
+                    raise ErroScript(indice, sql, e, resultados) from None
+            if not confirmar:
+                conn.rollback()
+            return resultados
+        except BaseException:
+            if not confirmar and conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+            self._conn = None
+
+    def _executar_comando(self, conn, sql):
+        plano = None
+        if self.explicar and comando_principal(sql) != "EXPLAIN":
+            plano = [detalhe for _, _, _, detalhe in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        inicio = time.perf_counter()
+        cursor = conn.execute(sql)
+        colunas = [d[0] for d in cursor.description] if cursor.description else []
+        linhas = cursor.fetchmany(self.max_linhas + 1) if colunas else []
+        afetadas = cursor.rowcount if cursor.rowcount >= 0 else None
+        cursor.close()
+        duracao = time.perf_counter() - inicio
+        return ResultadoComando(
+            sql, colunas, linhas[:self.max_linhas], len(linhas) > self.max_linhas, afetadas, duracao, plano
+        )
+
+    def executar_em_segundo_plano(self, gerenciador, somente_leitura=True):
+        """Agenda `executar` no pool de consultas; retorna o Future"""
+        return _pool.submit(self.executar, gerenciador, somente_leitura)
+
+    def cancelar(self):
+        """Interrompe o comando em andamento; o script é desfeito"""
+        self._prazo.cancelado.set()
+        conn = self._conn
+        if conn is not None:
+            conn.interrupt()
@@ -0,0 +1,243 @@
+"""Feed incremental de cartuchos para marketplaces
+
+Os triggers da migração 0006 mantêm em `alteracoes_cartuchos` uma linha
+por cartucho com o `seq` da última alteração (inserção, edição, exclusão ou
+mudança numa referência que ele usa). Cada feed guarda em `exportacoes_feed`
+o último `seq` publicado; a exportação lê só os cartuchos com `seq` acima
+dessa marca, dentro de uma transação de leitura, e grava direto no arquivo
+(CSV, JSONL ou XML, opcionalmente .gz). A marca só avança depois que o
+arquivo foi gravado por completo.
+
+Também pode ser usado pela linha de comando:
+
+    python -m getanuncio.feed feed.xml.gz --db cartuchos.db --nome mercado
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+FORMATOS_FEED = ("csv", "jsonl", "xml")
+FEED_PADRAO = "padrao"
+LINHAS_POR_BLOCO = 2000
+
+OPERACAO_NOVO = "novo"
+OPERACAO_ALTERADO = "alterado"
+OPERACAO_EXCLUIDO = "excluido"
+
+# Cartuchos alterados entre duas marcas, na ordem das alterações. Quem foi
+# criado depois da exportação anterior sai como novo.
+SQL_ALTERACOES_FEED = """
+    SELECT
+        CASE
+            WHEN a.excluido THEN 'excluido'
+            WHEN c.data_criacao > :desde THEN 'novo'
+            ELSE 'alterado'
+        END as operacao,
+        a.cartucho_id as id,
+        c.modelo_cartucho,
+        c.codigo_referencia,
+        cr.nome as cor,
+        cr.codigo_hex,
+        (SELECT GROUP_CONCAT(mi.nome, ', ')
+           FROM cartucho_impressoras ci
+           JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+          WHERE ci.cartucho_id = c.id) as impressoras,
+        (SELECT GROUP_CONCAT(DISTINCT f.nome)
+           FROM cartucho_impressoras ci
+           JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+           JOIN fabricantes f ON mi.fabricante_id = f.id
+          WHERE ci.cartucho_id = c.id) as fabricantes,
+        (SELECT GROUP_CONCAT(cap.capacidade_ml)
+           FROM cartucho_capacidades cc
+           JOIN capacidades cap ON cc.capacidade_id = cap.id
+          WHERE cc.cartucho_id = c.id) as capacidades,
+        c.data_criacao,
+        coalesce(c.data_atualizacao, a.data_alteracao) as data_atualizacao,
+        a.seq
+    FROM alteracoes_cartuchos a
+    LEFT JOIN cartuchos c ON c.id = a.cartucho_id
+    LEFT JOIN cores_referencia cr ON c.cor_id = cr.id
+    WHERE a.seq > :apos AND a.seq <= :ate
+      AND (a.excluido = 0 OR :incluir_excluidos)
+    ORDER BY a.seq
+"""
+
+SQL_MARCA_FEED = "SELECT ultima_seq, data_exportacao FROM exportacoes_feed WHERE nome = ?"
+SQL_ULTIMA_ALTERACAO = "SELECT coalesce(max(seq), 0), CURRENT_TIMESTAMP FROM alteracoes_cartuchos"
+SQL_CONTAR_PENDENTES = "SELECT COUNT(*) FROM alteracoes_cartuchos WHERE seq > ?"
+SQL_GRAVAR_MARCA = """
+    INSERT INTO exportacoes_feed (nome, ultima_seq, linhas, data_exportacao)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (nome) DO UPDATE SET
+        ultima_seq = excluded.ultima_seq,
+        linhas = excluded.linhas,
+        data_exportacao = excluded.data_exportacao
+    WHERE excluded.ultima_seq >= exportacoes_feed.ultima_seq
+"""
+
+MarcaFeed = namedtuple("MarcaFeed", ["nome", "ultima_seq", "data_exportacao"])
+
+ResultadoFeed = namedtuple(
+    "ResultadoFeed",
+    ["caminho", "formato", "novos", "alterados", "excluidos", "seq_inicial", "seq_final",
+     "tamanho_bytes", "duracao"]
+)
+
+COLUNAS_FEED = (
+    "operacao", "id", "modelo_cartucho", "codigo_referencia", "cor", "codigo_hex",
+    "impressoras", "fabricantes", "capacidades", "data_criacao", "data_atualizacao",
+)
+
+
+def marca_feed(conn, nome=FEED_PADRAO):
+    """Último `seq` publicado pelo feed `nome` (0 se nunca exportado)"""
+    linha = conn.execute(SQL_MARCA_FEED, (nome,)).fetchone()
+    return MarcaFeed(nome, *(linha or (0, None)))
+
+
+def contar_pendentes(conn, nome=FEED_PADRAO):
+    """Quantos cartuchos mudaram desde a última exportação do feed"""
+    return conn.execute(SQL_CONTAR_PENDENTES, (marca_feed(conn, nome).ultima_seq,)).fetchone()[0]
+
+
+def formato_do_feed(caminho):
+    """('csv', 'jsonl' ou 'xml', compactado?) pela extensão do arquivo"""
+    nome = caminho.lower()
+    compactado = nome.endswith(".gz")
+    if compactado:
+        nome = nome[:-3]
+    extensao = os.path.splitext(nome)[1].lstrip(".")
+    if extensao not in FORMATOS_FEED:
+        raise ValueError(f"Extensão não suportada: {caminho} (use .csv, .jsonl ou .xml, opcionalmente .gz)")
+    return extensao, compactado
+
+
+def _gravar_csv(saida, linhas):
+    escritor = csv.writer(saida)
+    escritor.writerow(COLUNAS_FEED)
+    for bloco in linhas:
+        escritor.writerows(bloco)
+
+
+def _gravar_jsonl(saida, linhas):
+    for bloco in linhas:
+        saida.write("".join(
+            json.dumps(dict(zip(COLUNAS_FEED, linha)), ensure_ascii=False) + "\n" for linha in bloco
+        ))
+
+
+def _gravar_xml(saida, linhas):
+    # xml.sax.saxutils puxa urllib/http.client: importado só quando há XML a gravar
+    from xml.sax.saxutils import escape, quoteattr
+
+    saida.write('<?xml version="1.0" encoding="UTF-8"?>\n<cartuchos>\n')
+    for bloco in linhas:
+        partes = []
+        for linha in bloco:
+            partes.append(f"  <cartucho operacao={quoteattr(linha[0])}>")
+            for coluna, valor in zip(COLUNAS_FEED[1:], linha[1:]):
+                if valor is not None:
+                    partes.append(f"<{coluna}>{escape(str(valor))}</{coluna}>")
+            partes.append("</cartucho>\n")
+        saida.write("".join(partes))
+    saida.write("</cartuchos>\n")
+
+
+GRAVADORES = {"csv": _gravar_csv, "jsonl": _gravar_jsonl, "xml": _gravar_xml}
+
+
+def exportar_feed(gerenciador, destino, nome=FEED_PADRAO, completo=False,
+                  linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Grava em `destino` os cartuchos alterados desde a última exportação do feed `nome`
+
+    Com `completo=True` o feed sai com o catálogo inteiro (sem exclusões).
+    Em ambos os casos a marca do feed avança até a última alteração lida.
+    """
+    inicio = time.perf_counter()
+    formato, compactado = formato_do_feed(destino)
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    parcial = destino + ".parcial"
+    contagem = {OPERACAO_NOVO: 0, OPERACAO_ALTERADO: 0, OPERACAO_EXCLUIDO: 0}
+
+    if compactado:
+        abrir = lambda caminho: gzip.open(caminho, "wt", encoding="utf-8", newline="", compresslevel=6)
+    else:
+        abrir = lambda caminho: open(caminho, "w", encoding="utf-8", newline="")
+
+    try:
+        with gerenciador.leitura() as conn, abrir(parcial) as saida:
+            # Transação de leitura: marca, alterações e dados do mesmo instante
+            conn.execute("BEGIN")
+            try:
+                marca = marca_feed(conn, nome)
+                seq_inicial = 0 if completo else marca.ultima_seq
+                seq_final, momento = conn.execute(SQL_ULTIMA_ALTERACAO).fetchone()
+                cursor = conn.execute(SQL_ALTERACOES_FEED, {
+                    "apos": seq_inicial, "ate": seq_final,
+                    "desde": "" if completo else (marca.data_exportacao or ""),
+                    "incluir_excluidos": 0 if completo else 1,
+                })
+
+                def blocos():
+                    while True:
+                        bloco = cursor.fetchmany(linhas_por_bloco)
+                        if not bloco:
+                            return
+                        for linha in bloco:
+                            contagem[linha[0]] += 1
+                        yield [linha[:-1] for linha in bloco]
+
+                GRAVADORES[formato](saida, blocos())
+            finally:
+                conn.rollback()
+        os.replace(parcial, destino)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+
+    # Só depois do arquivo completo a marca avança
+    with gerenciador.escrita() as conn:
+        conn.execute(SQL_GRAVAR_MARCA, (nome, seq_final, sum(contagem.values()), momento))
+
+    return ResultadoFeed(
+        destino, formato, contagem[OPERACAO_NOVO], contagem[OPERACAO_ALTERADO],
+        contagem[OPERACAO_EXCLUIDO], seq_inicial, seq_final, os.path.getsize(destino),
+        time.perf_counter() - inicio,
+    )
+
+
+def main(argv=None, prog=None):
+    """Ponto de entrada da linha de comando"""
+    from getanuncio.conexao import GerenciadorConexoes
+    from getanuncio.migracoes import migrar
+
+    parser = argparse.ArgumentParser(prog=prog, description="Exporta os cartuchos alterados desde o último feed")
+    parser.add_argument("saida", help="arquivo .csv, .jsonl ou .xml, opcionalmente .gz")
+    parser.add_argument("--db", default="cartuchos.db", help="arquivo do banco SQLite")
+    parser.add_argument("--nome", default=FEED_PADRAO, help="nome do feed (cada um tem sua marca)")
+    parser.add_argument("--completo", action="store_true", help="exporta o catálogo inteiro")
+    args = parser.parse_args(argv)
+
+    gerenciador = GerenciadorConexoes(args.db, ao_abrir_escritor=migrar)
+    try:
+        resultado = exportar_feed(gerenciador, args.saida, args.nome, completo=args.completo)
+    except (ValueError, OSError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+    finally:
+        gerenciador.fechar()
+
+    print(f"{resultado.novos} novos, {resultado.alterados} alterados, {resultado.excluidos} excluídos "
+          f"(seq {resultado.seq_inicial}→{resultado.seq_final}) em {resultado.duracao:.2f}s "
+          f"({resultado.tamanho_bytes / 1024:.1f} KB): {resultado.caminho}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
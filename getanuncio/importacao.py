@@ -0,0 +1,484 @@
+"""Importação em massa do catálogo a partir de planilhas CSV/XLSX
+
+O arquivo é lido em streaming e processado em lotes: fabricantes, modelos,
+cores e capacidades que ainda não existem são criados na hora (mapas
+nome→id em memória) e os cartuchos, suas impressoras compatíveis e
+capacidades são gravados com `executemany`, uma transação por lote. Linhas
+do mesmo cartucho (mesmo modelo, código e cor) para impressoras diferentes
+viram um único cartucho com várias impressoras, inclusive quando o
+cartucho já existe no banco. A coluna de impressora aceita várias,
+separadas por `;` ou `|`.
+
+Durante o lote os triggers de inserção ficam desligados (tabela
+`carga_em_lote`, ver a migração 0007): em vez de regravar o registro de
+alterações, o índice de busca e o resumo do Dashboard a cada linha, o lote
+os atualiza uma vez só para os cartuchos que criou ou que ganharam
+associações.
+
+Também pode ser usado pela linha de comando:
+
+    python -m getanuncio.importacao tabela.csv --db cartuchos.db --dry-run
+"""
+import argparse
+import csv
+import io
+import itertools
+import os
+import re
+import sys
+import time
+import unicodedata
+
+from getanuncio.catalogo import SQL_ASSOCIAR_CAPACIDADE, SQL_ASSOCIAR_IMPRESSORA, SQL_INSERIR_CARTUCHO
+
+TAMANHO_LOTE_PADRAO = 5000
+
+# Nome normalizado do cabeçalho -> campo interno
+ALIASES_COLUNAS = {
+    "modelo_cartucho": "modelo_cartucho",
+    "cartucho": "modelo_cartucho",
+    "modelo": "modelo_cartucho",
+    "codigo_referencia": "codigo_referencia",
+    "codigo": "codigo_referencia",
+    "referencia": "codigo_referencia",
+    "cor": "cor",
+    "codigo_hex": "codigo_hex",
+    "hex": "codigo_hex",
+    "modelo_impressora": "modelo_impressora",
+    "impressora": "modelo_impressora",
+    "fabricante": "fabricante",
+    "capacidades": "capacidades",
+    "capacidade": "capacidades",
+    "capacidade_ml": "capacidades",
+}
+COLUNAS_OBRIGATORIAS = ("modelo_cartucho", "cor", "modelo_impressora")
+
+_SEPARADOR_CAPACIDADES = re.compile(r"[;,|/\s]+")
+_SEPARADOR_IMPRESSORAS = re.compile(r"\s*[;|]\s*")
+
+# Cartucho já cadastrado pela chave natural (índice único ux_cartuchos_chave)
+SQL_BUSCAR_CARTUCHO = (
+    "SELECT id FROM cartuchos WHERE modelo_cartucho = ? "
+    "AND coalesce(codigo_referencia, '') = ? AND coalesce(cor_id, -1) = ?"
+)
+
+# Liga e desliga a carga em lote. O lote anota em tabelas temporárias os
+# cartuchos que afetou e as associações que de fato inseriu
+SQL_INICIAR_CARGA = "INSERT INTO carga_em_lote (ativa) VALUES (1)"
+SQL_CRIAR_TABELAS_LOTE = (
+    "CREATE TEMP TABLE IF NOT EXISTS cartuchos_lote (id INTEGER PRIMARY KEY, novo INTEGER NOT NULL)",
+    "CREATE TEMP TABLE IF NOT EXISTS impressoras_lote "
+    "(cartucho_id INTEGER, modelo_impressora_id INTEGER, PRIMARY KEY (cartucho_id, modelo_impressora_id))",
+    "CREATE TEMP TABLE IF NOT EXISTS capacidades_lote "
+    "(cartucho_id INTEGER, capacidade_id INTEGER, PRIMARY KEY (cartucho_id, capacidade_id))",
+)
+SQL_ENCERRAR_CARGA = (
+    # O que os triggers de inserção da 0007, da 0008 e da 0009 fariam linha a linha
+    "UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP WHERE id IN (SELECT id FROM temp.cartuchos_lote)",
+    "INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido) "
+    "SELECT id, 0 FROM temp.cartuchos_lote ORDER BY id",
+    "DELETE FROM busca_cartuchos WHERE rowid IN (SELECT id FROM temp.cartuchos_lote)",
+    "INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor) "
+    "SELECT * FROM documentos_busca WHERE id IN (SELECT id FROM temp.cartuchos_lote)",
+    # Resumo do Dashboard: soma a contribuição do lote; um cartucho passa a
+    # contar para o fabricante se não tinha impressora dele antes do lote
+    """INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+    SELECT 'tabela', 'cartuchos', COUNT(*) FROM temp.cartuchos_lote WHERE novo
+    UNION ALL SELECT 'tabela', 'cartucho_impressoras', COUNT(*) FROM temp.impressoras_lote
+    UNION ALL SELECT 'tabela', 'cartucho_capacidades', COUNT(*) FROM temp.capacidades_lote
+    UNION ALL SELECT 'cor', c.cor_id, COUNT(*) FROM temp.cartuchos_lote l JOIN cartuchos c ON c.id = l.id
+        WHERE l.novo AND c.cor_id IS NOT NULL GROUP BY c.cor_id
+    UNION ALL SELECT 'dia', date(c.data_criacao), COUNT(*) FROM temp.cartuchos_lote l JOIN cartuchos c ON c.id = l.id
+        WHERE l.novo AND date(c.data_criacao) IS NOT NULL GROUP BY date(c.data_criacao)
+    UNION ALL SELECT 'impressora', modelo_impressora_id, COUNT(*) FROM temp.impressoras_lote
+        GROUP BY modelo_impressora_id
+    UNION ALL SELECT 'capacidade', capacidade_id, COUNT(*) FROM temp.capacidades_lote GROUP BY capacidade_id
+    UNION ALL SELECT 'fabricante', fabricante_id, COUNT(*) FROM (
+        SELECT DISTINCT l.cartucho_id, mi.fabricante_id
+        FROM temp.impressoras_lote l JOIN modelos_impressora mi ON mi.id = l.modelo_impressora_id
+        WHERE mi.fabricante_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM cartucho_impressoras ci
+            JOIN modelos_impressora outro ON outro.id = ci.modelo_impressora_id
+            WHERE ci.cartucho_id = l.cartucho_id AND outro.fabricante_id = mi.fabricante_id
+              AND (ci.cartucho_id, ci.modelo_impressora_id) NOT IN (SELECT * FROM temp.impressoras_lote)
+        )
+    ) GROUP BY fabricante_id
+    ON CONFLICT (dimensao, chave) DO UPDATE SET quantidade = quantidade + excluded.quantidade""",
+    "DROP TABLE temp.cartuchos_lote",
+    "DROP TABLE temp.impressoras_lote",
+    "DROP TABLE temp.capacidades_lote",
+    "DELETE FROM carga_em_lote",
+)
+
+
+class ErroImportacao(Exception):
+    """Erro que impede a importação do arquivo inteiro (formato, cabeçalho)"""
+
+
+class ResumoImportacao:
+    """Contadores e relatório de erros de uma importação"""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.linhas_lidas = 0
+        self.cartuchos_inseridos = 0
+        self.linhas_mescladas = 0  # linhas somadas a um cartucho já existente (no banco ou no arquivo)
+        self.associacoes_inseridas = 0
+        self.compatibilidades_inseridas = 0
+        self.criados = {"fabricantes": 0, "modelos": 0, "cores": 0, "capacidades": 0}
+        self.erros = []  # (linha do arquivo, mensagem)
+        self.inicio = time.perf_counter()
+        self.duracao = 0.0
+
+    @property
+    def linhas_por_segundo(self):
+        return self.linhas_lidas / self.duracao if self.duracao else 0.0
+
+    def relatorio_erros_csv(self):
+        """Relatório de erros por linha em CSV (texto)"""
+        saida = io.StringIO()
+        escritor = csv.writer(saida)
+        escritor.writerow(["linha", "erro"])
+        escritor.writerows(self.erros)
+        return saida.getvalue()
+
+
+def _normalizar_coluna(nome):
+    nome = unicodedata.normalize("NFKD", (nome or "").strip().lower())
+    nome = nome.encode("ascii", "ignore").decode("ascii")
+    nome = re.sub(r"[^a-z0-9]+", "_", nome).strip("_")
+    return ALIASES_COLUNAS.get(nome)
+
+
+def _mapear_cabecalho(cabecalho):
+    mapa = {}
+    for posicao, nome in enumerate(cabecalho):
+        campo = _normalizar_coluna(nome)
+        if campo and campo not in mapa:
+            mapa[campo] = posicao
+    faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in mapa]
+    if faltando:
+        raise ErroImportacao(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+    return mapa
+
+
+def _linhas_csv(arquivo):
+    # O separador (vírgula, ponto e vírgula ou tab) é o mais frequente no cabeçalho
+    cabecalho = arquivo.readline()
+    separador = max(",;\t", key=cabecalho.count)
+    return csv.reader(itertools.chain([cabecalho], arquivo), delimiter=separador)
+
+
+def _linhas_xlsx(arquivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErroImportacao("Importar XLSX requer o pacote 'openpyxl' (pip install openpyxl)") from None
+    # read_only percorre a planilha sem carregá-la inteira na memória
+    pasta = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        for valores in pasta.worksheets[0].iter_rows(values_only=True):
+            yield ["" if v is None else str(v) for v in valores]
+    finally:
+        pasta.close()
+
+
+def ler_registros(arquivo, formato):
+    """Gera (número da linha, dict) para cada linha de dados do arquivo
+
+    `arquivo` é um caminho ou um arquivo binário aberto; `formato` é 'csv' ou 'xlsx'.
+    """
+    if formato not in ("csv", "xlsx"):
+        raise ErroImportacao(f"Formato não suportado: {formato}")
+    aberto_aqui = isinstance(arquivo, (str, os.PathLike))
+    if aberto_aqui:
+        arquivo = open(arquivo, "rb")
+    texto = None
+    try:
+        if formato == "xlsx":
+            linhas = _linhas_xlsx(arquivo)
+        else:
+            texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+            linhas = _linhas_csv(texto)
+
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        mapa = _mapear_cabecalho(cabecalho)
+        for numero, valores in enumerate(linhas, start=2):
+            if not any(v.strip() for v in valores):
+                continue
+            yield numero, {
+                campo: valores[posicao].strip() if posicao < len(valores) else ""
+                for campo, posicao in mapa.items()
+            }
+    finally:
+        if texto is not None:
+            # Solta o arquivo binário sem fechá-lo (quem o abriu decide)
+            texto.detach()
+        if aberto_aqui:
+            arquivo.close()
+
+
+def formato_do_arquivo(nome):
+    """Deduz o formato ('csv' ou 'xlsx') pela extensão do arquivo"""
+    extensao = os.path.splitext(nome)[1].lower()
+    if extensao in (".xlsx", ".xlsm"):
+        return "xlsx"
+    if extensao in (".csv", ".txt"):
+        return "csv"
+    raise ErroImportacao(f"Extensão não suportada: {extensao or nome}")
+
+
+def interpretar_impressoras(texto):
+    """'L355; L365 | L375' -> ['L355', 'L365', 'L375']"""
+    return [nome for nome in _SEPARADOR_IMPRESSORAS.split(texto.strip()) if nome]
+
+
+def interpretar_capacidades(texto):
+    """'50;100ml' -> [50, 100]"""
+    valores = []
+    for parte in _SEPARADOR_CAPACIDADES.split(texto.lower().replace("ml", " ")):
+        if parte:
+            try:
+                valor = int(float(parte.replace(",", ".")))
+            except ValueError:
+                raise ValueError(f"capacidade inválida: {parte}") from None
+            if valor <= 0:
+                raise ValueError(f"capacidade inválida: {parte}")
+            valores.append(valor)
+    return valores
+
+
+class _Dimensoes:
+    """Mapas nome→id das tabelas de referência, criando o que faltar"""
+
+    def __init__(self, conn, dry_run, resumo):
+        self.conn = conn
+        self.dry_run = dry_run
+        self.resumo = resumo
+        self._proximo_falso = -1  # ids provisórios no dry-run
+        self.fabricantes = self._mapa("SELECT id, nome FROM fabricantes ORDER BY id")
+        self.cores = self._mapa("SELECT id, nome FROM cores_referencia ORDER BY id")
+        self.capacidades = self._mapa("SELECT id, capacidade_ml FROM capacidades ORDER BY id")
+        self.modelos = self._mapa("SELECT id, nome FROM modelos_impressora ORDER BY id")
+
+    def _mapa(self, query):
+        # Nomes repetidos resolvem para o menor id, como no cache de referências
+        mapa = {}
+        for id_, nome in self.conn.execute(query):
+            mapa.setdefault(nome, id_)
+        return mapa
+
+    def _inserir(self, tipo, sql, params):
+        self.resumo.criados[tipo] += 1
+        if self.dry_run:
+            self._proximo_falso -= 1
+            return self._proximo_falso + 1
+        return self.conn.execute(sql, params).lastrowid
+
+    def fabricante(self, nome):
+        id_ = self.fabricantes.get(nome)
+        if id_ is None:
+            id_ = self.fabricantes[nome] = self._inserir(
+                "fabricantes", "INSERT INTO fabricantes (nome) VALUES (?)", (nome,))
+        return id_
+
+    def cor(self, nome, codigo_hex):
+        id_ = self.cores.get(nome)
+        if id_ is None:
+            id_ = self.cores[nome] = self._inserir(
+                "cores", "INSERT INTO cores_referencia (nome, codigo_hex) VALUES (?, ?)",
+                (nome, codigo_hex or None))
+        return id_
+
+    def capacidade(self, ml):
+        id_ = self.capacidades.get(ml)
+        if id_ is None:
+            id_ = self.capacidades[ml] = self._inserir(
+                "capacidades", "INSERT INTO capacidades (capacidade_ml) VALUES (?)", (ml,))
+        return id_
+
+    def modelo(self, nome, fabricante):
+        id_ = self.modelos.get(nome)
+        if id_ is None:
+            if not fabricante:
+                raise ValueError(f"modelo de impressora '{nome}' não existe e a linha não informa o fabricante")
+            fabricante_id = self.fabricante(fabricante)
+            id_ = self.modelos[nome] = self._inserir(
+                "modelos", "INSERT INTO modelos_impressora (nome, fabricante_id) VALUES (?, ?)",
+                (nome, fabricante_id))
+        return id_
+
+    def cartucho(self, modelo_cartucho, codigo_referencia, cor_id):
+        """Id do cartucho já cadastrado com essa chave natural, ou None"""
+        linha = self.conn.execute(SQL_BUSCAR_CARTUCHO, (modelo_cartucho, codigo_referencia, cor_id)).fetchone()
+        return linha[0] if linha else None
+
+
+def _gravar_lote(conn, dimensoes, lote, resumo):
+    # Chave natural -> [id (None se novo), impressoras, capacidades]; dicts
+    # mantêm a ordem e juntam as linhas repetidas do mesmo cartucho
+    cartuchos = {}
+    validas = 0
+    for numero, registro in lote:
+        try:
+            faltando = [c for c in COLUNAS_OBRIGATORIAS if not registro.get(c)]
+            if faltando:
+                raise ValueError(f"campos obrigatórios vazios: {', '.join(faltando)}")
+            capacidades = interpretar_capacidades(registro.get("capacidades", ""))
+            modelo_ids = [dimensoes.modelo(nome, registro.get("fabricante"))
+                          for nome in interpretar_impressoras(registro["modelo_impressora"])]
+            cor_id = dimensoes.cor(registro["cor"], registro.get("codigo_hex"))
+            capacidade_ids = [dimensoes.capacidade(ml) for ml in capacidades]
+        except ValueError as e:
+            resumo.erros.append((numero, str(e)))
+            continue
+        validas += 1
+        chave = (registro["modelo_cartucho"], registro.get("codigo_referencia") or "", cor_id)
+        cartucho = cartuchos.get(chave)
+        if cartucho is None:
+            cartucho = cartuchos[chave] = [dimensoes.cartucho(*chave), {}, {}]
+        cartucho[1].update(dict.fromkeys(modelo_ids))
+        cartucho[2].update(dict.fromkeys(capacidade_ids))
+
+    novos = [(chave, cartucho) for chave, cartucho in cartuchos.items() if cartucho[0] is None]
+    if not resumo.dry_run:
+        conn.execute(SQL_INICIAR_CARGA)
+    if novos and not resumo.dry_run:
+        conn.executemany(SQL_INSERIR_CARTUCHO, [
+            (modelo, cor_id, codigo or None) for (modelo, codigo, cor_id), _ in novos
+        ])
+        # Com o lock de escrita mantido durante a transação, o AUTOINCREMENT
+        # gera ids consecutivos: o último id identifica todo o lote
+        ultimo_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        for i, (_, cartucho) in enumerate(novos):
+            cartucho[0] = ultimo_id - len(novos) + 1 + i
+
+    if resumo.dry_run:
+        compatibilidades = sum(len(c[1]) for c in cartuchos.values())
+        associacoes = sum(len(c[2]) for c in cartuchos.values())
+    else:
+        ids_novos = {cartucho[0] for _, cartucho in novos}
+        impressoras = _associar(conn, SQL_ASSOCIAR_IMPRESSORA, cartuchos.values(), 1, ids_novos)
+        capacidades = _associar(conn, SQL_ASSOCIAR_CAPACIDADE, cartuchos.values(), 2, ids_novos)
+        compatibilidades, associacoes = len(impressoras), len(capacidades)
+        # Afetados: os novos e os já existentes que ganharam associações
+        afetados = dict.fromkeys(ids_novos, 1)
+        afetados.update((cartucho_id, 0) for cartucho_id, _ in impressoras + capacidades
+                        if cartucho_id not in ids_novos)
+        for sql in SQL_CRIAR_TABELAS_LOTE:
+            conn.execute(sql)
+        conn.executemany("INSERT INTO temp.cartuchos_lote (id, novo) VALUES (?, ?)", afetados.items())
+        conn.executemany("INSERT INTO temp.impressoras_lote VALUES (?, ?)", impressoras)
+        conn.executemany("INSERT INTO temp.capacidades_lote VALUES (?, ?)", capacidades)
+        for sql in SQL_ENCERRAR_CARGA:
+            conn.execute(sql)
+
+    resumo.cartuchos_inseridos += len(novos)
+    resumo.linhas_mescladas += validas - len(novos)
+    resumo.compatibilidades_inseridas += compatibilidades
+    resumo.associacoes_inseridas += associacoes
+
+
+def _associar(conn, sql, cartuchos, campo, ids_novos):
+    """Grava as associações (`campo` 1: impressoras, 2: capacidades); retorna os pares inseridos
+
+    As dos cartuchos novos vão num único `executemany`; as dos já existentes,
+    uma a uma, para saber quais delas eram de fato novas.
+    """
+    pares = [(c[0], id_) for c in cartuchos if c[0] in ids_novos for id_ in c[campo]]
+    conn.executemany(sql, pares)
+    for cartucho in cartuchos:
+        if cartucho[0] in ids_novos:
+            continue
+        for id_ in cartucho[campo]:
+            if conn.execute(sql, (cartucho[0], id_)).rowcount:
+                pares.append((cartucho[0], id_))
+    return pares
+
+
+def importar_catalogo(gerenciador, arquivo, formato, tamanho_lote=TAMANHO_LOTE_PADRAO,
+                      dry_run=False, progresso=None):
+    """Importa cartuchos de um CSV/XLSX e retorna um `ResumoImportacao`
+
+    Cada lote é gravado numa transação própria. Linhas inválidas não
+    interrompem a importação: vão para `resumo.erros`. Com `dry_run=True`
+    o arquivo é validado e contabilizado sem gravar nada. `progresso`, se
+    informado, é chamado com o resumo parcial ao fim de cada lote.
+    """
+    resumo = ResumoImportacao(dry_run=dry_run)
+    registros = ler_registros(arquivo, formato)
+    dimensoes = None
+
+    while True:
+        lote = list(itertools.islice(registros, tamanho_lote))
+        if not lote:
+            break
+        resumo.linhas_lidas += len(lote)
+        with gerenciador.escrita() as conn:
+            if dimensoes is None:
+                dimensoes = _Dimensoes(conn, dry_run, resumo)
+            _gravar_lote(conn, dimensoes, lote, resumo)
+            if dry_run:
+                conn.rollback()
+        resumo.duracao = time.perf_counter() - resumo.inicio
+        if progresso is not None:
+            progresso(resumo)
+
+    resumo.duracao = time.perf_counter() - resumo.inicio
+    return resumo
+
+
+def main(argv=None, prog=None):
+    """Ponto de entrada da linha de comando"""
+    from getanuncio.conexao import GerenciadorConexoes
+    from getanuncio.migracoes import migrar
+
+    parser = argparse.ArgumentParser(prog=prog, description="Importa cartuchos de uma planilha CSV/XLSX")
+    parser.add_argument("arquivo", help="planilha .csv ou .xlsx")
+    parser.add_argument("--db", default="cartuchos.db", help="arquivo do banco SQLite")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE_PADRAO, help="linhas por transação")
+    parser.add_argument("--dry-run", action="store_true", help="valida sem gravar")
+    parser.add_argument("--erros", help="grava o relatório de erros neste CSV")
+    args = parser.parse_args(argv)
+
+    def mostrar(resumo):
+        print(f"\r{resumo.linhas_lidas} linhas | {resumo.linhas_por_segundo:,.0f} linhas/s",
+              end="", file=sys.stderr, flush=True)
+
+    gerenciador = GerenciadorConexoes(args.db, ao_abrir_escritor=migrar)
+    try:
+        resumo = importar_catalogo(
+            gerenciador, args.arquivo, formato_do_arquivo(args.arquivo),
+            tamanho_lote=args.lote, dry_run=args.dry_run, progresso=mostrar,
+        )
+    except ErroImportacao as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+    finally:
+        gerenciador.fechar()
+    print(file=sys.stderr)
+
+    prefixo = "[dry-run] " if resumo.dry_run else ""
+    print(f"{prefixo}{resumo.cartuchos_inseridos} cartuchos, {resumo.compatibilidades_inseridas} compatibilidades, "
+          f"{resumo.associacoes_inseridas} capacidades em {resumo.duracao:.2f}s "
+          f"({resumo.linhas_por_segundo:,.0f} linhas/s)")
+    if resumo.linhas_mescladas:
+        print(f"{prefixo}{resumo.linhas_mescladas} linhas somadas a cartuchos já existentes")
+    criados = ", ".join(f"{n} {tipo}" for tipo, n in resumo.criados.items() if n)
+    if criados:
+        print(f"{prefixo}Criados: {criados}")
+    if resumo.erros:
+        print(f"{len(resumo.erros)} linha(s) com erro", file=sys.stderr)
+        if args.erros:
+            with open(args.erros, "w", encoding="utf-8", newline="") as f:
+                f.write(resumo.relatorio_erros_csv())
+        else:
+            for numero, mensagem in resumo.erros[:20]:
+                print(f"  linha {numero}: {mensagem}", file=sys.stderr)
+    return 1 if resumo.erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Instrumentação das consultas: tempo por comando, percentis e log de consultas lentas
+
+Cada execução é registrada pela impressão digital do SQL (literais trocados
+por `?`, listas `IN (?, ?, ...)` reduzidas e espaços normalizados), de modo
+que a mesma consulta com valores diferentes cai na mesma linha. Por
+impressão digital ficam contadores e as últimas `amostras` durações, das
+quais saem os percentis. Comandos acima de `limiar_ms` vão, um JSON por
+linha, para um arquivo de log com rotação por tamanho.
+"""
+import json
+import logging
+import logging.handlers
+import math
+import os
+import re
+import threading
+import time
+from collections import deque, namedtuple
+
+LIMIAR_LENTO_MS = 200
+AMOSTRAS_POR_CONSULTA = 500
+LOG_MAX_BYTES = 1024 * 1024
+LOG_COPIAS = 3
+
+_RE_COMENTARIO = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_RE_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_RE_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_NOMEADO = re.compile(r"[:@$]\w+")
+_RE_ESPACOS = re.compile(r"\s+")
+
+EstatisticaConsulta = namedtuple(
+    "EstatisticaConsulta",
+    ["impressao", "sql", "params", "formato_params", "chamadas", "total_ms", "media_ms", "p50_ms",
+     "p95_ms", "p99_ms", "maximo_ms", "linhas", "erros", "paginas", "ultimo_erro"]
+)
+
+
+def impressao_digital(sql):
+    """SQL normalizado: sem comentários, literais como `?` e espaços simples"""
+    sql = _RE_COMENTARIO.sub(" ", sql)
+    sql = _RE_TEXTO.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    sql = _RE_NOMEADO.sub("?", sql)
+    sql = _RE_ESPACOS.sub(" ", sql).strip().rstrip(";").strip()
+    return _RE_LISTA.sub("(?...)", sql)
+
+
+def formato_params(params):
+    """Forma dos parâmetros sem os valores: '(int, str)', '{apos: int}' ou '()'"""
+    if not params:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{nome}: {type(valor).__name__}" for nome, valor in params.items()) + "}"
+    return "(" + ", ".join(type(valor).__name__ for valor in params) + ")"
+
+
+def percentil(valores_ordenados, p):
+    """Percentil `p` (0-100) pelo método do posto mais próximo"""
+    if not valores_ordenados:
+        return 0.0
+    posto = max(math.ceil(p / 100 * len(valores_ordenados)), 1)
+    return valores_ordenados[posto - 1]
+
+
+class _Acumulado:
+    __slots__ = ("sql", "params", "formato_params", "chamadas", "total", "maximo", "linhas", "erros",
+                 "paginas", "ultimo_erro", "duracoes")
+
+    def __init__(self, amostras):
+        self.chamadas = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.linhas = 0
+        self.erros = 0
+        self.paginas = {}
+        self.ultimo_erro = None
+        self.duracoes = deque(maxlen=amostras)
+
+
+class Instrumentacao:
+    """Estatísticas por impressão digital, compartilhadas entre sessões, e log das lentas"""
+
+    def __init__(self, caminho_log=None, limiar_ms=LIMIAR_LENTO_MS, amostras=AMOSTRAS_POR_CONSULTA,
+                 max_bytes=LOG_MAX_BYTES, copias=LOG_COPIAS):
+        self.caminho_log = caminho_log
+        self.limiar_ms = limiar_ms
+        self.amostras = amostras
+        self._lock = threading.Lock()
+        self._consultas = {}
+        self.lentas = 0
+        self._log = None
+        if caminho_log is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(caminho_log)), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                caminho_log, maxBytes=max_bytes, backupCount=copias, encoding="utf-8", delay=True
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            # Logger próprio por arquivo, fora da hierarquia (não propaga para o root)
+            self._log = logging.getLogger(f"getanuncio.consultas_lentas.{os.path.abspath(caminho_log)}")
+            self._log.handlers[:] = [handler]
+            self._log.setLevel(logging.INFO)
+            self._log.propagate = False
+
+    def registrar(self, sql, params, duracao, linhas=None, pagina=None, erro=None):
+        """Registra uma execução (`duracao` em segundos)"""
+        impressao = impressao_digital(sql)
+        ms = duracao * 1000
+        with self._lock:
+            acumulado = self._consultas.get(impressao)
+            if acumulado is None:
+                acumulado = self._consultas[impressao] = _Acumulado(self.amostras)
+            acumulado.sql = sql
+            acumulado.params = params
+            acumulado.formato_params = formato_params(params)
+            acumulado.chamadas += 1
+            acumulado.total += ms
+            acumulado.maximo = max(acumulado.maximo, ms)
+            acumulado.linhas += linhas or 0
+            acumulado.duracoes.append(ms)
+            if pagina is not None:
+                acumulado.paginas[pagina] = acumulado.paginas.get(pagina, 0) + 1
+            if erro is not None:
+                acumulado.erros += 1
+                acumulado.ultimo_erro = str(erro)
+            lenta = ms >= self.limiar_ms
+            if lenta:
+                self.lentas += 1
+
+        if lenta and self._log is not None:
+            self._log.info(json.dumps({
+                "momento": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "ms": round(ms, 2),
+                "impressao": impressao,
+                "params": formato_params(params),
+                "linhas": linhas,
+                "pagina": pagina,
+                "erro": None if erro is None else str(erro),
+            }, ensure_ascii=False))
+
+    def medir(self, sql, params=None, pagina=None):
+        """Contexto que cronometra um comando; atribua `.linhas` ao objeto devolvido"""
+        return _Medicao(self, sql, params, pagina)
+
+    def resumo(self, ordenar_por="total_ms", limite=None):
+        """Estatísticas por impressão digital, da maior para a menor por `ordenar_por`"""
+        with self._lock:
+            copias = [(impressao, a, sorted(a.duracoes)) for impressao, a in self._consultas.items()]
+        estatisticas = [
+            EstatisticaConsulta(
+                impressao, a.sql, a.params, a.formato_params, a.chamadas, a.total, a.total / a.chamadas,
+                percentil(duracoes, 50), percentil(duracoes, 95), percentil(duracoes, 99), a.maximo,
+                a.linhas, a.erros, dict(a.paginas), a.ultimo_erro,
+            )
+            for impressao, a, duracoes in copias
+        ]
+        estatisticas.sort(key=lambda e: getattr(e, ordenar_por), reverse=True)
+        return estatisticas[:limite] if limite else estatisticas
+
+    def limpar(self):
+        """Zera as estatísticas em memória (o log em disco é mantido)"""
+        with self._lock:
+            self._consultas.clear()
+            self.lentas = 0
+
+
+class _Medicao:
+    __slots__ = ("instrumentacao", "sql", "params", "pagina", "linhas", "_inicio")
+
+    def __init__(self, instrumentacao, sql, params, pagina):
+        self.instrumentacao = instrumentacao
+        self.sql = sql
+        self.params = params
+        self.pagina = pagina
+        self.linhas = None
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        self.instrumentacao.registrar(
+            self.sql, self.params, time.perf_counter() - self._inicio, self.linhas, self.pagina, erro
+        )
+        return False
@@ -0,0 +1,278 @@
+"""Migrações de esquema versionadas por `PRAGMA user_version` e dados iniciais
+
+O esquema e os dados iniciais ficam como dados dentro do pacote:
+`sql/migracoes/NNNN_descricao.sql` (a primeira linha `-- ...` é a descrição)
+e `sql/dados_iniciais.json`. `migrar` aplica todas as migrações pendentes num
+único `executescript` transacional e grava a nova versão no próprio arquivo do
+banco, de modo que rodar de novo é um no-op. As migrações são escritas para
+serem idempotentes (IF NOT EXISTS); como o SQLite não tem `ADD COLUMN IF NOT
+EXISTS`, `migrar` pula os `ALTER TABLE ... ADD COLUMN` de colunas que já
+existem. O gerenciador de conexões chama `migrar` sempre que abre a conexão
+de escrita, ou seja, na inicialização do app.
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+
+from getanuncio import busca, consultas, feed, sugestoes
+from getanuncio.referencias import CONSULTAS_REFERENCIA
+
+DIRETORIO_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+DIRETORIO_MIGRACOES = os.path.join(DIRETORIO_SQL, "migracoes")
+ARQUIVO_DADOS_INICIAIS = os.path.join(DIRETORIO_SQL, "dados_iniciais.json")
+
+Migracao = namedtuple("Migracao", ["versao", "descricao", "sql"])
+
+
+def carregar_migracoes(diretorio=DIRETORIO_MIGRACOES):
+    """Lê os arquivos NNNN_*.sql do diretório, em ordem de versão"""
+    migracoes = []
+    for nome in sorted(os.listdir(diretorio)):
+        encontrado = re.match(r"^(\d+)_.*\.sql$", nome)
+        if not encontrado:
+            continue
+        with open(os.path.join(diretorio, nome), encoding="utf-8") as f:
+            sql = f.read()
+        primeira_linha = sql.lstrip().splitlines()[0] if sql.strip() else ""
+        descricao = primeira_linha[2:].strip() if primeira_linha.startswith("--") else nome
+        migracoes.append(Migracao(int(encontrado.group(1)), descricao, sql))
+    return migracoes
+
+
+MIGRACOES = carregar_migracoes()
+VERSAO_ESQUEMA = MIGRACOES[-1].versao
+
+RelatorioMigracao = namedtuple(
+    "RelatorioMigracao", ["versao_inicial", "versao_final", "aplicadas", "planos_antes", "planos_depois"]
+)
+
+# Consultas do app verificadas no relatório de planos (nome -> (sql, parâmetros))
+CONSULTAS_VERIFICADAS = {
+    "Dashboard: total de cartuchos": (consultas.SQL_CONTAR_CARTUCHOS, ()),
+    "Dashboard: cartuchos por cor": (consultas.SQL_CARTUCHOS_POR_COR, ()),
+    "Dashboard: impressoras com mais cartuchos": (consultas.SQL_CARTUCHOS_POR_IMPRESSORA, (10,)),
+    "Dashboard: painel": (consultas.SQL_PAINEL, (10,)),
+    "Configurações: estatísticas": (consultas.SQL_ESTATISTICAS, ()),
+    "Cadastros: fabricantes": (consultas.SQL_LISTAR_FABRICANTES, ()),
+    "Cadastros: modelos": (consultas.SQL_LISTAR_MODELOS, ()),
+    "Cadastros: cores": (consultas.SQL_LISTAR_CORES, ()),
+    "Cadastros: capacidades": (consultas.SQL_LISTAR_CAPACIDADES, ()),
+    "Cadastros: cartuchos (primeira página)": consultas.montar_pagina_cartuchos(),
+    "Cadastros: cartuchos (página seguinte)": consultas.montar_pagina_cartuchos(apos=("T664", 1)),
+    "Cadastros: cartuchos (mais recentes)": consultas.montar_pagina_cartuchos("recentes", apos=(1000, 1000)),
+    "Consultas: filtro cor + fabricante + capacidade":
+        consultas.montar_filtro_cartuchos(cor="Black", fabricante="Epson", capacidade_ml=100),
+    "Consultas: filtro por cor": consultas.montar_filtro_cartuchos(cor="Black"),
+    "Consultas: página filtrada por cor": consultas.montar_pagina_cartuchos(cor="Black"),
+    "Consultas: cartuchos de uma impressora": consultas.montar_pagina_cartuchos(modelo_impressora_id=1),
+    "Cadastros: impressoras do cartucho": (consultas.SQL_IMPRESSORAS_DO_CARTUCHO, (1,)),
+    "Cadastros: sugestões de cartuchos": (busca.SQL_SUGERIR_CARTUCHOS, (busca.preparar_consulta("t664"), 20)),
+    "Consultas: busca textual": (busca.SQL_BUSCAR_CARTUCHOS, (busca.preparar_consulta("t664 epson"), 50)),
+    "Cadastros: sugestões de modelos (prefixo)": (sugestoes.SQL_SUGERIR_MODELOS_PREFIXO, ("eco%", 20)),
+    "Cadastros: sugestões de modelos (trecho)": (sugestoes.SQL_SUGERIR_MODELOS_TRECHO, ("%l35%", "l35%", 20)),
+    "Consultas: contagem filtrada": consultas.montar_contagem_cartuchos(cor="Black", fabricante="Epson"),
+    "Consultas: facetas dos filtros": consultas.montar_facetas_cartuchos(cor="Black", capacidade_ml=100),
+    "Anúncios: feed incremental": (feed.SQL_ALTERACOES_FEED, {
+        "apos": 1000, "ate": 2000, "desde": "", "incluir_excluidos": 1,
+    }),
+}
+CONSULTAS_VERIFICADAS.update({
+    f"Referências: {nome}": (sql, ()) for nome, sql in CONSULTAS_REFERENCIA.items()
+})
+
+# "SCAN tabela" sem índice = leitura completa da tabela
+_RE_VARREDURA = re.compile(r"^SCAN (\w+)$")
+# Migrações que criam objetos derivados (ver `reconstruir_derivados`): as de
+# tabelas virtuais e as marcadas com uma linha "-- Derivada:"
+_RE_DERIVADA = re.compile(r"\bCREATE\s+VIRTUAL\s+TABLE\b|^--\s*Derivada:", re.IGNORECASE | re.MULTILINE)
+_RE_CRIAR_TABELA = re.compile(r"\bCREATE\s+(?:VIRTUAL\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE)
+# "ALTER TABLE t ADD [COLUMN] c ...;" (ver `_sem_colunas_existentes`)
+_RE_ADICIONAR_COLUNA = re.compile(
+    r"^[ \t]*ALTER\s+TABLE\s+(\w+)\s+ADD\s+(?:COLUMN\s+)?(\w+)[^;]*;[ \t]*\n?", re.IGNORECASE | re.MULTILINE
+)
+# CTEs e subconsultas: percorrê-las não lê nenhuma tabela do banco
+_RE_SUBCONSULTA = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\w+)$")
+
+
+def versao_atual(conn):
+    """Versão do esquema gravada no arquivo do banco"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _sem_colunas_existentes(conn, sql):
+    """`sql` sem os `ALTER TABLE ... ADD COLUMN` de colunas que a tabela já tem"""
+    def trocar(encontrado):
+        tabela, coluna = encontrado.groups()
+        colunas = {linha[1] for linha in conn.execute(f'PRAGMA table_info("{tabela}")')}
+        return "" if coluna in colunas else encontrado.group(0)
+    return _RE_ADICIONAR_COLUNA.sub(trocar, sql)
+
+
+def migrar(conn, relatorio_planos=False):
+    """Aplica as migrações pendentes numa única transação
+
+    Com `relatorio_planos=True` o relatório inclui o EXPLAIN QUERY PLAN das
+    consultas do app antes e depois das migrações (apenas se houve alguma).
+    """
+    versao_inicial = versao_atual(conn)
+    pendentes = [m for m in MIGRACOES if m.versao > versao_inicial]
+    if not pendentes:
+        return RelatorioMigracao(versao_inicial, versao_inicial, [], None, None)
+
+    planos_antes = planos_consultas(conn) if relatorio_planos else None
+    script = "BEGIN IMMEDIATE;\n"
+    script += "\n".join(_sem_colunas_existentes(conn, m.sql) for m in pendentes)
+    script += f"\nPRAGMA user_version = {pendentes[-1].versao};\nCOMMIT;\n"
+    try:
+        conn.executescript(script)
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+    planos_depois = planos_consultas(conn) if relatorio_planos else None
+    return RelatorioMigracao(versao_inicial, versao_atual(conn), pendentes, planos_antes, planos_depois)
+
+
+def _migracoes_derivadas(ate=None):
+    return [m for m in MIGRACOES if (ate is None or m.versao <= ate) and _RE_DERIVADA.search(m.sql)]
+
+
+def _definicoes_atuais(ate=None):
+    """Migrações derivadas sem as que só criam tabelas recriadas por uma mais nova
+
+    A 0008, por exemplo, recria do zero o índice de busca da 0004: reaplicar
+    as duas montaria o índice duas vezes.
+    """
+    atuais, recriadas = [], set()
+    for m in reversed(_migracoes_derivadas(ate)):
+        tabelas = {nome.lower() for nome in _RE_CRIAR_TABELA.findall(m.sql)}
+        if not tabelas or tabelas - recriadas:
+            atuais.append(m)
+        recriadas |= tabelas
+    return atuais[::-1]
+
+
+def reconstruir_derivados(conn):
+    """Recria os objetos derivados (índices FTS5, resumos e seus triggers) do esquema atual
+
+    Reaplica, numa transação, a definição mais recente de cada tabela virtual
+    ou resumo entre as migrações já aplicadas; elas são idempotentes e
+    repovoam tudo a partir das tabelas normais. Usada na restauração de
+    dumps, que não trazem esses objetos, e depois de cargas em lote feitas
+    sem triggers.
+    """
+    derivadas = _definicoes_atuais(versao_atual(conn))
+    if not derivadas:
+        return []
+    try:
+        conn.executescript("BEGIN IMMEDIATE;\n" + "\n".join(m.sql for m in derivadas) + "\nCOMMIT;\n")
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    return derivadas
+
+
+def carregar_dados_iniciais(caminho=ARQUIVO_DADOS_INICIAIS):
+    """Dados iniciais: {tabela: [{coluna: valor, ...}, ...]}"""
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def inserir_dados_iniciais(conn, dados=None):
+    """Insere os dados iniciais que ainda não existem; retorna quantas linhas entraram
+
+    As tabelas têm chave natural única, então `INSERT OR IGNORE` torna a
+    operação idempotente. Tudo numa única transação.
+    """
+    dados = carregar_dados_iniciais() if dados is None else dados
+    # rowcount e não total_changes, que soma as linhas gravadas por triggers
+    inseridas = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for tabela, linhas in dados.items():
+            if not linhas:
+                continue
+            colunas = list(linhas[0].keys())
+            sql = (
+                f"INSERT OR IGNORE INTO {tabela} ({', '.join(colunas)}) "
+                f"VALUES ({', '.join('?' for _ in colunas)})"
+            )
+            inseridas += conn.executemany(sql, [tuple(linha[c] for c in colunas) for linha in linhas]).rowcount
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return inseridas
+
+
+FaseInicializacao = namedtuple("FaseInicializacao", ["nome", "duracao", "detalhe"])
+
+
+def inicializar_banco(conn):
+    """Migra o esquema e insere os dados iniciais; retorna as fases com seus tempos"""
+    fases = []
+
+    inicio = time.perf_counter()
+    relatorio = migrar(conn)
+    if relatorio.aplicadas:
+        detalhe = ", ".join(f"{m.versao} ({m.descricao})" for m in relatorio.aplicadas)
+        detalhe = f"versão {relatorio.versao_final}; aplicadas: {detalhe}"
+    else:
+        detalhe = f"versão {relatorio.versao_final}; já atualizado"
+    fases.append(FaseInicializacao("Esquema", time.perf_counter() - inicio, detalhe))
+
+    inicio = time.perf_counter()
+    inseridas = inserir_dados_iniciais(conn)
+    detalhe = f"{inseridas} linha(s) inserida(s)" if inseridas else "já presentes"
+    fases.append(FaseInicializacao("Dados iniciais", time.perf_counter() - inicio, detalhe))
+    return fases
+
+
+def objetos_derivados(conn):
+    """Tabelas virtuais (FTS5), suas tabelas-sombra, os resumos, seus índices e os triggers que os mantêm
+
+    São reconstruídos pelas migrações a partir das tabelas normais, por isso
+    ficam fora do dump SQL e não são copiados entre esquemas.
+    """
+    resumos = {nome for m in _migracoes_derivadas() for nome in _RE_CRIAR_TABELA.findall(m.sql)}
+    tabelas = {nome for _, nome, tipo, *_ in conn.execute("PRAGMA table_list")
+               if tipo in ("virtual", "shadow") or nome in resumos}
+    if not tabelas:
+        return tabelas
+    referencia = re.compile(r"\b(?:%s)\b" % "|".join(map(re.escape, tabelas)))
+    triggers = {nome for nome, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+                if referencia.search(sql)}
+    indices = {nome for (nome,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name IN (%s)" % ", ".join("?" * len(tabelas)),
+        sorted(tabelas),
+    )}
+    return tabelas | triggers | indices
+
+
+def plano_consulta(conn, sql, params=()):
+    """Linhas de detalhe do EXPLAIN QUERY PLAN de uma consulta"""
+    try:
+        return [detalhe for _, _, _, detalhe in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    except sqlite3.Error as e:
+        return [f"ERRO: {e}"]
+
+
+def planos_consultas(conn):
+    """EXPLAIN QUERY PLAN de todas as consultas do app (nome -> linhas)"""
+    return {nome: plano_consulta(conn, sql, params) for nome, (sql, params) in CONSULTAS_VERIFICADAS.items()}
+
+
+def varreduras_completas(plano):
+    """Tabelas lidas por inteiro (SCAN sem índice) num plano"""
+    tabelas = []
+    subconsultas = {m.group(1) for m in map(_RE_SUBCONSULTA.match, plano) if m}
+    for detalhe in plano:
+        encontrado = _RE_VARREDURA.match(detalhe)
+        if encontrado and encontrado.group(1) not in subconsultas:
+            tabelas.append(encontrado.group(1))
+    return tabelas
@@ -0,0 +1,103 @@
+"""Listagem paginada de cartuchos por keyset
+
+Cada página é buscada a partir da chave (valor da ordenação, id) da página
+vizinha, andando pelo índice: o custo não cresce com o número da página,
+ao contrário de OFFSET. O total de linhas e as facetas dos filtros
+(cartuchos por cor, fabricante e capacidade) ficam em cache, recalculados
+só quando o banco muda ou para um filtro ainda não visto.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+from getanuncio.consultas import (
+    montar_contagem_cartuchos, montar_facetas_cartuchos, montar_pagina_cartuchos
+)
+
+TAMANHOS_PAGINA = (25, 50, 100, 250)
+
+Pagina = namedtuple(
+    "Pagina", ["colunas", "linhas", "primeira", "ultima", "tem_anterior", "tem_proxima"]
+)
+
+# Cada campo: {valor: quantidade de cartuchos}
+Facetas = namedtuple("Facetas", ["cor", "fabricante", "capacidade_ml"])
+
+
+def buscar_pagina(conn, ordenacao="modelo_asc", tamanho=50, apos=None, antes=None, do_fim=False,
+                  **filtros):
+    """Busca uma página; `apos`/`antes` são as chaves `ultima`/`primeira` de uma `Pagina`
+
+    Sem cursor devolve a primeira página; com `do_fim=True`, as últimas
+    `tamanho` linhas.
+    """
+    sql, params = montar_pagina_cartuchos(
+        ordenacao, tamanho + 1, apos=apos, antes=antes, do_fim=do_fim, **filtros
+    )
+    cursor = conn.execute(sql, params)
+    colunas = [d[0] for d in cursor.description][:-1]  # sem a coluna interna `chave`
+    linhas = cursor.fetchall()
+
+    # Uma linha a mais indica se há outra página no sentido da busca
+    ha_mais = len(linhas) > tamanho
+    linhas = linhas[:tamanho]
+    para_tras = antes is not None or do_fim
+    if para_tras:
+        linhas.reverse()
+        tem_anterior, tem_proxima = ha_mais, antes is not None
+    else:
+        tem_anterior, tem_proxima = apos is not None, ha_mais
+
+    primeira = (linhas[0][-1], linhas[0][0]) if linhas else None
+    ultima = (linhas[-1][-1], linhas[-1][0]) if linhas else None
+    return Pagina(colunas, [linha[:-1] for linha in linhas], primeira, ultima, tem_anterior, tem_proxima)
+
+
+class CacheContagens:
+    """Contagens e facetas de cartuchos por filtro, invalidadas pela versão dos dados"""
+
+    def __init__(self, gerenciador, max_entradas=256):
+        self.gerenciador = gerenciador
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._versao = None
+        self._contagens = OrderedDict()
+
+    def _obter(self, chave, calcular):
+        versao = self.gerenciador.versao_dados()
+        with self._lock:
+            if versao != self._versao:
+                self._versao = versao
+                self._contagens.clear()
+            elif chave in self._contagens:
+                self._contagens.move_to_end(chave)
+                return self._contagens[chave]
+
+        with self.gerenciador.leitura() as conn:
+            valor = calcular(conn)
+
+        with self._lock:
+            if versao == self._versao:
+                self._contagens[chave] = valor
+                if len(self._contagens) > self.max_entradas:
+                    self._contagens.popitem(last=False)
+        return valor
+
+    def contar(self, cor=None, fabricante=None, capacidade_ml=None, modelo_impressora_id=None):
+        """Total de cartuchos que passam nos filtros"""
+        sql, params = montar_contagem_cartuchos(cor, fabricante, capacidade_ml, modelo_impressora_id)
+        return self._obter(
+            ("contagem", cor, fabricante, capacidade_ml, modelo_impressora_id),
+            lambda conn: conn.execute(sql, params).fetchone()[0]
+        )
+
+    def facetas(self, cor=None, fabricante=None, capacidade_ml=None, modelo_impressora_id=None):
+        """Cartuchos por cor, fabricante e capacidade sob os demais filtros"""
+        sql, params = montar_facetas_cartuchos(cor, fabricante, capacidade_ml, modelo_impressora_id)
+
+        def calcular(conn):
+            facetas = Facetas({}, {}, {})
+            for faceta, valor, quantidade in conn.execute(sql, params):
+                getattr(facetas, faceta)[valor] = quantidade
+            return facetas
+
+        return self._obter(("facetas", cor, fabricante, capacidade_ml, modelo_impressora_id), calcular)
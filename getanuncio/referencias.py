@@ -0,0 +1,95 @@
+"""Cache em memória das tabelas de referência (cores, fabricantes, capacidades, modelos)
+
+As tabelas são pequenas e consultadas em quase todo rerun. O cache mantém um
+retrato de todas elas com mapas nome→id e id→nome e só o recarrega quando a
+versão do banco (`GerenciadorConexoes.versao_dados`) muda, ou seja, depois de
+qualquer INSERT/UPDATE/DELETE.
+"""
+import sqlite3
+import threading
+
+# Consulta de cada tabela de referência: sempre (id, nome) na ordem de exibição
+CONSULTAS_REFERENCIA = {
+    "cores": "SELECT id, nome FROM cores_referencia ORDER BY nome",
+    "fabricantes": "SELECT id, nome FROM fabricantes ORDER BY nome",
+    "capacidades": "SELECT id, capacidade_ml FROM capacidades ORDER BY capacidade_ml",
+    "modelos": "SELECT id, nome FROM modelos_impressora ORDER BY nome",
+}
+
+
+class TabelaReferencia:
+    """Linhas (id, nome) de uma tabela de referência com acesso O(1) nos dois sentidos"""
+
+    __slots__ = ("linhas", "id_por_nome", "nome_por_id")
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.nome_por_id = dict(linhas)
+        # Nomes repetidos resolvem para o primeiro id, como o filtro .iloc[0] fazia
+        self.id_por_nome = {}
+        for id_, nome in linhas:
+            self.id_por_nome.setdefault(nome, id_)
+
+    @property
+    def nomes(self):
+        """Nomes na ordem da consulta (para opções de selectbox)"""
+        return [nome for _, nome in self.linhas]
+
+    def __len__(self):
+        return len(self.linhas)
+
+    def __bool__(self):
+        return bool(self.linhas)
+
+
+class Referencias:
+    """Retrato imutável de todas as tabelas de referência numa mesma versão"""
+
+    __slots__ = ("versao", "cores", "fabricantes", "capacidades", "modelos")
+
+    def __init__(self, versao, tabelas):
+        self.versao = versao
+        for nome in CONSULTAS_REFERENCIA:
+            setattr(self, nome, tabelas[nome])
+
+
+class CacheReferencias:
+    """Cache compartilhado entre sessões, invalidado pela versão dos dados"""
+
+    def __init__(self, gerenciador):
+        self.gerenciador = gerenciador
+        self._lock = threading.Lock()
+        self._atual = None
+        self.recargas = 0
+
+    def obter(self):
+        """Retorna as referências atuais, recarregando apenas se o banco mudou"""
+        versao = self.gerenciador.versao_dados()
+        atual = self._atual
+        if atual is not None and atual.versao == versao:
+            return atual
+
+        with self._lock:
+            # Outra sessão pode ter recarregado enquanto esperávamos o lock
+            if self._atual is not None and self._atual.versao == versao:
+                return self._atual
+            self._atual = Referencias(versao, self._carregar())
+            self.recargas += 1
+            return self._atual
+
+    def _carregar(self):
+        tabelas = {}
+        with self.gerenciador.leitura() as conn:
+            for nome, query in CONSULTAS_REFERENCIA.items():
+                try:
+                    linhas = conn.execute(query).fetchall()
+                except sqlite3.OperationalError:
+                    # Banco ainda não inicializado: tabela inexistente
+                    linhas = []
+                tabelas[nome] = TabelaReferencia(linhas)
+        return tabelas
+
+    def invalidar(self):
+        """Força a recarga na próxima chamada de `obter`"""
+        with self._lock:
+            self._atual = None
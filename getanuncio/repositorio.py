@@ -0,0 +1,186 @@
+"""Consultas do catálogo como funções tipadas, sem Streamlit nem pandas
+
+`Repositorio` empresta conexões do `GerenciadorConexoes` e devolve listas de
+namedtuples (`Fabricante`, `Cor`, `Estatisticas`...), que servem tanto às
+páginas do app quanto à linha de comando e a scripts. Com uma
+`Instrumentacao`, cada comando é cronometrado como no `executar_sql` do app.
+Só `tabela()` precisa de pyarrow, importado na primeira chamada.
+"""
+from collections import namedtuple
+from datetime import date
+
+from getanuncio.consultas import (
+    SQL_CARTUCHOS_POR_COR, SQL_CARTUCHOS_POR_IMPRESSORA, SQL_CONTAR_CARTUCHOS, SQL_CONTAR_COMPATIBILIDADES,
+    SQL_ESTATISTICAS, SQL_LISTAR_CAPACIDADES, SQL_LISTAR_CORES, SQL_LISTAR_FABRICANTES, SQL_LISTAR_MODELOS,
+    SQL_LISTAR_TABELAS, SQL_PAINEL
+)
+from getanuncio.migracoes import inicializar_banco
+
+# Datas (`data_criacao`) vêm como segundos desde 1970, em UTC
+Fabricante = namedtuple("Fabricante", ["id", "nome", "data_criacao"])
+ModeloImpressora = namedtuple("ModeloImpressora", ["id", "nome", "fabricante", "data_criacao"])
+Cor = namedtuple("Cor", ["id", "nome", "codigo_hex", "data_criacao"])
+Capacidade = namedtuple("Capacidade", ["id", "capacidade_ml", "data_criacao"])
+CartuchosPorCor = namedtuple("CartuchosPorCor", ["cor", "quantidade"])
+CartuchosPorImpressora = namedtuple("CartuchosPorImpressora", ["modelo_impressora", "fabricante", "quantidade"])
+Estatisticas = namedtuple(
+    "Estatisticas",
+    ["fabricantes", "modelos", "cores", "capacidades", "cartuchos", "associacoes", "compatibilidades"]
+)
+CartuchosPorFabricante = namedtuple("CartuchosPorFabricante", ["fabricante", "quantidade"])
+CartuchosPorCapacidade = namedtuple("CartuchosPorCapacidade", ["capacidade_ml", "quantidade"])
+CartuchosPorDia = namedtuple("CartuchosPorDia", ["dia", "quantidade"])
+Painel = namedtuple(
+    "Painel", ["estatisticas", "por_cor", "por_fabricante", "por_capacidade", "por_impressora", "por_dia"]
+)
+ColunaTabela = namedtuple("ColunaTabela", ["cid", "nome", "tipo", "obrigatorio", "padrao", "chave_primaria"])
+Consulta = namedtuple("Consulta", ["colunas", "linhas"])
+
+# Campo de `Estatisticas` -> tabela contada no resumo
+_TABELAS_ESTATISTICAS = {
+    "fabricantes": "fabricantes", "modelos": "modelos_impressora", "cores": "cores_referencia",
+    "capacidades": "capacidades", "cartuchos": "cartuchos", "associacoes": "cartucho_capacidades",
+    "compatibilidades": "cartucho_impressoras",
+}
+
+
+class Repositorio:
+    """Leituras do catálogo sobre um `GerenciadorConexoes`
+
+    `instrumentacao`, se informada, registra cada comando; `pagina()`, se
+    informada, diz de onde ele veio (o app passa a página atual).
+    """
+
+    def __init__(self, gerenciador, instrumentacao=None, pagina=None):
+        self.gerenciador = gerenciador
+        self.instrumentacao = instrumentacao
+        self.pagina = pagina
+
+    def _rodar(self, sql, params, ler, escrita=False):
+        """Executa `sql` e devolve `ler(cursor)`, cronometrando se houver instrumentação"""
+        if self.instrumentacao is None:
+            return self._executar(sql, params, ler, escrita)
+
+        pagina = self.pagina() if self.pagina is not None else None
+        # A medição inclui a espera pela conexão (ou pela fila de escrita)
+        with self.instrumentacao.medir(sql, params, pagina) as medicao:
+            resultado = self._executar(sql, params, ler, escrita)
+            medicao.linhas = resultado if escrita else len(resultado)
+        return resultado
+
+    def _executar(self, sql, params, ler, escrita):
+        if escrita:
+            return self.gerenciador.enfileirar(self._ler, sql, params, ler, escrita).result()
+        with self.gerenciador.leitura() as conn:
+            return self._ler(conn, sql, params, ler, escrita)
+
+    @staticmethod
+    def _ler(conn, sql, params, ler, escrita):
+        cursor = conn.execute(sql, params or ())
+        try:
+            resultado = ler(cursor)
+            # Comandos de escrita com RETURNING também chegam pelas leituras
+            if not escrita and conn.in_transaction:
+                conn.commit()
+            return resultado
+        finally:
+            cursor.close()
+
+    def consultar(self, sql, params=None):
+        """Executa uma consulta e devolve `Consulta(colunas, linhas)`"""
+        def ler(cursor):
+            colunas = [d[0] for d in cursor.description or ()]
+            return Consulta(colunas, cursor.fetchall())
+        return self._rodar(sql, params, ler)
+
+    def tabela(self, sql, params=None):
+        """Executa uma consulta e devolve uma `pyarrow.Table` (ver `getanuncio.resultados`)"""
+        from getanuncio.resultados import tabela_do_cursor
+        return self._rodar(sql, params, tabela_do_cursor)
+
+    def executar(self, sql, params=None):
+        """Executa um comando de escrita pela fila do escritor; retorna as linhas afetadas"""
+        return self._rodar(sql, params, lambda cursor: cursor.rowcount, escrita=True)
+
+    def _listar(self, tipo, sql, params=None):
+        return self._rodar(sql, params, lambda cursor: list(map(tipo._make, cursor)))
+
+    def _contar(self, sql):
+        return self._rodar(sql, None, lambda cursor: cursor.fetchone())[0]
+
+    def fabricantes(self):
+        """Fabricantes em ordem de nome"""
+        return self._listar(Fabricante, SQL_LISTAR_FABRICANTES)
+
+    def modelos(self):
+        """Modelos de impressora com o nome do fabricante, em ordem de nome"""
+        return self._listar(ModeloImpressora, SQL_LISTAR_MODELOS)
+
+    def cores(self):
+        """Cores de referência em ordem de nome"""
+        return self._listar(Cor, SQL_LISTAR_CORES)
+
+    def capacidades(self):
+        """Capacidades em ordem crescente de ml"""
+        return self._listar(Capacidade, SQL_LISTAR_CAPACIDADES)
+
+    def contar_cartuchos(self):
+        """Total de cartuchos"""
+        return self._contar(SQL_CONTAR_CARTUCHOS)
+
+    def contar_compatibilidades(self):
+        """Total de pares cartucho × impressora"""
+        return self._contar(SQL_CONTAR_COMPATIBILIDADES)
+
+    def cartuchos_por_cor(self):
+        """Quantidade de cartuchos por cor, da maior para a menor"""
+        return self._listar(CartuchosPorCor, SQL_CARTUCHOS_POR_COR)
+
+    def cartuchos_por_impressora(self, limite=10):
+        """As `limite` impressoras com mais cartuchos compatíveis"""
+        return self._listar(CartuchosPorImpressora, SQL_CARTUCHOS_POR_IMPRESSORA, (limite,))
+
+    def estatisticas(self):
+        """Contagem de linhas de cada tabela do catálogo"""
+        return self._rodar(SQL_ESTATISTICAS, None, lambda cursor: Estatisticas._make(cursor.fetchone()))
+
+    def painel(self, limite_impressoras=10):
+        """Tudo o que o Dashboard mostra, numa única leitura do resumo `estatisticas_catalogo`
+
+        Cores, fabricantes e capacidades vêm da maior para a menor quantidade,
+        as `limite_impressoras` impressoras com mais cartuchos também e os
+        dias (`datetime.date`) em ordem cronológica.
+        """
+        linhas = self._rodar(SQL_PAINEL, (limite_impressoras,), lambda cursor: cursor.fetchall())
+        tabelas = {}
+        grupos = {"cor": [], "fabricante": [], "capacidade": [], "impressora": [], "dia": []}
+        for dimensao, chave, quantidade, rotulo, fabricante in linhas:
+            if dimensao == "tabela":
+                tabelas[chave] = quantidade
+            elif rotulo is not None and quantidade > 0:
+                grupos[dimensao].append((rotulo, fabricante, quantidade))
+
+        def ordenar(tipo, itens):
+            return [tipo(rotulo, quantidade) for rotulo, _, quantidade in sorted(itens, key=lambda i: -i[2])]
+
+        return Painel(
+            Estatisticas(**{campo: tabelas.get(tabela, 0) for campo, tabela in _TABELAS_ESTATISTICAS.items()}),
+            ordenar(CartuchosPorCor, grupos["cor"]),
+            ordenar(CartuchosPorFabricante, grupos["fabricante"]),
+            ordenar(CartuchosPorCapacidade, grupos["capacidade"]),
+            [CartuchosPorImpressora(*item) for item in sorted(grupos["impressora"], key=lambda i: -i[2])],
+            [CartuchosPorDia(date.fromisoformat(dia), quantidade) for dia, _, quantidade in sorted(grupos["dia"])],
+        )
+
+    def tabelas(self):
+        """Nomes das tabelas do banco (sem as internas do FTS5)"""
+        return self._rodar(SQL_LISTAR_TABELAS, None, lambda cursor: [nome for (nome,) in cursor])
+
+    def colunas(self, tabela):
+        """Estrutura de uma tabela (`PRAGMA table_info`)"""
+        return self._listar(ColunaTabela, f"PRAGMA table_info({tabela})")
+
+    def inicializar(self):
+        """Aplica as migrações pendentes e insere os dados iniciais; retorna as fases"""
+        with self.gerenciador.escrita() as conn:
+            return inicializar_banco(conn)
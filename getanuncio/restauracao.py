@@ -0,0 +1,238 @@
+"""Restauração de backups (.sql, .sql.gz ou snapshot binário .db)
+
+O backup é primeiro reconstruído num arquivo temporário, ao lado do banco:
+o dump SQL é aplicado numa única transação, com chaves estrangeiras
+desligadas e índices/triggers criados só no final. As contagens de linhas
+são conferidas contra o arquivo de origem e só então o conteúdo é copiado
+para o banco em uso pela API de backup do SQLite, num único passo sob o lock
+de escrita: as sessões ativas veem o catálogo antigo ou o novo, nunca um
+catálogo restaurado pela metade.
+"""
+import gzip
+import io
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from collections import Counter, namedtuple
+
+from getanuncio.migracoes import MIGRACOES, migrar, objetos_derivados, reconstruir_derivados, versao_atual
+
+FORMATO_SQL = "sql"
+FORMATO_SQL_GZ = "sql.gz"
+FORMATO_BINARIO = "db"
+
+_CABECALHO_SQLITE = b"SQLite format 3\x00"
+_CABECALHO_GZIP = b"\x1f\x8b"
+
+_RE_INSERT = re.compile(r'^\s*INSERT\s+INTO\s+["`\[]?(\w+)', re.IGNORECASE)
+_RE_ADIADO = re.compile(r"^\s*CREATE\s+(UNIQUE\s+)?(INDEX|TRIGGER)\b", re.IGNORECASE)
+_RE_CREATE_TABLE = re.compile(r"^\s*CREATE\s+TABLE\b", re.IGNORECASE)
+_RE_VERSAO = re.compile(r"^\s*PRAGMA\s+user_version\s*=\s*\d+\s*;\s*$", re.IGNORECASE)
+_RE_TRANSACAO = re.compile(r"^\s*(BEGIN(\s+TRANSACTION)?|COMMIT|END(\s+TRANSACTION)?)\s*;\s*$",
+                           re.IGNORECASE)
+
+ResultadoRestauracao = namedtuple(
+    "ResultadoRestauracao", ["formato", "linhas_por_tabela", "duracao", "avisos"]
+)
+
+
+class ErroRestauracao(Exception):
+    """Backup inválido ou inconsistente; o banco em uso não foi alterado"""
+
+
+def detectar_formato(caminho):
+    """Identifica o formato do backup pelo conteúdo do arquivo"""
+    with open(caminho, "rb") as f:
+        inicio = f.read(len(_CABECALHO_SQLITE))
+    if inicio == _CABECALHO_SQLITE:
+        return FORMATO_BINARIO
+    if inicio.startswith(_CABECALHO_GZIP):
+        return FORMATO_SQL_GZ
+    return FORMATO_SQL
+
+
+def _comandos(arquivo):
+    # Junta linhas até formar um comando SQL completo
+    buffer = []
+    for linha in arquivo:
+        buffer.append(linha)
+        if linha.rstrip().endswith(";"):
+            comando = "".join(buffer)
+            if sqlite3.complete_statement(comando):
+                yield comando
+                buffer = []
+    resto = "".join(buffer).strip()
+    if resto and not all(l.lstrip().startswith("--") for l in resto.splitlines() if l.strip()):
+        raise ErroRestauracao("O arquivo termina com um comando SQL incompleto")
+
+
+def _tabelas_usuario(conn):
+    return [nome for (nome,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+
+
+def _contar_linhas(conn):
+    return {tabela: conn.execute(f'SELECT COUNT(*) FROM "{tabela}"').fetchone()[0]
+            for tabela in _tabelas_usuario(conn)}
+
+
+def _aplicar_dump(caminho, formato, temporario, gerenciador):
+    """Carrega o dump no banco temporário e retorna as contagens esperadas"""
+    conn = sqlite3.connect(temporario, isolation_level=None)
+    esperadas = Counter()
+    adiados = []
+    try:
+        # Arquivo descartável: sem journal nem fsync durante a carga
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA foreign_keys=OFF")
+        conn.execute("BEGIN")
+
+        abrir = gzip.open if formato == FORMATO_SQL_GZ else open
+        with abrir(caminho, "rt", encoding="utf-8") as arquivo:
+            primeiro = True
+            versionado = False
+            for comando in _comandos(arquivo):
+                comando_limpo = _sem_comentarios(comando)
+                if not comando_limpo or _RE_TRANSACAO.match(comando_limpo):
+                    continue
+                if _RE_VERSAO.match(comando_limpo):
+                    conn.execute(comando_limpo)
+                    versionado = True
+                    continue
+                if primeiro:
+                    primeiro = False
+                    if not _RE_CREATE_TABLE.match(comando_limpo):
+                        if versionado:
+                            # Só INSERTs, mas com a versão: usa o esquema do banco atual
+                            _copiar_esquema(gerenciador, conn, adiados)
+                        else:
+                            # Backup antigo ("Gerar Backup SQL"): os dados entram no
+                            # esquema inicial, na versão 0, e `migrar` os leva até a atual
+                            _criar_esquema_inicial(conn)
+                if _RE_ADIADO.match(comando_limpo):
+                    adiados.append(comando)
+                    continue
+                insert = _RE_INSERT.match(comando_limpo)
+                if insert:
+                    if insert.group(1) == "sqlite_sequence" and not esperadas["sqlite_sequence"]:
+                        # Os backups antigos trazem a sequência depois dos dados, sem o
+                        # DELETE que o iterdump emite: descarta a gerada pelos INSERTs
+                        conn.execute("DELETE FROM sqlite_sequence")
+                    esperadas[insert.group(1)] += 1
+                try:
+                    conn.execute(comando)
+                except sqlite3.Error as e:
+                    raise ErroRestauracao(f"{e} em: {comando_limpo[:200]}") from None
+
+        # Índices e triggers depois dos dados: uma construção em lote por índice
+        for comando in adiados:
+            conn.execute(comando)
+        conn.execute("COMMIT")
+        return dict(esperadas), conn
+    except BaseException:
+        conn.close()
+        raise
+
+
+def _sem_comentarios(comando):
+    linhas = [l for l in comando.splitlines() if not l.lstrip().startswith("--")]
+    return "\n".join(linhas).strip()
+
+
+def _criar_esquema_inicial(conn):
+    conn.execute("PRAGMA user_version=0")
+    for comando in _comandos(io.StringIO(MIGRACOES[0].sql)):
+        conn.execute(comando)
+
+
+def _copiar_esquema(gerenciador, conn, adiados):
+    with gerenciador.leitura() as origem:
+        derivados = objetos_derivados(origem)
+        conn.execute(f"PRAGMA user_version={versao_atual(origem)}")
+        objetos = origem.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL "
+            "AND name NOT LIKE 'sqlite_%' ORDER BY type = 'table' DESC"
+        ).fetchall()
+    for tipo, nome, sql in objetos:
+        if nome in derivados:
+            # Índice FTS5 e seus triggers: `migrar` os recria
+            continue
+        if tipo == "table":
+            conn.execute(sql)
+        else:
+            adiados.append(sql)
+
+
+def _preparar_binario(caminho, temporario):
+    origem = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+    try:
+        resultado = origem.execute("PRAGMA quick_check").fetchone()[0]
+        if resultado != "ok":
+            raise ErroRestauracao(f"Snapshot corrompido: {resultado}")
+        esperadas = _contar_linhas(origem)
+        conn = sqlite3.connect(temporario, isolation_level=None)
+        origem.backup(conn)
+    except sqlite3.DatabaseError as e:
+        raise ErroRestauracao(f"Arquivo não é um banco SQLite válido: {e}") from None
+    finally:
+        origem.close()
+    return esperadas, conn
+
+
+def restaurar_backup(gerenciador, caminho):
+    """Restaura o backup em `caminho` sobre o banco do gerenciador
+
+    Levanta `ErroRestauracao` (sem alterar o banco em uso) se o arquivo for
+    inválido ou se as contagens de linhas não baterem com a origem.
+    """
+    inicio = time.perf_counter()
+    formato = detectar_formato(caminho)
+    avisos = []
+
+    diretorio = os.path.dirname(os.path.abspath(gerenciador.db_path))
+    fd, temporario = tempfile.mkstemp(dir=diretorio, suffix=".restauracao")
+    os.close(fd)
+    conn = None
+    try:
+        if formato == FORMATO_BINARIO:
+            esperadas, conn = _preparar_binario(caminho, temporario)
+        else:
+            esperadas, conn = _aplicar_dump(caminho, formato, temporario, gerenciador)
+
+        # Conferência: cada tabela tem exatamente as linhas da origem
+        obtidas = _contar_linhas(conn)
+        divergentes = [
+            f"{tabela}: esperado {n}, restaurado {obtidas.get(tabela, 0)}"
+            for tabela, n in esperadas.items()
+            if not tabela.startswith("sqlite_") and obtidas.get(tabela, 0) != n
+        ]
+        if divergentes:
+            raise ErroRestauracao("Contagem de linhas divergente: " + "; ".join(divergentes))
+
+        violacoes = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if violacoes:
+            avisos.append(f"{len(violacoes)} referência(s) de chave estrangeira inválidas no backup")
+
+        # Leva o esquema restaurado até a versão atual ainda no temporário.
+        # Dumps trazem a versão do esquema (os antigos não: ficam na versão 0
+        # e as migrações refazem tudo) mas não os índices de busca.
+        if formato != FORMATO_BINARIO:
+            reconstruir_derivados(conn)
+        migrar(conn)
+
+        # Troca atômica: copia tudo num único passo sob o lock de escrita
+        with gerenciador.escrita() as destino:
+            conn.backup(destino, pages=-1)
+    except sqlite3.Error as e:
+        raise ErroRestauracao(str(e)) from None
+    finally:
+        if conn is not None:
+            conn.close()
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    return ResultadoRestauracao(formato, obtidas, time.perf_counter() - inicio, avisos)
@@ -0,0 +1,194 @@
+"""Resultados de consultas como tabelas Arrow, montadas direto do cursor
+
+O cursor é lido em blocos de `fetchmany`; cada bloco vira arrays Arrow
+coluna a coluna e as tuplas são descartadas em seguida, de modo que só um
+bloco de objetos Python existe por vez. No fim, colunas de texto repetitivo
+(cor, fabricante, impressora) são codificadas como dicionário — cada valor
+distinto é guardado uma vez — e colunas `data_*` viram timestamps: as
+consultas do app já as entregam como `unixepoch(...)`, e o texto do SQLite
+('AAAA-MM-DD HH:MM:SS') é convertido pelo Arrow. A formatação fica para a
+exibição. A tabela vai direto para o `st.dataframe`; `quadro_do_cursor`
+devolve o equivalente em pandas (categorias e strings Arrow).
+
+Também mede a memória por linha de cada caminho pela linha de comando:
+
+    python -m getanuncio.resultados --db cartuchos.db
+"""
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+LINHAS_POR_BLOCO = 10_000
+# Texto vira dicionário com pelo menos tantas linhas e no máximo esta fração de valores distintos
+MINIMO_LINHAS_DICIONARIO = 256
+FRACAO_DISTINTOS_DICIONARIO = 0.5
+PREFIXO_DATA = "data_"
+FORMATO_DATA_SQLITE = "%Y-%m-%d %H:%M:%S"
+AMOSTRA_MEMORIA = 1000
+
+MemoriaResultado = namedtuple(
+    "MemoriaResultado",
+    ["linhas", "colunas", "bytes_tuplas", "bytes_pandas", "bytes_arrow", "bytes_pandas_arrow",
+     "duracao_tuplas", "duracao_arrow"]
+)
+
+
+def memoria_tuplas(linhas):
+    """Bytes aproximados das linhas em memória (tuplas + valores), por amostragem"""
+    if not linhas:
+        return 0
+    amostra = linhas[:AMOSTRA_MEMORIA]
+    tamanho = sum(sys.getsizeof(linha) + sum(sys.getsizeof(valor) for valor in linha) for linha in amostra)
+    return tamanho * len(linhas) // len(amostra)
+
+
+def _array(valores):
+    # O SQLite aceita tipos misturados numa coluna; o que o Arrow não unifica vira texto
+    try:
+        return pa.array(valores)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if valor is None else str(valor) for valor in valores], pa.string())
+
+
+def _unificar(partes):
+    # Blocos da mesma coluna podem ter tipos diferentes (só NULL, inteiros e reais...)
+    tipos = {parte.type for parte in partes} - {pa.null()}
+    if not tipos:
+        return pa.chunked_array(partes, pa.null())
+    if len(tipos) == 1:
+        tipo = tipos.pop()
+    elif tipos <= {pa.int64(), pa.float64()}:
+        tipo = pa.float64()
+    else:
+        tipo = pa.string()
+    return pa.chunked_array([parte.cast(tipo) for parte in partes], tipo)
+
+
+def _finalizar_coluna(nome, coluna):
+    if nome.startswith(PREFIXO_DATA):
+        if pa.types.is_integer(coluna.type):
+            return coluna.cast(pa.timestamp("s"))
+        if pa.types.is_string(coluna.type):
+            try:
+                return pc.strptime(coluna, format=FORMATO_DATA_SQLITE, unit="s")
+            except pa.ArrowInvalid:
+                return coluna
+    if (pa.types.is_string(coluna.type) and len(coluna) >= MINIMO_LINHAS_DICIONARIO
+            and pc.count_distinct(coluna).as_py() <= len(coluna) * FRACAO_DISTINTOS_DICIONARIO):
+        return coluna.combine_chunks().dictionary_encode()
+    return coluna
+
+
+class MontadorTabela:
+    """Acumula blocos de linhas como arrays Arrow; `tabela()` une os blocos numa tabela"""
+
+    def __init__(self, colunas):
+        self.colunas = list(colunas)
+        self.linhas = 0
+        self._partes = [[] for _ in self.colunas]
+        self._tabela = None
+
+    def adicionar(self, bloco):
+        """Converte um bloco de tuplas em arrays, coluna a coluna"""
+        for partes, valores in zip(self._partes, zip(*bloco)):
+            partes.append(_array(valores))
+        self.linhas += len(bloco)
+        self._tabela = None
+
+    @property
+    def nbytes(self):
+        """Bytes dos arrays Arrow acumulados (antes da codificação em dicionário)"""
+        return sum(parte.nbytes for partes in self._partes for parte in partes)
+
+    def tabela(self):
+        """`pyarrow.Table` com os blocos unidos, datas convertidas e texto repetitivo em dicionário"""
+        if self._tabela is None:
+            self._tabela = pa.table({
+                nome: _finalizar_coluna(nome, _unificar(partes) if partes else pa.chunked_array([], pa.null()))
+                for nome, partes in zip(self.colunas, self._partes)
+            })
+        return self._tabela
+
+
+def tabela_do_cursor(cursor, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Lê o cursor inteiro em blocos para uma `pyarrow.Table`"""
+    montador = MontadorTabela(d[0] for d in cursor.description or ())
+    while True:
+        bloco = cursor.fetchmany(linhas_por_bloco)
+        if not bloco:
+            return montador.tabela()
+        montador.adicionar(bloco)
+
+
+def tabela_das_linhas(colunas, linhas):
+    """`pyarrow.Table` a partir de linhas já buscadas"""
+    montador = MontadorTabela(colunas)
+    montador.adicionar(linhas)
+    return montador.tabela()
+
+
+def quadro_do_cursor(cursor, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """DataFrame do cursor via Arrow: dicionários viram categorias, datas viram datetime64"""
+    return tabela_do_cursor(cursor, linhas_por_bloco).to_pandas()
+
+
+def medir_memoria(conn, sql, params=()):
+    """Memória do mesmo resultado por `fetchall` + DataFrame (como antes) e pelo caminho Arrow"""
+    import pandas as pd
+
+    inicio = time.perf_counter()
+    cursor = conn.execute(sql, params)
+    colunas = [d[0] for d in cursor.description]
+    linhas = cursor.fetchall()
+    quadro = pd.DataFrame(linhas, columns=colunas)
+    duracao_tuplas = time.perf_counter() - inicio
+    bytes_tuplas = memoria_tuplas(linhas)
+    bytes_pandas = int(quadro.memory_usage(deep=True).sum())
+    del linhas, quadro
+
+    inicio = time.perf_counter()
+    tabela = tabela_do_cursor(conn.execute(sql, params))
+    duracao_arrow = time.perf_counter() - inicio
+    bytes_pandas_arrow = int(tabela.to_pandas().memory_usage(deep=True).sum())
+    return MemoriaResultado(
+        tabela.num_rows, colunas, bytes_tuplas, bytes_pandas, tabela.nbytes, bytes_pandas_arrow,
+        duracao_tuplas, duracao_arrow,
+    )
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando"""
+    from getanuncio.conexao import GerenciadorConexoes
+    from getanuncio.consultas import SQL_LISTAR_MODELOS, montar_filtro_cartuchos
+    from getanuncio.migracoes import migrar
+
+    parser = argparse.ArgumentParser(description="Compara a memória por linha de tuplas/pandas e Arrow")
+    parser.add_argument("--db", default="cartuchos.db", help="arquivo do banco SQLite")
+    parser.add_argument("--sql", help="consulta a medir (padrão: a listagem de cartuchos e a de modelos)")
+    args = parser.parse_args(argv)
+
+    consultas = [("consulta", args.sql)] if args.sql else [
+        ("cartuchos", montar_filtro_cartuchos()[0]), ("modelos", SQL_LISTAR_MODELOS),
+    ]
+    gerenciador = GerenciadorConexoes(args.db, ao_abrir_escritor=migrar)
+    try:
+        with gerenciador.leitura() as conn:
+            medicoes = [(nome, medir_memoria(conn, sql)) for nome, sql in consultas]
+    finally:
+        gerenciador.fechar()
+
+    for nome, m in medicoes:
+        por_linha = lambda total: total / m.linhas if m.linhas else 0
+        print(f"{nome}: {m.linhas:,} linhas | bytes/linha: tuplas {por_linha(m.bytes_tuplas):.0f}, "
+              f"DataFrame {por_linha(m.bytes_pandas):.0f}, Arrow {por_linha(m.bytes_arrow):.0f}, "
+              f"DataFrame via Arrow {por_linha(m.bytes_pandas_arrow):.0f} | "
+              f"fetchall + DataFrame {m.duracao_tuplas * 1000:.0f} ms, Arrow {m.duracao_arrow * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""Catálogo sintético e determinístico para testes de carga e benchmarks
+
+Gera um banco novo, já no esquema atual, com `cartuchos` cartuchos: a mesma
+`semente` produz sempre os mesmos dados. As distribuições imitam um
+catálogo real: poucos fabricantes e cores concentram a maior parte dos
+cartuchos (pesos de Zipf), cada cartucho tem de 1 a 4 capacidades e serve em
+algumas impressoras, quase sempre do mesmo fabricante.
+
+A carga segue o caminho da restauração: triggers e índices secundários saem
+antes dos INSERTs e voltam depois (uma construção em lote por índice), o
+registro de alterações é preenchido de uma vez e o índice de busca é
+reconstruído por `reconstruir_derivados`.
+
+Também pode ser usado pela linha de comando:
+
+    python -m getanuncio.sintetico cartuchos.db --cartuchos 100000 --semente 42
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from getanuncio.migracoes import inicializar_banco, objetos_derivados, reconstruir_derivados
+
+SEMENTE_PADRAO = 42
+LINHAS_POR_LOTE = 20_000
+EXPOENTE_ZIPF = 1.1
+
+FABRICANTES = 24
+CORES_EXTRAS = ["Photo Black", "Matte Black", "Red", "Green", "Blue", "Orange", "Violet", "Light Light Black"]
+CAPACIDADES_ML = [10, 15, 30, 50, 70, 100, 127, 250, 500, 1000]
+# Modelos de impressora: um para cada tantos cartuchos (entre os limites)
+CARTUCHOS_POR_MODELO = 20
+MIN_MODELOS, MAX_MODELOS = 50, 20_000
+# Quantas capacidades e impressoras cada cartucho tem, com os pesos
+CAPACIDADES_POR_CARTUCHO = ([1, 2, 3, 4], [35, 40, 20, 5])
+IMPRESSORAS_POR_CARTUCHO = ([1, 2, 3, 4, 6, 10], [30, 30, 20, 10, 7, 3])
+# Chance de uma impressora compatível ser de outro fabricante (cartucho genérico)
+FRACAO_OUTRO_FABRICANTE = 0.05
+INICIO_DATAS = datetime(2021, 1, 1)
+DIAS_DATAS = 3 * 365
+
+ResultadoSintetico = namedtuple(
+    "ResultadoSintetico",
+    ["caminho", "semente", "cartuchos", "modelos", "associacoes", "compatibilidades", "tamanho_bytes", "duracao"]
+)
+
+
+def pesos_zipf(n, expoente=EXPOENTE_ZIPF):
+    """Pesos acumulados de Zipf para `n` itens (o primeiro é o mais frequente)"""
+    return list(itertools.accumulate(1 / (posicao ** expoente) for posicao in range(1, n + 1)))
+
+
+def _referencias(conn, rng, cartuchos):
+    """Completa fabricantes, cores e capacidades, cria os modelos; retorna os ids de cada um"""
+    conn.executemany("INSERT OR IGNORE INTO fabricantes (nome) VALUES (?)",
+                     [(f"Fabricante {i:02d}",) for i in range(1, FABRICANTES + 1)])
+    conn.executemany("INSERT OR IGNORE INTO cores_referencia (nome, codigo_hex) VALUES (?, ?)",
+                     [(nome, f"#{rng.randrange(0x1000000):06X}") for nome in CORES_EXTRAS])
+    conn.executemany("INSERT OR IGNORE INTO capacidades (capacidade_ml) VALUES (?)",
+                     [(ml,) for ml in CAPACIDADES_ML])
+    fabricante_ids = [id_ for (id_,) in conn.execute("SELECT id FROM fabricantes ORDER BY id")][:FABRICANTES]
+    cor_ids = [id_ for (id_,) in conn.execute("SELECT id FROM cores_referencia ORDER BY id")]
+    capacidade_ids = [id_ for (id_,) in conn.execute("SELECT id FROM capacidades ORDER BY id")]
+
+    # Fabricantes grandes têm mais modelos (e, por eles, mais cartuchos)
+    total_modelos = min(max(cartuchos // CARTUCHOS_POR_MODELO, MIN_MODELOS), MAX_MODELOS)
+    pesos_fabricantes = pesos_zipf(len(fabricante_ids))
+    donos = rng.choices(fabricante_ids, cum_weights=pesos_fabricantes, k=total_modelos)
+    conn.executemany("INSERT INTO modelos_impressora (nome, fabricante_id) VALUES (?, ?)",
+                     [(f"Impressora {numero:05d}", dono) for numero, dono in enumerate(donos, 1)])
+    modelos_por_fabricante = {}
+    for modelo_id, fabricante_id in conn.execute("SELECT id, fabricante_id FROM modelos_impressora ORDER BY id"):
+        modelos_por_fabricante.setdefault(fabricante_id, []).append(modelo_id)
+    return fabricante_ids, cor_ids, capacidade_ids, modelos_por_fabricante
+
+
+def _lotes(rng, cartuchos, cor_ids, capacidade_ids, modelos_por_fabricante):
+    """Gera, lote a lote, (cartuchos, capacidades, compatibilidades) a inserir"""
+    fabricantes = sorted(modelos_por_fabricante, key=lambda f: -len(modelos_por_fabricante[f]))
+    pesos_fabricantes = pesos_zipf(len(fabricantes))
+    pesos_cores = pesos_zipf(len(cor_ids))
+    todos_modelos = [m for f in fabricantes for m in modelos_por_fabricante[f]]
+    quantidades_cap, pesos_cap = CAPACIDADES_POR_CARTUCHO
+    quantidades_imp, pesos_imp = IMPRESSORAS_POR_CARTUCHO
+
+    for inicio in range(1, cartuchos + 1, LINHAS_POR_LOTE):
+        fim = min(inicio + LINHAS_POR_LOTE, cartuchos + 1)
+        linhas, capacidades, impressoras = [], [], []
+        for cartucho_id in range(inicio, fim):
+            criado = INICIO_DATAS + timedelta(seconds=rng.randrange(DIAS_DATAS * 86400))
+            data = criado.strftime("%Y-%m-%d %H:%M:%S")
+            cor_id = rng.choices(cor_ids, cum_weights=pesos_cores)[0]
+            linhas.append((cartucho_id, f"T{cartucho_id:07d}", cor_id, f"REF-{rng.randrange(10**8):08d}",
+                           data, data))
+
+            n = rng.choices(quantidades_cap, weights=pesos_cap)[0]
+            capacidades.extend((cartucho_id, c) for c in rng.sample(capacidade_ids, min(n, len(capacidade_ids))))
+
+            fabricante = rng.choices(fabricantes, cum_weights=pesos_fabricantes)[0]
+            proprios = modelos_por_fabricante[fabricante]
+            escolhidos = set()
+            for _ in range(rng.choices(quantidades_imp, weights=pesos_imp)[0]):
+                origem = todos_modelos if rng.random() < FRACAO_OUTRO_FABRICANTE else proprios
+                escolhidos.add(rng.choice(origem))
+            impressoras.extend((cartucho_id, m) for m in escolhidos)
+        yield linhas, capacidades, impressoras
+
+
+def gerar_catalogo(caminho, cartuchos, semente=SEMENTE_PADRAO, progresso=None):
+    """Cria em `caminho` um banco novo com `cartuchos` cartuchos sintéticos
+
+    O arquivo não pode existir. `progresso(gerados, total)` é chamado a cada
+    lote, se informado.
+    """
+    if os.path.exists(caminho):
+        raise FileExistsError(f"O arquivo já existe: {caminho}")
+    inicio = time.perf_counter()
+    rng = random.Random(semente)
+    conn = sqlite3.connect(caminho, isolation_level=None)
+    try:
+        inicializar_banco(conn)
+        conn.execute("PRAGMA journal_mode=WAL")
+
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("BEGIN")
+        # Referências antes de tirar os índices: os UNIQUE evitam nomes repetidos
+        _, cor_ids, capacidade_ids, modelos_por_fabricante = _referencias(conn, rng, cartuchos)
+
+        # Triggers e índices secundários saem durante a carga; o índice de
+        # busca e seus triggers são recriados por reconstruir_derivados
+        derivados = objetos_derivados(conn)
+        adiados = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE type IN ('trigger', 'index') AND sql IS NOT NULL "
+            "ORDER BY type = 'trigger'"
+        ).fetchall()
+        for tipo, nome, _ in adiados:
+            conn.execute(f'DROP {tipo.upper()} "{nome}"')
+
+        modelos = sum(map(len, modelos_por_fabricante.values()))
+        associacoes = compatibilidades = gerados = 0
+        for linhas, capacidades, impressoras in _lotes(rng, cartuchos, cor_ids, capacidade_ids,
+                                                        modelos_por_fabricante):
+            conn.executemany(
+                "INSERT INTO cartuchos (id, modelo_cartucho, cor_id, codigo_referencia, data_criacao, "
+                "data_atualizacao) VALUES (?, ?, ?, ?, ?, ?)", linhas
+            )
+            conn.executemany("INSERT INTO cartucho_capacidades (cartucho_id, capacidade_id) VALUES (?, ?)",
+                             capacidades)
+            conn.executemany(
+                "INSERT INTO cartucho_impressoras (cartucho_id, modelo_impressora_id) VALUES (?, ?)", impressoras
+            )
+            gerados += len(linhas)
+            associacoes += len(capacidades)
+            compatibilidades += len(impressoras)
+            if progresso is not None:
+                progresso(gerados, cartuchos)
+
+        # O catálogo inteiro entra como novo para o primeiro feed
+        conn.execute("INSERT INTO alteracoes_cartuchos (cartucho_id, excluido) SELECT id, 0 FROM cartuchos ORDER BY id")
+        for tipo, nome, sql in adiados:
+            if nome not in derivados:
+                conn.execute(sql)
+        conn.execute("COMMIT")
+
+        reconstruir_derivados(conn)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except BaseException:
+        conn.close()
+        for sufixo in ("", "-wal", "-shm"):
+            if os.path.exists(caminho + sufixo):
+                os.remove(caminho + sufixo)
+        raise
+    conn.close()
+
+    return ResultadoSintetico(caminho, semente, cartuchos, modelos, associacoes, compatibilidades,
+                              os.path.getsize(caminho), time.perf_counter() - inicio)
+
+
+def main(argv=None, prog=None):
+    """Ponto de entrada da linha de comando"""
+    parser = argparse.ArgumentParser(prog=prog, description="Gera um catálogo sintético determinístico")
+    parser.add_argument("saida", help="arquivo .db a criar (não pode existir)")
+    parser.add_argument("--cartuchos", type=int, default=100_000, help="quantidade de cartuchos")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO, help="semente do gerador")
+    args = parser.parse_args(argv)
+
+    def mostrar(gerados, total):
+        print(f"\r{gerados:,}/{total:,} cartuchos", end="", file=sys.stderr, flush=True)
+
+    try:
+        resultado = gerar_catalogo(args.saida, args.cartuchos, args.semente, progresso=mostrar)
+    except (FileExistsError, OSError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+    print(file=sys.stderr)
+
+    print(f"{resultado.cartuchos:,} cartuchos, {resultado.modelos:,} modelos, "
+          f"{resultado.associacoes:,} capacidades, {resultado.compatibilidades:,} compatibilidades "
+          f"em {resultado.duracao:.1f}s ({resultado.tamanho_bytes / 1024 / 1024:.1f} MB): {resultado.caminho}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
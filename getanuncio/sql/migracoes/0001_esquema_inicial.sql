@@ -0,0 +1,46 @@
+-- Esquema inicial
+CREATE TABLE IF NOT EXISTS fabricantes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS cores_referencia (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    codigo_hex TEXT,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS capacidades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    capacidade_ml INTEGER NOT NULL,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS modelos_impressora (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    fabricante_id INTEGER,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (fabricante_id) REFERENCES fabricantes(id)
+);
+
+CREATE TABLE IF NOT EXISTS cartuchos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    modelo_cartucho TEXT NOT NULL,
+    cor_id INTEGER,
+    modelo_impressora_id INTEGER,
+    codigo_referencia TEXT,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (cor_id) REFERENCES cores_referencia(id),
+    FOREIGN KEY (modelo_impressora_id) REFERENCES modelos_impressora(id)
+);
+
+CREATE TABLE IF NOT EXISTS cartucho_capacidades (
+    cartucho_id INTEGER,
+    capacidade_id INTEGER,
+    PRIMARY KEY (cartucho_id, capacidade_id),
+    FOREIGN KEY (cartucho_id) REFERENCES cartuchos(id) ON DELETE CASCADE,
+    FOREIGN KEY (capacidade_id) REFERENCES capacidades(id)
+);
@@ -0,0 +1,16 @@
+-- Índices das colunas de junção, filtro e ordenação
+
+-- Junções das listagens e do filtro da página de Consultas
+CREATE INDEX IF NOT EXISTS idx_cartuchos_cor ON cartuchos(cor_id);
+CREATE INDEX IF NOT EXISTS idx_cartuchos_modelo_impressora ON cartuchos(modelo_impressora_id);
+CREATE INDEX IF NOT EXISTS idx_modelos_impressora_fabricante ON modelos_impressora(fabricante_id);
+CREATE INDEX IF NOT EXISTS idx_cartucho_capacidades_capacidade ON cartucho_capacidades(capacidade_id, cartucho_id);
+
+-- ORDER BY da listagem de cartuchos
+CREATE INDEX IF NOT EXISTS idx_cartuchos_modelo_cartucho ON cartuchos(modelo_cartucho);
+
+-- ORDER BY nome e filtros `nome = ?`: (nome, rowid) cobre `SELECT id, nome`
+CREATE INDEX IF NOT EXISTS idx_fabricantes_nome ON fabricantes(nome);
+CREATE INDEX IF NOT EXISTS idx_cores_referencia_nome ON cores_referencia(nome);
+CREATE INDEX IF NOT EXISTS idx_modelos_impressora_nome ON modelos_impressora(nome);
+CREATE INDEX IF NOT EXISTS idx_capacidades_ml ON capacidades(capacidade_ml);
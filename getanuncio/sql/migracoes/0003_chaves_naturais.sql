@@ -0,0 +1,47 @@
+-- Chaves naturais únicas em fabricantes, cores e capacidades
+-- Bancos antigos podem ter linhas repetidas (cada clique em "Inicializar Banco"
+-- duplicava os dados iniciais). As referências passam para o menor id de cada
+-- nome, as repetidas são removidas e os índices viram UNIQUE.
+
+-- Fabricantes
+UPDATE modelos_impressora
+SET fabricante_id = (
+    SELECT MIN(f2.id) FROM fabricantes f1 JOIN fabricantes f2 ON f2.nome = f1.nome
+    WHERE f1.id = modelos_impressora.fabricante_id
+)
+WHERE fabricante_id IN (
+    SELECT id FROM fabricantes WHERE id NOT IN (SELECT MIN(id) FROM fabricantes GROUP BY nome)
+);
+DELETE FROM fabricantes WHERE id NOT IN (SELECT MIN(id) FROM fabricantes GROUP BY nome);
+DROP INDEX IF EXISTS idx_fabricantes_nome;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_fabricantes_nome ON fabricantes(nome);
+
+-- Cores
+UPDATE cartuchos
+SET cor_id = (
+    SELECT MIN(c2.id) FROM cores_referencia c1 JOIN cores_referencia c2 ON c2.nome = c1.nome
+    WHERE c1.id = cartuchos.cor_id
+)
+WHERE cor_id IN (
+    SELECT id FROM cores_referencia WHERE id NOT IN (SELECT MIN(id) FROM cores_referencia GROUP BY nome)
+);
+DELETE FROM cores_referencia WHERE id NOT IN (SELECT MIN(id) FROM cores_referencia GROUP BY nome);
+DROP INDEX IF EXISTS idx_cores_referencia_nome;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_cores_referencia_nome ON cores_referencia(nome);
+
+-- Capacidades (a PK de cartucho_capacidades pode colidir: as sobras são removidas)
+UPDATE OR IGNORE cartucho_capacidades
+SET capacidade_id = (
+    SELECT MIN(c2.id) FROM capacidades c1 JOIN capacidades c2 ON c2.capacidade_ml = c1.capacidade_ml
+    WHERE c1.id = cartucho_capacidades.capacidade_id
+)
+WHERE capacidade_id IN (
+    SELECT id FROM capacidades WHERE id NOT IN (SELECT MIN(id) FROM capacidades GROUP BY capacidade_ml)
+);
+DELETE FROM cartucho_capacidades
+WHERE capacidade_id IN (
+    SELECT id FROM capacidades WHERE id NOT IN (SELECT MIN(id) FROM capacidades GROUP BY capacidade_ml)
+);
+DELETE FROM capacidades WHERE id NOT IN (SELECT MIN(id) FROM capacidades GROUP BY capacidade_ml);
+DROP INDEX IF EXISTS idx_capacidades_ml;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_capacidades_ml ON capacidades(capacidade_ml);
@@ -0,0 +1,81 @@
+-- Busca textual (FTS5) de cartuchos
+-- Um documento por cartucho (rowid = cartuchos.id) com os nomes já
+-- resolvidos de impressora, fabricante e cor. Os triggers mantêm o índice
+-- em dia; tabelas virtuais ficam fora do dump SQL e são reconstruídas aqui.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS busca_cartuchos USING fts5(
+    modelo_cartucho,
+    codigo_referencia,
+    modelo_impressora,
+    fabricante,
+    cor,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '1 2 3'
+);
+
+-- Peso de cada coluna no bm25: modelo e código pesam mais que fabricante e cor
+INSERT INTO busca_cartuchos (busca_cartuchos, rank) VALUES ('rank', 'bm25(10.0, 8.0, 4.0, 2.0, 1.0)');
+
+DELETE FROM busca_cartuchos;
+INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor)
+SELECT c.id, c.modelo_cartucho, c.codigo_referencia, mi.nome, f.nome, cr.nome
+FROM cartuchos c
+LEFT JOIN modelos_impressora mi ON c.modelo_impressora_id = mi.id
+LEFT JOIN fabricantes f ON mi.fabricante_id = f.id
+LEFT JOIN cores_referencia cr ON c.cor_id = cr.id;
+
+-- Cartuchos
+CREATE TRIGGER IF NOT EXISTS trg_busca_cartuchos_inserir AFTER INSERT ON cartuchos
+BEGIN
+    INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor)
+    SELECT new.id, new.modelo_cartucho, new.codigo_referencia,
+           (SELECT nome FROM modelos_impressora WHERE id = new.modelo_impressora_id),
+           (SELECT f.nome FROM modelos_impressora mi JOIN fabricantes f ON mi.fabricante_id = f.id
+             WHERE mi.id = new.modelo_impressora_id),
+           (SELECT nome FROM cores_referencia WHERE id = new.cor_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_busca_cartuchos_atualizar
+AFTER UPDATE OF modelo_cartucho, codigo_referencia, modelo_impressora_id, cor_id ON cartuchos
+BEGIN
+    DELETE FROM busca_cartuchos WHERE rowid = old.id;
+    INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor)
+    SELECT new.id, new.modelo_cartucho, new.codigo_referencia,
+           (SELECT nome FROM modelos_impressora WHERE id = new.modelo_impressora_id),
+           (SELECT f.nome FROM modelos_impressora mi JOIN fabricantes f ON mi.fabricante_id = f.id
+             WHERE mi.id = new.modelo_impressora_id),
+           (SELECT nome FROM cores_referencia WHERE id = new.cor_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_busca_cartuchos_excluir AFTER DELETE ON cartuchos
+BEGIN
+    DELETE FROM busca_cartuchos WHERE rowid = old.id;
+END;
+
+-- Renomear uma referência reindexa só os cartuchos que a usam
+CREATE TRIGGER IF NOT EXISTS trg_busca_modelos_impressora
+AFTER UPDATE OF nome, fabricante_id ON modelos_impressora
+BEGIN
+    UPDATE busca_cartuchos
+    SET modelo_impressora = new.nome,
+        fabricante = (SELECT nome FROM fabricantes WHERE id = new.fabricante_id)
+    WHERE rowid IN (SELECT id FROM cartuchos WHERE modelo_impressora_id = new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_busca_fabricantes AFTER UPDATE OF nome ON fabricantes
+BEGIN
+    UPDATE busca_cartuchos
+    SET fabricante = new.nome
+    WHERE rowid IN (
+        SELECT c.id FROM cartuchos c
+        JOIN modelos_impressora mi ON c.modelo_impressora_id = mi.id
+        WHERE mi.fabricante_id = new.id
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_busca_cores AFTER UPDATE OF nome ON cores_referencia
+BEGIN
+    UPDATE busca_cartuchos
+    SET cor = new.nome
+    WHERE rowid IN (SELECT id FROM cartuchos WHERE cor_id = new.id);
+END;
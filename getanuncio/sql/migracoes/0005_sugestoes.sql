@@ -0,0 +1,55 @@
+-- Índices para o seletor com busca de modelos e cores
+-- Prefixo: índice NOCASE, que atende `nome LIKE 'abc%'` por faixa.
+-- Trecho: tabelas FTS5 de conteúdo externo (o texto fica só na tabela
+-- original) com tokenizador trigram, que atendem `LIKE '%abc%'`.
+
+CREATE INDEX IF NOT EXISTS idx_modelos_impressora_nome_nocase ON modelos_impressora(nome COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_cores_referencia_nome_nocase ON cores_referencia(nome COLLATE NOCASE);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS sugestoes_modelos USING fts5(
+    nome,
+    content = 'modelos_impressora',
+    content_rowid = 'id',
+    tokenize = 'trigram'
+);
+INSERT INTO sugestoes_modelos (sugestoes_modelos) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_sugestoes_modelos_inserir AFTER INSERT ON modelos_impressora
+BEGIN
+    INSERT INTO sugestoes_modelos (rowid, nome) VALUES (new.id, new.nome);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sugestoes_modelos_atualizar AFTER UPDATE OF nome ON modelos_impressora
+BEGIN
+    INSERT INTO sugestoes_modelos (sugestoes_modelos, rowid, nome) VALUES ('delete', old.id, old.nome);
+    INSERT INTO sugestoes_modelos (rowid, nome) VALUES (new.id, new.nome);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sugestoes_modelos_excluir AFTER DELETE ON modelos_impressora
+BEGIN
+    INSERT INTO sugestoes_modelos (sugestoes_modelos, rowid, nome) VALUES ('delete', old.id, old.nome);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS sugestoes_cores USING fts5(
+    nome,
+    content = 'cores_referencia',
+    content_rowid = 'id',
+    tokenize = 'trigram'
+);
+INSERT INTO sugestoes_cores (sugestoes_cores) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_sugestoes_cores_inserir AFTER INSERT ON cores_referencia
+BEGIN
+    INSERT INTO sugestoes_cores (rowid, nome) VALUES (new.id, new.nome);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sugestoes_cores_atualizar AFTER UPDATE OF nome ON cores_referencia
+BEGIN
+    INSERT INTO sugestoes_cores (sugestoes_cores, rowid, nome) VALUES ('delete', old.id, old.nome);
+    INSERT INTO sugestoes_cores (rowid, nome) VALUES (new.id, new.nome);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sugestoes_cores_excluir AFTER DELETE ON cores_referencia
+BEGIN
+    INSERT INTO sugestoes_cores (sugestoes_cores, rowid, nome) VALUES ('delete', old.id, old.nome);
+END;
@@ -0,0 +1,97 @@
+-- Rastreamento de alterações para feeds incrementais
+-- `cartuchos.data_atualizacao` e o registro de alterações são mantidos por
+-- triggers. O registro guarda uma linha por cartucho (a da última
+-- alteração, com `seq` crescente), então o feed lê só o que mudou depois da
+-- marca da última exportação sem varrer o catálogo nem deduplicar.
+
+ALTER TABLE cartuchos ADD COLUMN data_atualizacao TIMESTAMP;
+UPDATE cartuchos SET data_atualizacao = data_criacao WHERE data_atualizacao IS NULL;
+
+CREATE TABLE IF NOT EXISTS alteracoes_cartuchos (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    cartucho_id INTEGER NOT NULL UNIQUE,
+    excluido INTEGER NOT NULL DEFAULT 0,
+    data_alteracao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Marca (último seq publicado) de cada feed
+CREATE TABLE IF NOT EXISTS exportacoes_feed (
+    nome TEXT PRIMARY KEY,
+    ultima_seq INTEGER NOT NULL DEFAULT 0,
+    linhas INTEGER NOT NULL DEFAULT 0,
+    data_exportacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- O catálogo existente entra como alteração para o primeiro feed
+INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+SELECT id, 0 FROM cartuchos ORDER BY id;
+
+-- Cartuchos
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_cartuchos_inserir AFTER INSERT ON cartuchos
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = coalesce(new.data_criacao, CURRENT_TIMESTAMP)
+    WHERE id = new.id AND new.data_atualizacao IS NULL;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido) VALUES (new.id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_cartuchos_atualizar
+AFTER UPDATE OF modelo_cartucho, codigo_referencia, modelo_impressora_id, cor_id ON cartuchos
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP WHERE id = new.id;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido) VALUES (new.id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_cartuchos_excluir AFTER DELETE ON cartuchos
+BEGIN
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido) VALUES (old.id, 1);
+END;
+
+-- Capacidades do cartucho (só se o cartucho ainda existir)
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_capacidades_inserir AFTER INSERT ON cartucho_capacidades
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP WHERE id = new.cartucho_id;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT id, 0 FROM cartuchos WHERE id = new.cartucho_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_capacidades_excluir AFTER DELETE ON cartucho_capacidades
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP WHERE id = old.cartucho_id;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT id, 0 FROM cartuchos WHERE id = old.cartucho_id;
+END;
+
+-- Mudar uma referência altera todos os cartuchos que a usam
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_modelos_impressora
+AFTER UPDATE OF nome, fabricante_id ON modelos_impressora
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP WHERE modelo_impressora_id = new.id;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT id, 0 FROM cartuchos WHERE modelo_impressora_id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_fabricantes AFTER UPDATE OF nome ON fabricantes
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP
+    WHERE modelo_impressora_id IN (SELECT id FROM modelos_impressora WHERE fabricante_id = new.id);
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT c.id, 0 FROM cartuchos c
+    JOIN modelos_impressora mi ON c.modelo_impressora_id = mi.id
+    WHERE mi.fabricante_id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_cores AFTER UPDATE OF nome, codigo_hex ON cores_referencia
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP WHERE cor_id = new.id;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT id, 0 FROM cartuchos WHERE cor_id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_capacidades AFTER UPDATE OF capacidade_ml ON capacidades
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP
+    WHERE id IN (SELECT cartucho_id FROM cartucho_capacidades WHERE capacidade_id = new.id);
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT cartucho_id, 0 FROM cartucho_capacidades
+    WHERE capacidade_id = new.id AND cartucho_id IN (SELECT id FROM cartuchos);
+END;
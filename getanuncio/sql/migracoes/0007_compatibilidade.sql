@@ -0,0 +1,137 @@
+-- Compatibilidade cartucho ↔ impressora (muitos-para-muitos)
+-- Um cartucho serve em várias impressoras: em vez de repetir a linha do
+-- cartucho para cada impressora, a compatibilidade fica em
+-- `cartucho_impressoras`, indexada nos dois sentidos. As linhas repetidas
+-- (mesmo modelo, código e cor) são fundidas na de menor id.
+-- `cartuchos.modelo_impressora_id` fica só pelos bancos antigos e não é
+-- mais lida nem gravada.
+-- Roda com as chaves estrangeiras ligadas: as referências que os bancos
+-- antigos deixaram para trás (excluídas com elas desligadas) não são copiadas.
+
+-- Sem rowid: a tabela é só a chave composta, guardada uma vez
+CREATE TABLE IF NOT EXISTS cartucho_impressoras (
+    cartucho_id INTEGER NOT NULL,
+    modelo_impressora_id INTEGER NOT NULL,
+    PRIMARY KEY (cartucho_id, modelo_impressora_id),
+    FOREIGN KEY (cartucho_id) REFERENCES cartuchos(id) ON DELETE CASCADE,
+    FOREIGN KEY (modelo_impressora_id) REFERENCES modelos_impressora(id)
+) WITHOUT ROWID;
+
+-- "Quais cartuchos servem na impressora X" (a PK responde o sentido inverso)
+CREATE INDEX IF NOT EXISTS idx_cartucho_impressoras_modelo ON cartucho_impressoras(modelo_impressora_id, cartucho_id);
+DROP INDEX IF EXISTS idx_cartuchos_modelo_impressora;
+
+-- Associações de cartuchos ou capacidades que não existem mais
+DELETE FROM cartucho_capacidades
+WHERE cartucho_id NOT IN (SELECT id FROM cartuchos)
+   OR capacidade_id NOT IN (SELECT id FROM capacidades);
+
+INSERT OR IGNORE INTO cartucho_impressoras (cartucho_id, modelo_impressora_id)
+SELECT id, modelo_impressora_id FROM cartuchos
+WHERE modelo_impressora_id IN (SELECT id FROM modelos_impressora);
+
+-- Fusão das linhas repetidas: impressoras e capacidades passam para a
+-- linha de menor id e as demais são excluídas (o feed as publica como
+-- exclusões)
+CREATE TEMP TABLE cartuchos_repetidos AS
+SELECT id, canonico FROM (
+    SELECT id, min(id) OVER (
+        PARTITION BY modelo_cartucho, coalesce(codigo_referencia, ''), coalesce(cor_id, -1)
+    ) AS canonico
+    FROM cartuchos
+)
+WHERE id <> canonico;
+
+INSERT OR IGNORE INTO cartucho_impressoras (cartucho_id, modelo_impressora_id)
+SELECT r.canonico, ci.modelo_impressora_id
+FROM cartuchos_repetidos r JOIN cartucho_impressoras ci ON ci.cartucho_id = r.id;
+
+INSERT OR IGNORE INTO cartucho_capacidades (cartucho_id, capacidade_id)
+SELECT r.canonico, cc.capacidade_id
+FROM cartuchos_repetidos r JOIN cartucho_capacidades cc ON cc.cartucho_id = r.id;
+
+DELETE FROM cartucho_impressoras WHERE cartucho_id IN (SELECT id FROM cartuchos_repetidos);
+DELETE FROM cartucho_capacidades WHERE cartucho_id IN (SELECT id FROM cartuchos_repetidos);
+DELETE FROM cartuchos WHERE id IN (SELECT id FROM cartuchos_repetidos);
+DROP TABLE cartuchos_repetidos;
+
+-- Chave natural: o mesmo cartucho não volta a ser cadastrado duas vezes
+CREATE UNIQUE INDEX IF NOT EXISTS ux_cartuchos_chave
+ON cartuchos(modelo_cartucho, coalesce(codigo_referencia, ''), coalesce(cor_id, -1));
+
+-- Carga em lote: enquanto a tabela tiver uma linha (só dentro da transação
+-- de um lote da importação), os triggers de inserção de cartuchos e de suas
+-- associações não rodam; a importação regrava o registro de alterações e o
+-- índice de busca dos cartuchos do lote de uma vez, no fim do lote
+CREATE TABLE IF NOT EXISTS carga_em_lote (ativa INTEGER PRIMARY KEY);
+
+DROP TRIGGER IF EXISTS trg_alteracoes_cartuchos_inserir;
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_cartuchos_inserir AFTER INSERT ON cartuchos
+WHEN NOT EXISTS (SELECT 1 FROM carga_em_lote)
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = coalesce(new.data_criacao, CURRENT_TIMESTAMP)
+    WHERE id = new.id AND new.data_atualizacao IS NULL;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido) VALUES (new.id, 0);
+END;
+
+DROP TRIGGER IF EXISTS trg_alteracoes_capacidades_inserir;
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_capacidades_inserir AFTER INSERT ON cartucho_capacidades
+WHEN NOT EXISTS (SELECT 1 FROM carga_em_lote)
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP WHERE id = new.cartucho_id;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT id, 0 FROM cartuchos WHERE id = new.cartucho_id;
+END;
+
+-- Registro de alterações: a impressora deixa de ser coluna do cartucho
+DROP TRIGGER IF EXISTS trg_alteracoes_cartuchos_atualizar;
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_cartuchos_atualizar
+AFTER UPDATE OF modelo_cartucho, codigo_referencia, cor_id ON cartuchos
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP WHERE id = new.id;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido) VALUES (new.id, 0);
+END;
+
+-- A coluna antiga não aponta mais para impressoras excluídas
+UPDATE cartuchos SET modelo_impressora_id = NULL
+WHERE modelo_impressora_id NOT IN (SELECT id FROM modelos_impressora);
+
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_impressoras_inserir AFTER INSERT ON cartucho_impressoras
+WHEN NOT EXISTS (SELECT 1 FROM carga_em_lote)
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP WHERE id = new.cartucho_id;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT id, 0 FROM cartuchos WHERE id = new.cartucho_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_impressoras_excluir AFTER DELETE ON cartucho_impressoras
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP WHERE id = old.cartucho_id;
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT id, 0 FROM cartuchos WHERE id = old.cartucho_id;
+END;
+
+DROP TRIGGER IF EXISTS trg_alteracoes_modelos_impressora;
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_modelos_impressora
+AFTER UPDATE OF nome, fabricante_id ON modelos_impressora
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP
+    WHERE id IN (SELECT cartucho_id FROM cartucho_impressoras WHERE modelo_impressora_id = new.id);
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT cartucho_id, 0 FROM cartucho_impressoras WHERE modelo_impressora_id = new.id;
+END;
+
+DROP TRIGGER IF EXISTS trg_alteracoes_fabricantes;
+CREATE TRIGGER IF NOT EXISTS trg_alteracoes_fabricantes AFTER UPDATE OF nome ON fabricantes
+BEGIN
+    UPDATE cartuchos SET data_atualizacao = CURRENT_TIMESTAMP
+    WHERE id IN (
+        SELECT ci.cartucho_id FROM cartucho_impressoras ci
+        JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+        WHERE mi.fabricante_id = new.id
+    );
+    INSERT OR REPLACE INTO alteracoes_cartuchos (cartucho_id, excluido)
+    SELECT DISTINCT ci.cartucho_id, 0 FROM cartucho_impressoras ci
+    JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+    WHERE mi.fabricante_id = new.id;
+END;
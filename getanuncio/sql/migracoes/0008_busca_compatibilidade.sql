@@ -0,0 +1,121 @@
+-- Busca textual com todas as impressoras compatíveis
+-- O documento de cada cartucho passa a trazer todas as impressoras (e seus
+-- fabricantes) de `cartucho_impressoras`. A view `documentos_busca` monta o
+-- documento num só lugar; os triggers só o regravam para os cartuchos
+-- afetados (a importação em lote regrava os seus de uma vez, ver a 0007).
+-- Como a 0004, esta migração recria o índice do zero e pode ser reaplicada
+-- na restauração.
+
+DROP TRIGGER IF EXISTS trg_busca_cartuchos_inserir;
+DROP TRIGGER IF EXISTS trg_busca_cartuchos_atualizar;
+DROP TRIGGER IF EXISTS trg_busca_cartuchos_excluir;
+DROP TRIGGER IF EXISTS trg_busca_modelos_impressora;
+DROP TRIGGER IF EXISTS trg_busca_fabricantes;
+DROP TRIGGER IF EXISTS trg_busca_cores;
+DROP TRIGGER IF EXISTS trg_busca_impressoras_inserir;
+DROP TRIGGER IF EXISTS trg_busca_impressoras_excluir;
+DROP TABLE IF EXISTS busca_cartuchos;
+DROP VIEW IF EXISTS documentos_busca;
+
+CREATE VIEW documentos_busca AS
+SELECT
+    c.id,
+    c.modelo_cartucho,
+    c.codigo_referencia,
+    (SELECT GROUP_CONCAT(mi.nome, ' ')
+       FROM cartucho_impressoras ci
+       JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+      WHERE ci.cartucho_id = c.id) AS modelo_impressora,
+    (SELECT GROUP_CONCAT(DISTINCT f.nome)
+       FROM cartucho_impressoras ci
+       JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+       JOIN fabricantes f ON mi.fabricante_id = f.id
+      WHERE ci.cartucho_id = c.id) AS fabricante,
+    (SELECT nome FROM cores_referencia WHERE id = c.cor_id) AS cor
+FROM cartuchos c;
+
+CREATE VIRTUAL TABLE busca_cartuchos USING fts5(
+    modelo_cartucho,
+    codigo_referencia,
+    modelo_impressora,
+    fabricante,
+    cor,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '1 2 3'
+);
+INSERT INTO busca_cartuchos (busca_cartuchos, rank) VALUES ('rank', 'bm25(10.0, 8.0, 4.0, 2.0, 1.0)');
+
+INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor)
+SELECT * FROM documentos_busca;
+
+-- Cartuchos
+CREATE TRIGGER trg_busca_cartuchos_inserir AFTER INSERT ON cartuchos
+WHEN NOT EXISTS (SELECT 1 FROM carga_em_lote)
+BEGIN
+    INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor)
+    SELECT * FROM documentos_busca WHERE id = new.id;
+END;
+
+CREATE TRIGGER trg_busca_cartuchos_atualizar
+AFTER UPDATE OF modelo_cartucho, codigo_referencia, cor_id ON cartuchos
+BEGIN
+    DELETE FROM busca_cartuchos WHERE rowid = old.id;
+    INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor)
+    SELECT * FROM documentos_busca WHERE id = new.id;
+END;
+
+CREATE TRIGGER trg_busca_cartuchos_excluir AFTER DELETE ON cartuchos
+BEGIN
+    DELETE FROM busca_cartuchos WHERE rowid = old.id;
+END;
+
+-- Compatibilidade: regrava o documento do cartucho
+CREATE TRIGGER trg_busca_impressoras_inserir AFTER INSERT ON cartucho_impressoras
+WHEN NOT EXISTS (SELECT 1 FROM carga_em_lote)
+BEGIN
+    DELETE FROM busca_cartuchos WHERE rowid = new.cartucho_id;
+    INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor)
+    SELECT * FROM documentos_busca WHERE id = new.cartucho_id;
+END;
+
+CREATE TRIGGER trg_busca_impressoras_excluir AFTER DELETE ON cartucho_impressoras
+BEGIN
+    DELETE FROM busca_cartuchos WHERE rowid = old.cartucho_id;
+    INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor)
+    SELECT * FROM documentos_busca WHERE id = old.cartucho_id;
+END;
+
+-- Renomear uma referência regrava só os cartuchos que a usam
+CREATE TRIGGER trg_busca_modelos_impressora
+AFTER UPDATE OF nome, fabricante_id ON modelos_impressora
+BEGIN
+    DELETE FROM busca_cartuchos
+    WHERE rowid IN (SELECT cartucho_id FROM cartucho_impressoras WHERE modelo_impressora_id = new.id);
+    INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor)
+    SELECT * FROM documentos_busca
+    WHERE id IN (SELECT cartucho_id FROM cartucho_impressoras WHERE modelo_impressora_id = new.id);
+END;
+
+CREATE TRIGGER trg_busca_fabricantes AFTER UPDATE OF nome ON fabricantes
+BEGIN
+    DELETE FROM busca_cartuchos
+    WHERE rowid IN (
+        SELECT ci.cartucho_id FROM cartucho_impressoras ci
+        JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+        WHERE mi.fabricante_id = new.id
+    );
+    INSERT INTO busca_cartuchos (rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor)
+    SELECT * FROM documentos_busca
+    WHERE id IN (
+        SELECT ci.cartucho_id FROM cartucho_impressoras ci
+        JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
+        WHERE mi.fabricante_id = new.id
+    );
+END;
+
+CREATE TRIGGER trg_busca_cores AFTER UPDATE OF nome ON cores_referencia
+BEGIN
+    UPDATE busca_cartuchos
+    SET cor = new.nome
+    WHERE rowid IN (SELECT id FROM cartuchos WHERE cor_id = new.id);
+END;
@@ -0,0 +1,224 @@
+-- Resumo das contagens do catálogo mantido por triggers
+-- Derivada: como o índice de busca, é recriada do zero (e recontada) por
+-- `reconstruir_derivados` depois de restaurações. A importação em lote soma
+-- as contagens do lote de uma vez (ver `carga_em_lote` na 0007).
+-- Uma linha por (dimensão, chave): 'tabela' -> nome da tabela, 'cor' ->
+-- cor_id, 'fabricante' -> fabricante_id (cartuchos distintos com alguma
+-- impressora do fabricante), 'capacidade' -> capacidade_id, 'impressora'
+-- -> modelo_impressora_id, 'dia' -> data de cadastro (AAAA-MM-DD). O
+-- Dashboard lê tudo por faixas da chave primária (e as impressoras com mais
+-- cartuchos pelo índice parcial), sem varrer as tabelas. Os triggers
+-- cobrem INSERT e DELETE e as mudanças de cor, data de cadastro e
+-- fabricante do modelo; as associações só são inseridas e excluídas.
+
+DROP TRIGGER IF EXISTS trg_estatisticas_fabricantes_inserir;
+DROP TRIGGER IF EXISTS trg_estatisticas_fabricantes_excluir;
+DROP TRIGGER IF EXISTS trg_estatisticas_modelos_inserir;
+DROP TRIGGER IF EXISTS trg_estatisticas_modelos_excluir;
+DROP TRIGGER IF EXISTS trg_estatisticas_modelos_fabricante;
+DROP TRIGGER IF EXISTS trg_estatisticas_cores_inserir;
+DROP TRIGGER IF EXISTS trg_estatisticas_cores_excluir;
+DROP TRIGGER IF EXISTS trg_estatisticas_capacidades_inserir;
+DROP TRIGGER IF EXISTS trg_estatisticas_capacidades_excluir;
+DROP TRIGGER IF EXISTS trg_estatisticas_cartuchos_inserir;
+DROP TRIGGER IF EXISTS trg_estatisticas_cartuchos_excluir;
+DROP TRIGGER IF EXISTS trg_estatisticas_cartuchos_atualizar;
+DROP TRIGGER IF EXISTS trg_estatisticas_associacoes_inserir;
+DROP TRIGGER IF EXISTS trg_estatisticas_associacoes_excluir;
+DROP TRIGGER IF EXISTS trg_estatisticas_compatibilidades_inserir;
+DROP TRIGGER IF EXISTS trg_estatisticas_compatibilidades_excluir;
+DROP TABLE IF EXISTS estatisticas_catalogo;
+
+-- `chave` sem tipo: ids ficam inteiros e datas, texto
+CREATE TABLE estatisticas_catalogo (
+    dimensao TEXT NOT NULL,
+    chave NOT NULL,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimensao, chave)
+) WITHOUT ROWID;
+
+-- Ranking das impressoras com mais cartuchos
+CREATE INDEX idx_estatisticas_catalogo_impressoras ON estatisticas_catalogo(dimensao, quantidade)
+WHERE dimensao = 'impressora';
+
+INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+SELECT 'tabela', 'fabricantes', COUNT(*) FROM fabricantes
+UNION ALL SELECT 'tabela', 'modelos_impressora', COUNT(*) FROM modelos_impressora
+UNION ALL SELECT 'tabela', 'cores_referencia', COUNT(*) FROM cores_referencia
+UNION ALL SELECT 'tabela', 'capacidades', COUNT(*) FROM capacidades
+UNION ALL SELECT 'tabela', 'cartuchos', COUNT(*) FROM cartuchos
+UNION ALL SELECT 'tabela', 'cartucho_capacidades', COUNT(*) FROM cartucho_capacidades
+UNION ALL SELECT 'tabela', 'cartucho_impressoras', COUNT(*) FROM cartucho_impressoras;
+
+INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+SELECT 'cor', cor_id, COUNT(*) FROM cartuchos WHERE cor_id IS NOT NULL GROUP BY cor_id;
+
+INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+SELECT 'capacidade', capacidade_id, COUNT(*) FROM cartucho_capacidades GROUP BY capacidade_id;
+
+INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+SELECT 'impressora', modelo_impressora_id, COUNT(*) FROM cartucho_impressoras GROUP BY modelo_impressora_id;
+
+INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+SELECT 'fabricante', mi.fabricante_id, COUNT(DISTINCT ci.cartucho_id)
+FROM cartucho_impressoras ci
+JOIN modelos_impressora mi ON mi.id = ci.modelo_impressora_id
+WHERE mi.fabricante_id IS NOT NULL
+GROUP BY mi.fabricante_id;
+
+INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+SELECT 'dia', date(data_criacao), COUNT(*) FROM cartuchos WHERE date(data_criacao) IS NOT NULL
+GROUP BY date(data_criacao);
+
+-- Tabelas de referência: só a contagem de linhas
+CREATE TRIGGER trg_estatisticas_fabricantes_inserir AFTER INSERT ON fabricantes
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade + 1 WHERE dimensao = 'tabela' AND chave = 'fabricantes';
+END;
+
+CREATE TRIGGER trg_estatisticas_fabricantes_excluir AFTER DELETE ON fabricantes
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1 WHERE dimensao = 'tabela' AND chave = 'fabricantes';
+END;
+
+CREATE TRIGGER trg_estatisticas_modelos_inserir AFTER INSERT ON modelos_impressora
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade + 1
+    WHERE dimensao = 'tabela' AND chave = 'modelos_impressora';
+END;
+
+CREATE TRIGGER trg_estatisticas_modelos_excluir AFTER DELETE ON modelos_impressora
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1
+    WHERE dimensao = 'tabela' AND chave = 'modelos_impressora';
+END;
+
+-- Modelo trocou de fabricante: reconta os dois (raro, só pelo SQL Executor)
+CREATE TRIGGER trg_estatisticas_modelos_fabricante AFTER UPDATE OF fabricante_id ON modelos_impressora
+WHEN old.fabricante_id IS NOT new.fabricante_id
+BEGIN
+    DELETE FROM estatisticas_catalogo
+    WHERE dimensao = 'fabricante' AND chave IN (old.fabricante_id, new.fabricante_id);
+    INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+    SELECT 'fabricante', mi.fabricante_id, COUNT(DISTINCT ci.cartucho_id)
+    FROM modelos_impressora mi
+    JOIN cartucho_impressoras ci ON ci.modelo_impressora_id = mi.id
+    WHERE mi.fabricante_id IN (old.fabricante_id, new.fabricante_id)
+    GROUP BY mi.fabricante_id;
+END;
+
+CREATE TRIGGER trg_estatisticas_cores_inserir AFTER INSERT ON cores_referencia
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade + 1
+    WHERE dimensao = 'tabela' AND chave = 'cores_referencia';
+END;
+
+CREATE TRIGGER trg_estatisticas_cores_excluir AFTER DELETE ON cores_referencia
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1
+    WHERE dimensao = 'tabela' AND chave = 'cores_referencia';
+END;
+
+CREATE TRIGGER trg_estatisticas_capacidades_inserir AFTER INSERT ON capacidades
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade + 1 WHERE dimensao = 'tabela' AND chave = 'capacidades';
+END;
+
+CREATE TRIGGER trg_estatisticas_capacidades_excluir AFTER DELETE ON capacidades
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1 WHERE dimensao = 'tabela' AND chave = 'capacidades';
+END;
+
+-- Cartuchos: total, cor e dia de cadastro
+CREATE TRIGGER trg_estatisticas_cartuchos_inserir AFTER INSERT ON cartuchos
+WHEN NOT EXISTS (SELECT 1 FROM carga_em_lote)
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade + 1 WHERE dimensao = 'tabela' AND chave = 'cartuchos';
+    INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+    SELECT 'cor', new.cor_id, 1 WHERE new.cor_id IS NOT NULL
+    ON CONFLICT (dimensao, chave) DO UPDATE SET quantidade = quantidade + 1;
+    -- data_criacao vem do DEFAULT CURRENT_TIMESTAMP (ou da importação)
+    INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+    SELECT 'dia', date(new.data_criacao), 1 WHERE date(new.data_criacao) IS NOT NULL
+    ON CONFLICT (dimensao, chave) DO UPDATE SET quantidade = quantidade + 1;
+END;
+
+CREATE TRIGGER trg_estatisticas_cartuchos_excluir AFTER DELETE ON cartuchos
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1 WHERE dimensao = 'tabela' AND chave = 'cartuchos';
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1 WHERE dimensao = 'cor' AND chave = old.cor_id;
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1
+    WHERE dimensao = 'dia' AND chave = date(old.data_criacao);
+END;
+
+CREATE TRIGGER trg_estatisticas_cartuchos_atualizar AFTER UPDATE OF cor_id, data_criacao ON cartuchos
+WHEN old.cor_id IS NOT new.cor_id OR date(old.data_criacao) IS NOT date(new.data_criacao)
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1 WHERE dimensao = 'cor' AND chave = old.cor_id;
+    INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+    SELECT 'cor', new.cor_id, 1 WHERE new.cor_id IS NOT NULL
+    ON CONFLICT (dimensao, chave) DO UPDATE SET quantidade = quantidade + 1;
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1
+    WHERE dimensao = 'dia' AND chave = date(old.data_criacao);
+    INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+    SELECT 'dia', date(new.data_criacao), 1 WHERE date(new.data_criacao) IS NOT NULL
+    ON CONFLICT (dimensao, chave) DO UPDATE SET quantidade = quantidade + 1;
+END;
+
+-- Capacidades dos cartuchos: cada par é único, então conta cartuchos
+CREATE TRIGGER trg_estatisticas_associacoes_inserir AFTER INSERT ON cartucho_capacidades
+WHEN NOT EXISTS (SELECT 1 FROM carga_em_lote)
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade + 1
+    WHERE dimensao = 'tabela' AND chave = 'cartucho_capacidades';
+    INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+    VALUES ('capacidade', new.capacidade_id, 1)
+    ON CONFLICT (dimensao, chave) DO UPDATE SET quantidade = quantidade + 1;
+END;
+
+CREATE TRIGGER trg_estatisticas_associacoes_excluir AFTER DELETE ON cartucho_capacidades
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1
+    WHERE dimensao = 'tabela' AND chave = 'cartucho_capacidades';
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1
+    WHERE dimensao = 'capacidade' AND chave = old.capacidade_id;
+END;
+
+-- Compatibilidades: o cartucho conta para o fabricante na primeira
+-- impressora dele e deixa de contar na última (consultas pela PK)
+CREATE TRIGGER trg_estatisticas_compatibilidades_inserir AFTER INSERT ON cartucho_impressoras
+WHEN NOT EXISTS (SELECT 1 FROM carga_em_lote)
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade + 1
+    WHERE dimensao = 'tabela' AND chave = 'cartucho_impressoras';
+    INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+    VALUES ('impressora', new.modelo_impressora_id, 1)
+    ON CONFLICT (dimensao, chave) DO UPDATE SET quantidade = quantidade + 1;
+    INSERT INTO estatisticas_catalogo (dimensao, chave, quantidade)
+    SELECT 'fabricante', mi.fabricante_id, 1
+    FROM modelos_impressora mi
+    WHERE mi.id = new.modelo_impressora_id AND mi.fabricante_id IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM cartucho_impressoras ci
+          JOIN modelos_impressora outro ON outro.id = ci.modelo_impressora_id
+          WHERE ci.cartucho_id = new.cartucho_id AND ci.modelo_impressora_id <> new.modelo_impressora_id
+            AND outro.fabricante_id = mi.fabricante_id
+      )
+    ON CONFLICT (dimensao, chave) DO UPDATE SET quantidade = quantidade + 1;
+END;
+
+CREATE TRIGGER trg_estatisticas_compatibilidades_excluir AFTER DELETE ON cartucho_impressoras
+BEGIN
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1
+    WHERE dimensao = 'tabela' AND chave = 'cartucho_impressoras';
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1
+    WHERE dimensao = 'impressora' AND chave = old.modelo_impressora_id;
+    UPDATE estatisticas_catalogo SET quantidade = quantidade - 1
+    WHERE dimensao = 'fabricante'
+      AND chave = (SELECT fabricante_id FROM modelos_impressora WHERE id = old.modelo_impressora_id)
+      AND NOT EXISTS (
+          SELECT 1 FROM cartucho_impressoras ci
+          JOIN modelos_impressora outro ON outro.id = ci.modelo_impressora_id
+          WHERE ci.cartucho_id = old.cartucho_id AND outro.fabricante_id = estatisticas_catalogo.chave
+      );
+END;
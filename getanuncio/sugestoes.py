@@ -0,0 +1,116 @@
+"""Sugestões para o seletor com busca de modelos de impressora e cores
+
+Em vez de enviar todas as opções ao navegador, o seletor mostra só as
+`limite` primeiras ocorrências do texto digitado: quem começa com ele sai
+de uma faixa do índice NOCASE de nome e, para completar, o índice trigrama
+(`sugestoes_modelos`/`sugestoes_cores`) resolve o `LIKE '%trecho%'`. As sugestões já trazem os ids, então o
+cadastro não precisa resolver nomes de novo. Um LRU pequeno guarda as
+últimas buscas até o banco mudar.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+LIMITE_PADRAO = 20
+
+Sugestao = namedtuple("Sugestao", ["id", "rotulo"])
+
+# Quem começa com o texto: faixa no índice NOCASE de nome, já em ordem
+SQL_SUGERIR_MODELOS_PREFIXO = """
+    SELECT mi.id, mi.nome || coalesce(' (' || f.nome || ')', '') as rotulo
+    FROM modelos_impressora mi
+    LEFT JOIN fabricantes f ON mi.fabricante_id = f.id
+    WHERE mi.nome LIKE ?
+    ORDER BY mi.nome COLLATE NOCASE
+    LIMIT ?
+"""
+
+# Quem contém o texto no meio (3+ caracteres): índice trigrama
+SQL_SUGERIR_MODELOS_TRECHO = """
+    SELECT mi.id, mi.nome || coalesce(' (' || f.nome || ')', '') as rotulo
+    FROM sugestoes_modelos s
+    JOIN modelos_impressora mi ON mi.id = s.rowid
+    LEFT JOIN fabricantes f ON mi.fabricante_id = f.id
+    WHERE s.nome LIKE ? AND s.nome NOT LIKE ?
+    LIMIT ?
+"""
+
+SQL_SUGERIR_CORES_PREFIXO = """
+    SELECT id, nome as rotulo
+    FROM cores_referencia
+    WHERE nome LIKE ?
+    ORDER BY nome COLLATE NOCASE
+    LIMIT ?
+"""
+
+SQL_SUGERIR_CORES_TRECHO = """
+    SELECT s.rowid, s.nome as rotulo
+    FROM sugestoes_cores s
+    WHERE s.nome LIKE ? AND s.nome NOT LIKE ?
+    LIMIT ?
+"""
+
+# tabela -> (consulta por prefixo, consulta por trecho)
+CONSULTAS_SUGESTOES = {
+    "modelos": (SQL_SUGERIR_MODELOS_PREFIXO, SQL_SUGERIR_MODELOS_TRECHO),
+    "cores": (SQL_SUGERIR_CORES_PREFIXO, SQL_SUGERIR_CORES_TRECHO),
+}
+MINIMO_TRIGRAMA = 3
+
+
+def _termo(texto):
+    # % e _ seriam curingas do LIKE
+    return " ".join(texto.replace("%", " ").replace("_", " ").split())
+
+
+def sugerir(conn, tabela, texto, limite=LIMITE_PADRAO):
+    """Até `limite` sugestões (id, rótulo) de `tabela` ('modelos' ou 'cores') que contêm o texto
+
+    Primeiro quem começa com o texto, em ordem alfabética; depois, se
+    sobrar espaço, quem o contém em outra posição.
+    """
+    termo = _termo(texto)
+    por_prefixo, por_trecho = CONSULTAS_SUGESTOES[tabela]
+    sugestoes = [Sugestao(*linha) for linha in conn.execute(por_prefixo, (f"{termo}%", limite))]
+    if len(sugestoes) < limite and len(termo) >= MINIMO_TRIGRAMA:
+        sugestoes += [Sugestao(*linha) for linha in conn.execute(
+            por_trecho, (f"%{termo}%", f"{termo}%", limite - len(sugestoes))
+        )]
+    return sugestoes
+
+
+class CacheSugestoes:
+    """LRU das últimas buscas do seletor, invalidado pela versão dos dados"""
+
+    def __init__(self, gerenciador, max_entradas=128, limite=LIMITE_PADRAO):
+        self.gerenciador = gerenciador
+        self.max_entradas = max_entradas
+        self.limite = limite
+        self._lock = threading.Lock()
+        self._versao = None
+        self._sugestoes = OrderedDict()
+        self.acertos = 0
+        self.consultas = 0
+
+    def sugerir(self, tabela, texto):
+        """Sugestões para o texto digitado, do cache quando possível"""
+        chave = (tabela, _termo(texto).lower())
+        versao = self.gerenciador.versao_dados()
+        with self._lock:
+            if versao != self._versao:
+                self._versao = versao
+                self._sugestoes.clear()
+            elif chave in self._sugestoes:
+                self._sugestoes.move_to_end(chave)
+                self.acertos += 1
+                return self._sugestoes[chave]
+
+        with self.gerenciador.leitura() as conn:
+            sugestoes = sugerir(conn, tabela, texto, self.limite)
+
+        with self._lock:
+            self.consultas += 1
+            if versao == self._versao:
+                self._sugestoes[chave] = sugestoes
+                if len(self._sugestoes) > self.max_entradas:
+                    self._sugestoes.popitem(last=False)
+        return sugestoes
@@ -1,8 +1,41 @@
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
 import sqlite3
 from datetime import datetime
 import os
+import shutil
+import tempfile
+import math
+import time
+
+from getanuncio.anuncios import (
+    MODELOS_PADRAO, ErroModelo, contar_anuncios, exportar_anuncios, previa_anuncios
+)
+from getanuncio.backup import FORMATO_BINARIO, FORMATO_SQL_GZ, gerar_backup, previa_backup
+from getanuncio.busca import buscar_cartuchos, sugerir_cartuchos
+from getanuncio.catalogo import (
+    cadastrar_capacidade, cadastrar_cartucho, cadastrar_cor, cadastrar_fabricante, cadastrar_modelo,
+    editar_compatibilidade, formatar_comando
+)
+from getanuncio.conexao import GerenciadorConexoes
+from getanuncio.executor import (
+    LIMITE_LINHAS, LINHAS_POR_BLOCO, TEMPO_LIMITE_PADRAO, ErroExecucao, ExecucaoProtegida,
+    ExecucaoScript, dividir_comandos, e_leitura
+)
+from getanuncio.feed import FEED_PADRAO, contar_pendentes, exportar_feed, marca_feed
+from getanuncio.consultas import montar_filtro_cartuchos, montar_pagina_cartuchos
+from getanuncio.importacao import ErroImportacao, TAMANHO_LOTE_PADRAO, formato_do_arquivo, importar_catalogo
+from getanuncio.instrumentacao import Instrumentacao
+from getanuncio.migracoes import (
+    MIGRACOES, migrar, plano_consulta, planos_consultas, varreduras_completas, versao_atual
+)
+from getanuncio.paginacao import TAMANHOS_PAGINA, CacheContagens, Facetas, buscar_pagina
+from getanuncio.referencias import CacheReferencias
+from getanuncio.repositorio import Capacidade, Cor, Fabricante, ModeloImpressora, Repositorio
+from getanuncio.sugestoes import CacheSugestoes
+from getanuncio.restauracao import ErroRestauracao, restaurar_backup
+from getanuncio.resultados import tabela_das_linhas
 
 # Configuração da página
 st.set_page_config(
@@ -71,168 +104,306 @@ st.markdown("""
 
 # Configuração do banco de dados SQLite
 DB_PATH = "cartuchos.db"
+BACKUP_DIR = "backups"
+ANUNCIOS_DIR = "anuncios"
+LOGS_DIR = "logs"
+# Datas chegam como timestamps; o formato é aplicado só na exibição
+FORMATO_DATA = "DD/MM/YYYY HH:mm"
+# Períodos do gráfico de cadastros por dia (None = desde o primeiro)
+PERIODOS_DASHBOARD = {"30 dias": 30, "90 dias": 90, "1 ano": 365, "Tudo": None}
+
+@st.cache_resource
+def get_gerenciador():
+    """Retorna o gerenciador de conexões compartilhado por todas as sessões
+
+    As migrações de esquema rodam sempre que a conexão de escrita é aberta.
+    """
+    return GerenciadorConexoes(
+        DB_PATH,
+        ao_abrir_escritor=lambda conn: migrar(conn, relatorio_planos=True)
+    )
+
+@st.cache_resource
+def get_cache_referencias():
+    """Retorna o cache das tabelas de referência compartilhado por todas as sessões"""
+    return CacheReferencias(get_gerenciador())
+
+@st.cache_resource
+def get_cache_contagens():
+    """Retorna o cache de contagens de cartuchos por filtro"""
+    return CacheContagens(get_gerenciador())
+
+@st.cache_resource
+def get_instrumentacao():
+    """Retorna as estatísticas de consultas e o log de consultas lentas"""
+    return Instrumentacao(os.path.join(LOGS_DIR, "consultas_lentas.log"))
+
+@st.cache_resource
+def get_cache_sugestoes():
+    """Retorna o LRU de sugestões dos seletores com busca"""
+    return CacheSugestoes(get_gerenciador())
 
-def get_connection():
-    """Retorna uma conexão com o banco SQLite"""
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+@st.cache_resource
+def get_repositorio():
+    """Retorna o repositório do catálogo, instrumentado com a página de cada chamada"""
+    return Repositorio(get_gerenciador(), get_instrumentacao(), pagina=pagina_atual)
+
+def obter_referencias():
+    """Retorna cores, fabricantes, capacidades e modelos da versão atual do banco"""
+    return get_cache_referencias().obter()
+
+def pagina_atual():
+    """Página (e aba, nos Cadastros) que está executando, para a instrumentação"""
+    pagina = st.session_state.get("menu_principal")
+    if pagina == "📝 Cadastros" and st.session_state.get("aba_cadastro"):
+        return f"{pagina} › {st.session_state['aba_cadastro']}"
+    return pagina
+
+def mostrar_erro_sql(erro, query=None, params=None):
+    """Mostra um erro de SQL e, se informado, o comando que o causou"""
+    st.error(f"❌ Erro SQL: {str(erro)}")
+    if query is not None:
+        st.markdown(f"""
+        <div class='error-box'>
+            <strong>Query:</strong><br>
+            <code>{query}</code><br><br>
+            <strong>Parâmetros:</strong><br>
+            <code>{params}</code>
+        </div>
+        """, unsafe_allow_html=True)
 
 def executar_sql(query, params=None, fetch=False, show_error=True):
     """Executa comandos SQL no SQLite"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        
-        conn.commit()
-        
+        # Consultas usam o pool de leitores e voltam como DataFrame montado via
+        # Arrow (texto repetido como categoria); os demais comandos usam o
+        # escritor e retornam o número de linhas afetadas
         if fetch:
-            # Para SELECT, retornar DataFrame
-            columns = [description[0] for description in cursor.description] if cursor.description else []
-            data = cursor.fetchall()
-            if data:
-                df = pd.DataFrame(data, columns=columns)
-            else:
-                df = pd.DataFrame(columns=columns)
-            cursor.close()
-            conn.close()
-            return df
-        else:
-            # Para INSERT, UPDATE, DELETE, retornar número de linhas afetadas
-            rowcount = cursor.rowcount
-            cursor.close()
-            conn.close()
-            return rowcount
-            
+            return get_repositorio().tabela(query, params).to_pandas()
+        return get_repositorio().executar(query, params)
     except Exception as e:
         if show_error:
-            st.error(f"❌ Erro SQL: {str(e)}")
-            st.markdown(f"""
-            <div class='error-box'>
-                <strong>Query:</strong><br>
-                <code>{query}</code><br><br>
-                <strong>Parâmetros:</strong><br>
-                <code>{params}</code>
-            </div>
-            """, unsafe_allow_html=True)
+            mostrar_erro_sql(e, query, params)
+        return None
+
+def ler(consulta, *args):
+    """Chama uma consulta do repositório; em erro mostra a mensagem e retorna None"""
+    try:
+        return consulta(*args)
+    except sqlite3.Error as e:
+        mostrar_erro_sql(e)
         return None
 
-def criar_tabelas():
-    """Cria as tabelas necessárias no SQLite"""
+def cadastrar(mensagem, cadastro, *args):
+    """Chama um cadastro do catálogo e mostra `mensagem` e o SQL executado; retorna o resultado (None em erro)"""
+    try:
+        resultado = cadastro(get_gerenciador(), *args)
+    except sqlite3.Error as e:
+        mostrar_erro_sql(e)
+        return None
+    st.success(mensagem)
+    st.markdown(f"""
+    <div class='sql-box'>
+        SQL Executado:<br>
+        {formatar_comando(*resultado.comando)}
+    </div>
+    """, unsafe_allow_html=True)
+    return resultado
+
+def mostrar_lista(linhas, tipo, vazio):
+    """Mostra uma lista de namedtuples do repositório como tabela (ou `vazio`)"""
+    if linhas:
+        mostrar_tabela(tabela_das_linhas(tipo._fields, linhas), use_container_width=True, hide_index=True)
+    else:
+        st.info(vazio)
+
+def mostrar_tabela(dados, **opcoes):
+    """`st.dataframe` de um DataFrame ou tabela Arrow, com as datas formatadas só na exibição"""
+    if isinstance(dados, pa.Table):
+        datas = [campo.name for campo in dados.schema if pa.types.is_timestamp(campo.type)]
+    else:
+        datas = [coluna for coluna in dados.columns if pd.api.types.is_datetime64_any_dtype(dados[coluna])]
+    config = {coluna: st.column_config.DatetimeColumn(coluna, format=FORMATO_DATA) for coluna in datas}
+    st.dataframe(dados, column_config=config or None, **opcoes)
+
+def aguardar(chave, futuro, cancelar):
+    """Espera o Future mostrando o tempo e um botão de cancelar; retorna a duração
+
+    Um rerun ou stop do Streamlit no meio da espera (o botão Cancelar também
+    provoca um) chama `cancelar`.
+    """
+    status = st.empty()
+    controle = st.empty()
+    controle.button("⛔ Cancelar", key=f"{chave}_cancelar", on_click=cancelar)
+    inicio = time.perf_counter()
+    try:
+        while not futuro.done():
+            status.caption(f"⏳ Executando... {time.perf_counter() - inicio:.1f}s")
+            time.sleep(0.1)
+    except BaseException:
+        cancelar()
+        raise
+    finally:
+        status.empty()
+        controle.empty()
+    return time.perf_counter() - inicio
+
+def aguardar_busca(chave, execucao, max_linhas):
+    """Busca o próximo bloco em segundo plano; retorna o erro da busca (ou None)"""
+    futuro = execucao.buscar_em_segundo_plano(max_linhas)
+    duracao = aguardar(chave, futuro, execucao.cancelar)
+    erro = None
+    try:
+        futuro.result()
+    except (ErroExecucao, sqlite3.Error) as e:
+        erro = e
+    get_instrumentacao().registrar(
+        execucao.sql, execucao.params, duracao, execucao.linhas_buscadas, pagina_atual(), erro
+    )
+    return erro
+
+def aguardar_script(chave, execucao, somente_leitura):
+    """Roda o script em segundo plano; retorna (resultados, erro) e registra cada comando"""
+    futuro = execucao.executar_em_segundo_plano(get_gerenciador(), somente_leitura)
+    aguardar(chave, futuro, execucao.cancelar)
+    instrumentacao = get_instrumentacao()
+    try:
+        resultados = futuro.result()
+        erro = None
+    except ErroExecucao as e:
+        resultados = getattr(e, "resultados", [])
+        erro = e
+    except sqlite3.Error as e:
+        resultados, erro = [], e
+    for resultado in resultados:
+        instrumentacao.registrar(
+            resultado.sql, None, resultado.duracao,
+            len(resultado.linhas) if resultado.colunas else resultado.linhas_afetadas, pagina_atual()
+        )
+    if getattr(erro, "sql", None):
+        instrumentacao.registrar(erro.sql, None, 0.0, None, pagina_atual(), erro.erro)
+    return resultados, erro
+
+def mostrar_script(resultados, erro, somente_leitura):
+    """Resumo por comando (tempo, linhas) e uma grade para cada comando que devolveu linhas"""
+    if erro is not None:
+        st.error(f"❌ {str(erro)}")
+        if getattr(erro, "sql", None):
+            st.code(erro.sql, language="sql")
+            st.warning("↩️ Transação desfeita: nenhum comando do script foi gravado.")
+    elif resultados:
+        total = sum(r.duracao for r in resultados) * 1000
+        afetadas = sum(r.linhas_afetadas or 0 for r in resultados)
+        destino = "somente leitura, nada foi gravado" if somente_leitura else "transação confirmada"
+        st.success(
+            f"✅ {len(resultados)} comando(s), {afetadas} linha(s) afetada(s) em {total:,.1f} ms ({destino})."
+        )
+    if not resultados:
+        return
     
-    tabelas_sql = [
-        # Tabela fabricantes
-        """CREATE TABLE IF NOT EXISTS fabricantes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )""",
-        
-        # Tabela cores_referencia
-        """CREATE TABLE IF NOT EXISTS cores_referencia (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            codigo_hex TEXT,
-            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )""",
-        
-        # Tabela capacidades
-        """CREATE TABLE IF NOT EXISTS capacidades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            capacidade_ml INTEGER NOT NULL,
-            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )""",
-        
-        # Tabela modelos_impressora
-        """CREATE TABLE IF NOT EXISTS modelos_impressora (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            fabricante_id INTEGER,
-            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (fabricante_id) REFERENCES fabricantes(id)
-        )""",
-        
-        # Tabela cartuchos
-        """CREATE TABLE IF NOT EXISTS cartuchos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            modelo_cartucho TEXT NOT NULL,
-            cor_id INTEGER,
-            modelo_impressora_id INTEGER,
-            codigo_referencia TEXT,
-            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (cor_id) REFERENCES cores_referencia(id),
-            FOREIGN KEY (modelo_impressora_id) REFERENCES modelos_impressora(id)
-        )""",
-        
-        # Tabela cartucho_capacidades
-        """CREATE TABLE IF NOT EXISTS cartucho_capacidades (
-            cartucho_id INTEGER,
-            capacidade_id INTEGER,
-            PRIMARY KEY (cartucho_id, capacidade_id),
-            FOREIGN KEY (cartucho_id) REFERENCES cartuchos(id) ON DELETE CASCADE,
-            FOREIGN KEY (capacidade_id) REFERENCES capacidades(id)
-        )"""
-    ]
-    
-    resultados = []
-    for i, sql in enumerate(tabelas_sql):
-        try:
-            executar_sql(sql, show_error=False)
-            nome_tabela = ['fabricantes', 'cores_referencia', 'capacidades', 
-                          'modelos_impressora', 'cartuchos', 'cartucho_capacidades'][i]
-            resultados.append(f"✅ Tabela '{nome_tabela}' verificada/criada")
-        except Exception as e:
-            nome_tabela = ['fabricantes', 'cores_referencia', 'capacidades', 
-                          'modelos_impressora', 'cartuchos', 'cartucho_capacidades'][i]
-            resultados.append(f"❌ Erro na tabela '{nome_tabela}': {str(e)}")
-    
-    return resultados
-
-def inserir_dados_iniciais():
-    """Insere dados iniciais nas tabelas"""
-    dados_iniciais = [
-        # Fabricantes
-        "INSERT OR IGNORE INTO fabricantes (nome) VALUES ('Epson')",
-        "INSERT OR IGNORE INTO fabricantes (nome) VALUES ('HP')",
-        "INSERT OR IGNORE INTO fabricantes (nome) VALUES ('Canon')",
-        "INSERT OR IGNORE INTO fabricantes (nome) VALUES ('Brother')",
-        "INSERT OR IGNORE INTO fabricantes (nome) VALUES ('Lexmark')",
-        "INSERT OR IGNORE INTO fabricantes (nome) VALUES ('Xerox')",
-        
-        # Cores
-        "INSERT OR IGNORE INTO cores_referencia (nome, codigo_hex) VALUES ('Black', '#000000')",
-        "INSERT OR IGNORE INTO cores_referencia (nome, codigo_hex) VALUES ('Cyan', '#00FFFF')",
-        "INSERT OR IGNORE INTO cores_referencia (nome, codigo_hex) VALUES ('Magenta', '#FF00FF')",
-        "INSERT OR IGNORE INTO cores_referencia (nome, codigo_hex) VALUES ('Yellow', '#FFFF00')",
-        "INSERT OR IGNORE INTO cores_referencia (nome, codigo_hex) VALUES ('Light Cyan', '#88FFFF')",
-        "INSERT OR IGNORE INTO cores_referencia (nome, codigo_hex) VALUES ('Light Magenta', '#FF88FF')",
-        "INSERT OR IGNORE INTO cores_referencia (nome, codigo_hex) VALUES ('Gray', '#808080')",
-        "INSERT OR IGNORE INTO cores_referencia (nome, codigo_hex) VALUES ('Light Gray', '#D3D3D3')",
+    st.dataframe(pd.DataFrame([
+        {
+            "#": i,
+            "Comando": " ".join(r.sql.split())[:80],
+            "Tempo (ms)": round(r.duracao * 1000, 2),
+            "Linhas afetadas": r.linhas_afetadas,
+            "Linhas retornadas": len(r.linhas) if r.colunas else None,
+        }
+        for i, r in enumerate(resultados, 1)
+    ]), hide_index=True, use_container_width=True)
+    
+    for i, r in enumerate(resultados, 1):
+        if not r.colunas and not r.plano:
+            continue
+        with st.expander(f"#{i} {' '.join(r.sql.split())[:60]} — {r.duracao * 1000:,.1f} ms",
+                         expanded=bool(r.colunas)):
+            if r.plano:
+                st.code("\n".join(r.plano), language=None)
+            if r.colunas:
+                mostrar_tabela(tabela_das_linhas(r.colunas, r.linhas), use_container_width=True)
+                if r.truncado:
+                    st.warning(f"⚠️ Mostrando as primeiras {len(r.linhas):,} linhas deste comando.")
+
+def executor_protegido(chave, sql, executar, somente_leitura=True, tempo_limite=TEMPO_LIMITE_PADRAO,
+                       linhas_por_bloco=LINHAS_POR_BLOCO, script=False, explicar=False):
+    """Executa SQL do usuário com prazo, teto de linhas e cancelamento e mostra o resultado
+
+    Consultas ficam abertas na sessão para o "carregar mais". Scripts, o
+    EXPLAIN QUERY PLAN e comandos que podem escrever (fora do modo somente
+    leitura) rodam pelo `ExecucaoScript`, numa única transação.
+    """
+    estado_key = f"{chave}_execucao"
+    script_key = f"{chave}_script"
+    erro = None
+    
+    if executar:
+        anterior = st.session_state.pop(estado_key, None)
+        if anterior is not None:
+            anterior.fechar()
+        st.session_state.pop(script_key, None)
         
-        # Capacidades
-        "INSERT OR IGNORE INTO capacidades (capacidade_ml) VALUES (50)",
-        "INSERT OR IGNORE INTO capacidades (capacidade_ml) VALUES (100)",
-        "INSERT OR IGNORE INTO capacidades (capacidade_ml) VALUES (250)",
-        "INSERT OR IGNORE INTO capacidades (capacidade_ml) VALUES (500)",
-        "INSERT OR IGNORE INTO capacidades (capacidade_ml) VALUES (1000)"
-    ]
+        if script or explicar or (not somente_leitura and not e_leitura(sql)):
+            comandos = dividir_comandos(sql) if script else [sql]
+            if not comandos:
+                st.info("Nenhum comando para executar.")
+                return
+            execucao = ExecucaoScript(comandos, tempo_limite, explicar=explicar, max_linhas=linhas_por_bloco)
+            resultados, erro = aguardar_script(chave, execucao, somente_leitura)
+            st.session_state[script_key] = (resultados, erro, somente_leitura)
+        else:
+            try:
+                execucao = ExecucaoProtegida(get_gerenciador().db_path, sql, tempo_limite=tempo_limite)
+            except sqlite3.Error as e:
+                st.error(f"❌ Erro ao abrir o banco em modo somente leitura: {str(e)}")
+                return
+            st.session_state[estado_key] = execucao
+            erro = aguardar_busca(chave, execucao, linhas_por_bloco)
+    
+    if script_key in st.session_state:
+        mostrar_script(*st.session_state[script_key])
+        return
+    
+    execucao = st.session_state.get(estado_key)
+    if execucao is None:
+        return
+    # Clique em "carregar mais" na execução anterior do script
+    if not executar and st.session_state.get(f"{chave}_mais") and not execucao.terminada:
+        erro = aguardar_busca(chave, execucao, linhas_por_bloco)
+    
+    if erro is not None:
+        st.error(f"❌ {str(erro)}")
+    if not execucao.colunas:
+        return
+    
+    # A tabela Arrow vai direto para o st.dataframe, sem passar por pandas
+    resultado = execucao.tabela()
+    linhas = resultado.num_rows
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Linhas", f"{linhas:,}" + ("" if execucao.terminada else "+"))
+    col2.metric("Execução", f"{(execucao.duracao_execucao or 0) * 1000:,.1f} ms")
+    col3.metric("Busca", f"{execucao.duracao_busca * 1000:,.1f} ms")
+    col4.metric(
+        "Memória (Arrow)", f"{resultado.nbytes / 1024:,.1f} KB",
+        help=f"~{resultado.nbytes // max(linhas, 1)} bytes/linha com texto repetido em dicionário; "
+             f"{execucao.memoria_estimada / 1024:,.1f} KB nos blocos buscados"
+    )
+    mostrar_tabela(resultado, use_container_width=True)
     
-    for sql in dados_iniciais:
-        executar_sql(sql, show_error=False)
+    if execucao.truncada:
+        st.warning(f"⚠️ Resultado limitado a {LIMITE_LINHAS:,} linhas; refine a consulta para ver o restante.")
+    elif not execucao.terminada:
+        st.button(f"⬇️ Carregar mais {linhas_por_bloco:,} linhas", key=f"{chave}_mais")
+
+def inicializar():
+    """Aplica as migrações pendentes e insere os dados iniciais; retorna as fases"""
+    return get_repositorio().inicializar()
 
 def testar_conexao():
     """Testa a conexão com o banco de dados"""
     try:
         # Verificar se o arquivo do banco existe
         if os.path.exists(DB_PATH):
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tabelas = cursor.fetchall()
-            conn.close()
+            tabelas = get_repositorio().tabelas()
             
             if tabelas:
                 return True, f"✅ Conexão estabelecida! {len(tabelas)} tabelas encontradas."
@@ -243,6 +414,418 @@ def testar_conexao():
     except Exception as e:
         return False, f"❌ Erro de conexão: {str(e)}"
 
+# ===== ABAS DA PÁGINA DE CADASTROS =====
+# Cada aba é um fragmento: o envio de um formulário reexecuta apenas a aba,
+# não o script inteiro.
+
+def seletor_com_busca(rotulo, tabela, chave):
+    """Seletor que busca as opções no servidor conforme o texto digitado; retorna o id escolhido"""
+    texto = st.text_input(
+        f"Buscar {rotulo.rstrip('*').lower()}", key=f"{chave}_texto", placeholder="Digite parte do nome"
+    )
+    # O texto só chega ao servidor no Enter ou ao sair do campo; buscas repetidas vêm do LRU
+    rotulos = dict(get_cache_sugestoes().sugerir(tabela, texto))
+    return st.selectbox(
+        rotulo, options=list(rotulos), format_func=rotulos.get, key=f"{chave}_id",
+        index=0 if rotulos else None, placeholder="Nenhuma sugestão"
+    )
+
+def seletor_multiplo_com_busca(rotulo, buscar, chave):
+    """Seleção de vários itens, buscados no servidor conforme o texto digitado; retorna os ids escolhidos
+
+    `buscar(texto)` devolve pares (id, rótulo). Os já escolhidos continuam
+    entre as opções quando o texto muda.
+    """
+    texto = st.text_input(
+        f"Buscar {rotulo.rstrip('*').lower()}", key=f"{chave}_texto", placeholder="Digite parte do nome"
+    )
+    escolhidos = st.session_state.get(f"{chave}_ids", [])
+    # Rótulos dos escolhidos ficam na sessão: as sugestões mudam a cada busca
+    anteriores = st.session_state.get(f"{chave}_rotulos", {})
+    rotulos = {i: anteriores[i] for i in escolhidos if i in anteriores}
+    rotulos.update(buscar(texto))
+    st.session_state[f"{chave}_rotulos"] = rotulos
+    return st.multiselect(
+        rotulo, options=list(rotulos), format_func=rotulos.get, key=f"{chave}_ids",
+        placeholder="Escolha entre as sugestões"
+    )
+
+def sugerir_modelos(texto):
+    """Sugestões de modelos de impressora (LRU compartilhado)"""
+    return get_cache_sugestoes().sugerir("modelos", texto)
+
+def sugerir_cartuchos_busca(texto, limite=20):
+    """Sugestões de cartuchos pelo índice de busca textual"""
+    with get_gerenciador().leitura() as conn:
+        return sugerir_cartuchos(conn, texto, limite)
+
+ROTULOS_ORDENACAO = {
+    "modelo_asc": "Modelo (A→Z)",
+    "modelo_desc": "Modelo (Z→A)",
+    "recentes": "Mais recentes",
+    "antigos": "Mais antigos",
+}
+
+TODOS = ("Todos", "Todas")
+
+def valor_filtro(chave):
+    """Valor atual de um seletor de filtro (None para "Todos")"""
+    valor = st.session_state.get(chave)
+    return None if valor in TODOS else valor
+
+def rotulo_com_contagem(contagens, rotulo=str):
+    """format_func que acrescenta a contagem da faceta ao rótulo de cada opção"""
+    def formatar(opcao):
+        if opcao in TODOS or contagens is None:
+            return opcao if opcao in TODOS else rotulo(opcao)
+        return f"{rotulo(opcao)} ({contagens.get(opcao, 0)})"
+    return formatar
+
+def _navegar(estado_key, numero, busca):
+    """Callback dos botões de navegação da listagem"""
+    st.session_state[estado_key].update(numero=numero, busca=busca)
+
+def listagem_cartuchos(chave, filtros=None):
+    """Lista os cartuchos página a página, buscando e enviando só a página visível"""
+    filtros = filtros or {}
+    estado_key = f"{chave}_navegacao"
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        ordenacao = st.selectbox(
+            "Ordenar por", options=list(ROTULOS_ORDENACAO),
+            format_func=ROTULOS_ORDENACAO.get, key=f"{chave}_ordenacao"
+        )
+    with col2:
+        tamanho = st.selectbox("Linhas por página", options=TAMANHOS_PAGINA, index=1, key=f"{chave}_tamanho")
+    
+    try:
+        total = get_cache_contagens().contar(**filtros)
+    except sqlite3.Error as e:
+        st.error(f"❌ Erro SQL: {str(e)}")
+        return
+    if not total:
+        st.info("Nenhum cartucho encontrado.")
+        return
+    paginas = math.ceil(total / tamanho)
+    
+    # Mudou a ordenação, o tamanho ou o filtro: volta para a primeira página
+    contexto = (ordenacao, tamanho, tuple(sorted(filtros.items())))
+    navegacao = st.session_state.get(estado_key)
+    if navegacao is None or navegacao["contexto"] != contexto:
+        navegacao = st.session_state[estado_key] = {"contexto": contexto, "numero": 1, "busca": {}}
+    
+    busca = navegacao["busca"]
+    # A última página tem só o resto das linhas, para alinhar com a numeração
+    tamanho_busca = total - (paginas - 1) * tamanho if busca.get("do_fim") else tamanho
+    with get_gerenciador().leitura() as conn:
+        pagina = buscar_pagina(conn, ordenacao, tamanho_busca, **busca, **filtros)
+    if not pagina.linhas and busca:
+        # Cursor de uma página que deixou de existir (linhas excluídas)
+        navegacao.update(numero=1, busca={})
+        with get_gerenciador().leitura() as conn:
+            pagina = buscar_pagina(conn, ordenacao, tamanho, **filtros)
+    numero = min(navegacao["numero"], paginas)
+    
+    mostrar_tabela(tabela_das_linhas(pagina.colunas, pagina.linhas), use_container_width=True, hide_index=True)
+    
+    col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
+    with col1:
+        st.button("⏮️ Primeira", key=f"{chave}_primeira", disabled=not pagina.tem_anterior,
+                  on_click=_navegar, args=(estado_key, 1, {}), use_container_width=True)
+    with col2:
+        st.button("◀️ Anterior", key=f"{chave}_anterior", disabled=not pagina.tem_anterior,
+                  on_click=_navegar, args=(estado_key, max(numero - 1, 1), {"antes": pagina.primeira}),
+                  use_container_width=True)
+    with col3:
+        st.caption(f"Página {numero} de {paginas} · {total} cartuchos")
+    with col4:
+        st.button("Próxima ▶️", key=f"{chave}_proxima", disabled=not pagina.tem_proxima,
+                  on_click=_navegar, args=(estado_key, min(numero + 1, paginas), {"apos": pagina.ultima}),
+                  use_container_width=True)
+    with col5:
+        st.button("Última ⏭️", key=f"{chave}_ultima", disabled=not pagina.tem_proxima,
+                  on_click=_navegar, args=(estado_key, paginas, {"do_fim": True}), use_container_width=True)
+
+
+@st.fragment
+def aba_fabricantes():
+    """Renderiza a aba de fabricantes"""
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.markdown("<h3 class='sub-header'>Cadastrar Novo</h3>", unsafe_allow_html=True)
+        
+        with st.form("form_fabricante", clear_on_submit=True):
+            nome_fabricante = st.text_input("Nome do Fabricante", placeholder="Ex: Epson, HP, Canon")
+            submitted = st.form_submit_button("✅ Cadastrar Fabricante")
+            
+            if submitted and nome_fabricante:
+                cadastrar(f"✅ Fabricante '{nome_fabricante}' cadastrado com sucesso!",
+                          cadastrar_fabricante, nome_fabricante)
+    
+    with col2:
+        st.markdown("<h3 class='sub-header'>Fabricantes Cadastrados</h3>", unsafe_allow_html=True)
+        mostrar_lista(ler(get_repositorio().fabricantes), Fabricante, "Nenhum fabricante cadastrado.")
+
+
+@st.fragment
+def aba_modelos():
+    """Renderiza a aba de modelos de impressora"""
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.markdown("<h3 class='sub-header'>Cadastrar Novo Modelo</h3>", unsafe_allow_html=True)
+        
+        # Fabricantes para o select (cache de referências)
+        fabricantes = obter_referencias().fabricantes
+        
+        if fabricantes:
+            fabricantes_opcoes = fabricantes.id_por_nome
+            
+            with st.form("form_modelo_impressora", clear_on_submit=True):
+                nome_modelo = st.text_input("Nome do Modelo", placeholder="Ex: Epson Tx410")
+                fabricante_selecionado = st.selectbox("Fabricante", options=list(fabricantes_opcoes.keys()))
+                submitted = st.form_submit_button("✅ Cadastrar Modelo")
+                
+                if submitted and nome_modelo:
+                    cadastrar(f"✅ Modelo '{nome_modelo}' cadastrado com sucesso!",
+                              cadastrar_modelo, nome_modelo, fabricantes_opcoes[fabricante_selecionado])
+        else:
+            st.warning("Cadastre primeiro um fabricante na aba 'Fabricantes'")
+    
+    with col2:
+        st.markdown("<h3 class='sub-header'>Modelos Cadastrados</h3>", unsafe_allow_html=True)
+        mostrar_lista(ler(get_repositorio().modelos), ModeloImpressora, "Nenhum modelo de impressora cadastrado.")
+
+
+@st.fragment
+def aba_cores():
+    """Renderiza a aba de cores"""
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.markdown("<h3 class='sub-header'>Cadastrar Nova Cor</h3>", unsafe_allow_html=True)
+        
+        with st.form("form_cor", clear_on_submit=True):
+            nome_cor = st.text_input("Nome da Cor", placeholder="Ex: Black, Cyan, Magenta")
+            codigo_hex = st.color_picker("Código Hex", "#000000")
+            submitted = st.form_submit_button("✅ Cadastrar Cor")
+            
+            if submitted and nome_cor:
+                cadastrar(f"✅ Cor '{nome_cor}' cadastrada com sucesso!", cadastrar_cor, nome_cor, codigo_hex)
+    
+    with col2:
+        st.markdown("<h3 class='sub-header'>Cores Cadastradas</h3>", unsafe_allow_html=True)
+        mostrar_lista(ler(get_repositorio().cores), Cor, "Nenhuma cor cadastrada.")
+
+
+@st.fragment
+def aba_capacidades():
+    """Renderiza a aba de capacidades"""
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.markdown("<h3 class='sub-header'>Cadastrar Nova Capacidade</h3>", unsafe_allow_html=True)
+        
+        with st.form("form_capacidade", clear_on_submit=True):
+            capacidade_ml = st.number_input("Capacidade (ml)", min_value=1, step=1, value=100)
+            submitted = st.form_submit_button("✅ Cadastrar Capacidade")
+            
+            if submitted:
+                cadastrar(f"✅ Capacidade de {capacidade_ml}ml cadastrada com sucesso!",
+                          cadastrar_capacidade, capacidade_ml)
+    
+    with col2:
+        st.markdown("<h3 class='sub-header'>Capacidades Cadastradas</h3>", unsafe_allow_html=True)
+        mostrar_lista(ler(get_repositorio().capacidades), Capacidade, "Nenhuma capacidade cadastrada.")
+
+
+@st.fragment
+def aba_cartuchos():
+    """Renderiza a aba de cartuchos"""
+    st.markdown("<h3 class='sub-header'>Cadastrar Novo Cartucho</h3>", unsafe_allow_html=True)
+    
+    # Dados para os selects vêm do cache de referências
+    referencias = obter_referencias()
+    
+    if referencias.cores and referencias.modelos and referencias.capacidades:
+        # Rótulo exibido ("100ml") -> capacidade em ml
+        capacidades_por_rotulo = {f"{ml}ml": ml for ml in referencias.capacidades.nomes}
+        
+        # Seletores com busca ficam fora do formulário: cada texto digitado
+        # reexecuta a aba e traz só as sugestões (com ids) do servidor
+        col1, col2 = st.columns(2)
+        with col1:
+            modelo_ids = seletor_multiplo_com_busca("Impressoras Compatíveis*", sugerir_modelos, "cartucho_modelos")
+        with col2:
+            cor_id = seletor_com_busca("Cor*", "cores", "cartucho_cor")
+        
+        with st.form("form_cartucho", clear_on_submit=True):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                modelo_cartucho = st.text_input("Modelo do Cartucho*", placeholder="Ex: 1073120 Black")
+            
+            with col2:
+                codigo_referencia = st.text_input("Código de Referência", placeholder="Ex: 1073120")
+            
+            # Seleção múltipla de capacidades
+            capacidades_opcoes = list(capacidades_por_rotulo.keys())
+            capacidades_selecionadas = st.multiselect(
+                "Capacidades Disponíveis",
+                options=capacidades_opcoes,
+                default=capacidades_opcoes[:2] if len(capacidades_opcoes) > 1 else capacidades_opcoes
+            )
+            
+            submitted = st.form_submit_button("✅ Cadastrar Cartucho")
+            
+            if submitted and modelo_cartucho and (not modelo_ids or cor_id is None):
+                st.warning("⚠️ Escolha ao menos uma impressora e uma cor entre as sugestões.")
+            elif submitted and modelo_cartucho:
+                # IDs vêm dos seletores; cartucho e capacidades numa única transação
+                try:
+                    resultado = cadastrar_cartucho(
+                        get_gerenciador(),
+                        referencias,
+                        modelo_cartucho,
+                        cor=cor_id,
+                        modelos_impressora=modelo_ids,
+                        capacidades=[capacidades_por_rotulo[cap_str] for cap_str in capacidades_selecionadas],
+                        codigo_referencia=codigo_referencia
+                    )
+                    
+                    st.success(f"✅ Cartucho '{modelo_cartucho}' cadastrado com sucesso!")
+                    
+                    # Mostrar SQL executado
+                    sql_executado = "<br>".join(
+                        formatar_comando(sql, params) for sql, params in resultado.comandos
+                    )
+                    st.markdown(f"""
+                    <div class='sql-box'>
+                        SQL Executado:<br>
+                        {sql_executado}
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                except Exception as e:
+                    st.error(f"❌ Erro: {str(e)}")
+    else:
+        st.warning("⚠️ Cadastre primeiro Cores, Modelos e Capacidades nas abas anteriores.")
+    
+    st.divider()
+    # Listar cartuchos existentes
+    st.markdown("<h3 class='sub-header'>Cartuchos Cadastrados</h3>", unsafe_allow_html=True)
+    listagem_cartuchos("cartuchos")
+
+
+@st.fragment
+def aba_compatibilidade():
+    """Renderiza a aba de compatibilidade cartucho ↔ impressora"""
+    st.markdown("<h3 class='sub-header'>Editar Compatibilidade em Massa</h3>", unsafe_allow_html=True)
+    st.caption("Cada cartucho escolhido passa a servir (ou deixa de servir) em todas as impressoras escolhidas.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        todos_da_busca = st.checkbox(
+            "Usar todos os cartuchos que casam com a busca (até 1000)", key="compat_todos_da_busca"
+        )
+        if todos_da_busca:
+            texto = st.text_input("Buscar cartuchos", key="compat_cartuchos_busca", placeholder="Ex: t664 epson")
+            cartucho_ids = [cartucho_id for cartucho_id, _ in sugerir_cartuchos_busca(texto, limite=1000)]
+            st.caption(f"{len(cartucho_ids)} cartucho(s) encontrados")
+        else:
+            cartucho_ids = seletor_multiplo_com_busca("Cartuchos", sugerir_cartuchos_busca, "compat_cartuchos")
+    with col2:
+        modelo_ids = seletor_multiplo_com_busca("Impressoras", sugerir_modelos, "compat_modelos")
+    
+    pares = len(cartucho_ids) * len(modelo_ids)
+    col1, col2 = st.columns(2)
+    with col1:
+        adicionar = st.button(f"➕ Adicionar ({pares} pares)", disabled=not pares, use_container_width=True)
+    with col2:
+        remover = st.button(f"➖ Remover ({pares} pares)", disabled=not pares, use_container_width=True)
+    
+    if adicionar or remover:
+        try:
+            alteradas = editar_compatibilidade(get_gerenciador(), cartucho_ids, modelo_ids, remover=remover)
+        except sqlite3.Error as e:
+            st.error(f"❌ Erro SQL: {str(e)}")
+        else:
+            st.success(f"✅ {alteradas} compatibilidade(s) {'removida(s)' if remover else 'adicionada(s)'}.")
+    
+    st.divider()
+    # Sentido inverso: quais cartuchos servem numa impressora
+    st.markdown("<h3 class='sub-header'>Cartuchos por Impressora</h3>", unsafe_allow_html=True)
+    modelo_id = seletor_com_busca("Impressora", "modelos", "compat_consulta")
+    if modelo_id is not None:
+        listagem_cartuchos("compat", {"modelo_impressora_id": modelo_id})
+
+
+@st.fragment
+def aba_importar():
+    """Renderiza a aba de importação em massa (CSV/XLSX)"""
+    st.markdown("<h3 class='sub-header'>Importar Planilha de Cartuchos</h3>", unsafe_allow_html=True)
+    st.caption(
+        "Colunas: modelo_cartucho, cor, modelo_impressora (obrigatórias; várias separadas "
+        "por ;), fabricante, codigo_referencia, codigo_hex e capacidades (ex: 50;100). "
+        "Linhas do mesmo cartucho (modelo, código e cor) são mescladas. Fabricantes, modelos, "
+        "cores e capacidades inexistentes são criados automaticamente."
+    )
+    
+    arquivo = st.file_uploader("Planilha", type=["csv", "xlsx"])
+    col1, col2 = st.columns(2)
+    with col1:
+        tamanho_lote = st.number_input("Linhas por transação", min_value=100, step=1000, value=TAMANHO_LOTE_PADRAO)
+    with col2:
+        dry_run = st.checkbox("Apenas validar (dry-run)", value=False)
+    
+    if arquivo is not None and st.button("📥 Importar", type="primary"):
+        barra = st.progress(0.0, text="Importando...")
+        formato = formato_do_arquivo(arquivo.name)
+        
+        def mostrar_progresso(resumo):
+            # Para CSV a posição no arquivo indica a fração já lida
+            fracao = min(arquivo.tell() / arquivo.size, 1.0) if formato == "csv" and arquivo.size else 0.0
+            barra.progress(fracao, text=f"{resumo.linhas_lidas:,} linhas | {resumo.linhas_por_segundo:,.0f} linhas/s")
+        
+        try:
+            resumo = importar_catalogo(
+                get_gerenciador(), arquivo, formato,
+                tamanho_lote=int(tamanho_lote), dry_run=dry_run, progresso=mostrar_progresso
+            )
+        except (ErroImportacao, sqlite3.Error) as e:
+            barra.empty()
+            st.error(f"❌ Erro na importação: {str(e)}")
+            return
+        
+        barra.progress(1.0, text=f"{resumo.linhas_lidas:,} linhas em {resumo.duracao:.2f}s")
+        prefixo = "🔎 Validação (nada foi gravado): " if resumo.dry_run else "✅ "
+        st.success(
+            f"{prefixo}{resumo.cartuchos_inseridos:,} cartuchos, {resumo.compatibilidades_inseridas:,} "
+            f"compatibilidades e {resumo.associacoes_inseridas:,} capacidades em {resumo.duracao:.2f}s "
+            f"({resumo.linhas_por_segundo:,.0f} linhas/s)"
+        )
+        if resumo.linhas_mescladas:
+            st.info(f"{resumo.linhas_mescladas:,} linha(s) mescladas em cartuchos já existentes")
+        criados = ", ".join(f"{n} {tipo}" for tipo, n in resumo.criados.items() if n)
+        if criados:
+            st.info(f"Criados automaticamente: {criados}")
+        
+        if resumo.erros:
+            st.warning(f"⚠️ {len(resumo.erros)} linha(s) com erro foram ignoradas.")
+            st.dataframe(
+                pd.DataFrame(resumo.erros[:1000], columns=["linha", "erro"]),
+                use_container_width=True, hide_index=True
+            )
+            st.download_button(
+                label="📥 Baixar relatório de erros",
+                data=resumo.relatorio_erros_csv().encode('utf-8'),
+                file_name="erros_importacao.csv",
+                mime="text/csv"
+            )
+
+
 # Menu lateral simplificado
 with st.sidebar:
     st.image("https://cdn-icons-png.flaticon.com/512/3208/3208720.png", width=100)
@@ -257,13 +840,14 @@ with st.sidebar:
     st.divider()
     
     # Menu manual usando radio buttons
-    menu_options = ["📊 Dashboard", "📝 Cadastros", "🔍 Consultas", "⚙️ Configurações", "🗄️ SQL Executor"]
+    menu_options = ["📊 Dashboard", "📝 Cadastros", "🔍 Consultas", "📣 Anúncios", "⚙️ Configurações", "🗄️ SQL Executor"]
     
     # Criar botões de menu manualmente
     selected = st.radio(
         "Menu Principal",
         options=menu_options,
-        label_visibility="collapsed"
+        label_visibility="collapsed",
+        key="menu_principal"
     )
     
     st.divider()
@@ -277,14 +861,15 @@ with st.sidebar:
             st.error(mensagem)
     
     if st.button("🔄 Inicializar Banco", use_container_width=True, type="primary"):
-        with st.spinner("Criando tabelas..."):
-            resultados = criar_tabelas()
-            for resultado in resultados:
-                st.write(resultado)
-        
-        with st.spinner("Inserindo dados iniciais..."):
-            inserir_dados_iniciais()
-            st.success("✅ Dados iniciais inseridos!")
+        with st.spinner("Inicializando banco..."):
+            try:
+                fases = inicializar()
+            except Exception as e:
+                st.error(f"❌ Erro ao inicializar o banco: {str(e)}")
+            else:
+                for fase in fases:
+                    st.write(f"✅ {fase.nome}: {fase.detalhe} ({fase.duracao * 1000:.1f} ms)")
+                st.success(f"✅ Banco pronto em {sum(f.duracao for f in fases) * 1000:.1f} ms")
 
 # ===== PÁGINA: DASHBOARD =====
 if selected == "📊 Dashboard":
@@ -295,341 +880,124 @@ if selected == "📊 Dashboard":
     if not sucesso:
         st.error(mensagem)
     
-    # Estatísticas com SQL direto
-    col1, col2, col3, col4 = st.columns(4)
+    # Tudo numa leitura do resumo mantido por triggers: o custo não cresce com o catálogo
+    painel = ler(get_repositorio().painel, 10)
+    estatisticas = painel.estatisticas if painel else None
+    col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        query = "SELECT COUNT(*) as total FROM fabricantes"
-        result = executar_sql(query, fetch=True)
-        total = result.iloc[0]['total'] if result is not None and not result.empty else 0
-        st.metric("Fabricantes", total)
+        st.metric("Fabricantes", estatisticas.fabricantes if estatisticas else 0)
     
     with col2:
-        query = "SELECT COUNT(*) as total FROM modelos_impressora"
-        result = executar_sql(query, fetch=True)
-        total = result.iloc[0]['total'] if result is not None and not result.empty else 0
-        st.metric("Modelos Impressora", total)
+        st.metric("Modelos Impressora", estatisticas.modelos if estatisticas else 0)
     
     with col3:
-        query = "SELECT COUNT(*) as total FROM cores_referencia"
-        result = executar_sql(query, fetch=True)
-        total = result.iloc[0]['total'] if result is not None and not result.empty else 0
-        st.metric("Cores", total)
+        st.metric("Cores", estatisticas.cores if estatisticas else 0)
     
     with col4:
-        query = "SELECT COUNT(*) as total FROM cartuchos"
-        result = executar_sql(query, fetch=True)
-        total = result.iloc[0]['total'] if result is not None and not result.empty else 0
-        st.metric("Cartuchos", total)
+        st.metric("Cartuchos", estatisticas.cartuchos if estatisticas else 0)
+    
+    with col5:
+        st.metric("Compatibilidades", estatisticas.compatibilidades if estatisticas else 0)
     
     st.divider()
     
+    # Tendência de cadastros: dias sem cadastro entram como zero
+    st.markdown("<h3 class='sub-header'>Cartuchos Cadastrados por Dia</h3>", unsafe_allow_html=True)
+    if painel and painel.por_dia:
+        por_dia = pd.DataFrame(painel.por_dia)
+        por_dia = por_dia.set_index(pd.to_datetime(por_dia['dia']))['quantidade'].asfreq('D', fill_value=0)
+        periodo = st.radio(
+            "Período", options=list(PERIODOS_DASHBOARD), horizontal=True, label_visibility="collapsed",
+            key="dashboard_periodo"
+        )
+        dias = PERIODOS_DASHBOARD[periodo]
+        if dias is not None:
+            por_dia = por_dia[por_dia.index > por_dia.index.max() - pd.Timedelta(days=dias)]
+        st.line_chart(por_dia.rename("cartuchos"))
+        st.caption(f"{int(por_dia.sum()):,} cartucho(s) no período, média de {por_dia.mean():.1f} por dia")
+    else:
+        st.info("Nenhum cartucho cadastrado ainda.")
+    
     # Gráfico de cartuchos por cor
     st.markdown("<h3 class='sub-header'>Cartuchos por Cor</h3>", unsafe_allow_html=True)
     
-    query = """
-        SELECT cr.nome as cor, COUNT(c.id) as quantidade
-        FROM cartuchos c
-        JOIN cores_referencia cr ON c.cor_id = cr.id
-        GROUP BY cr.nome
-        ORDER BY quantidade DESC
-    """
-    cartuchos_por_cor = executar_sql(query, fetch=True)
-    
-    if cartuchos_por_cor is not None and not cartuchos_por_cor.empty:
+    if painel and painel.por_cor:
+        cartuchos_por_cor = pd.DataFrame(painel.por_cor)
         st.bar_chart(cartuchos_por_cor.set_index('cor'))
         with st.expander("📊 Ver Dados Detalhados"):
             st.dataframe(cartuchos_por_cor)
     else:
         st.info("Nenhum cartucho cadastrado ainda.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("<h3 class='sub-header'>Cartuchos por Fabricante</h3>", unsafe_allow_html=True)
+        if painel and painel.por_fabricante:
+            st.bar_chart(pd.DataFrame(painel.por_fabricante).set_index('fabricante'))
+    with col2:
+        st.markdown("<h3 class='sub-header'>Cartuchos por Capacidade</h3>", unsafe_allow_html=True)
+        if painel and painel.por_capacidade:
+            por_capacidade = pd.DataFrame(painel.por_capacidade)
+            por_capacidade['capacidade_ml'] = por_capacidade['capacidade_ml'].map(lambda ml: f"{ml}ml")
+            st.bar_chart(por_capacidade.set_index('capacidade_ml'))
+    
+    st.markdown("<h3 class='sub-header'>Impressoras com Mais Cartuchos</h3>", unsafe_allow_html=True)
+    if painel and painel.por_impressora:
+        st.bar_chart(pd.DataFrame(painel.por_impressora).set_index('modelo_impressora')['quantidade'])
 
 # ===== PÁGINA: CADASTROS =====
 elif selected == "📝 Cadastros":
     st.markdown("<h1 class='main-header'>📝 Cadastro de Itens</h1>", unsafe_allow_html=True)
     
-    # Criar tabs usando st.tabs (nativo do Streamlit)
-    tab_titles = ["🖨️ Fabricantes", "🖨️ Modelos", "🎨 Cores", "📦 Capacidades", "🖨️ Cartuchos"]
-    tabs = st.tabs(tab_titles)
-    
-    # TAB 1: Fabricantes
-    with tabs[0]:
-        col1, col2 = st.columns([1, 2])
-        
-        with col1:
-            st.markdown("<h3 class='sub-header'>Cadastrar Novo</h3>", unsafe_allow_html=True)
-            
-            with st.form("form_fabricante", clear_on_submit=True):
-                nome_fabricante = st.text_input("Nome do Fabricante", placeholder="Ex: Epson, HP, Canon")
-                submitted = st.form_submit_button("✅ Cadastrar Fabricante")
-                
-                if submitted and nome_fabricante:
-                    query = "INSERT INTO fabricantes (nome) VALUES (?)"
-                    resultado = executar_sql(query, params=(nome_fabricante,))
-                    if resultado is not None:
-                        st.success(f"✅ Fabricante '{nome_fabricante}' cadastrado com sucesso!")
-                        st.markdown(f"""
-                        <div class='sql-box'>
-                            SQL Executado:<br>
-                            INSERT INTO fabricantes (nome) VALUES ('{nome_fabricante}')
-                        </div>
-                        """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown("<h3 class='sub-header'>Fabricantes Cadastrados</h3>", unsafe_allow_html=True)
-            query = "SELECT id, nome, strftime('%d/%m/%Y %H:%M', data_criacao) as data_criacao FROM fabricantes ORDER BY nome"
-            fabricantes_df = executar_sql(query, fetch=True)
-            
-            if fabricantes_df is not None and not fabricantes_df.empty:
-                st.dataframe(fabricantes_df, use_container_width=True, hide_index=True)
-            else:
-                st.info("Nenhum fabricante cadastrado.")
-    
-    # TAB 2: Modelos de Impressora
-    with tabs[1]:
-        col1, col2 = st.columns([1, 2])
-        
-        with col1:
-            st.markdown("<h3 class='sub-header'>Cadastrar Novo Modelo</h3>", unsafe_allow_html=True)
-            
-            # Buscar fabricantes para o select
-            query_fabricantes = "SELECT id, nome FROM fabricantes ORDER BY nome"
-            fabricantes_df = executar_sql(query_fabricantes, fetch=True)
-            
-            if fabricantes_df is not None and not fabricantes_df.empty:
-                fabricantes_opcoes = {row['nome']: row['id'] for _, row in fabricantes_df.iterrows()}
-                
-                with st.form("form_modelo_impressora", clear_on_submit=True):
-                    nome_modelo = st.text_input("Nome do Modelo", placeholder="Ex: Epson Tx410")
-                    fabricante_selecionado = st.selectbox("Fabricante", options=list(fabricantes_opcoes.keys()))
-                    submitted = st.form_submit_button("✅ Cadastrar Modelo")
-                    
-                    if submitted and nome_modelo:
-                        fabricante_id = fabricantes_opcoes[fabricante_selecionado]
-                        query = "INSERT INTO modelos_impressora (nome, fabricante_id) VALUES (?, ?)"
-                        if executar_sql(query, params=(nome_modelo, fabricante_id)):
-                            st.success(f"✅ Modelo '{nome_modelo}' cadastrado com sucesso!")
-                            st.markdown(f"""
-                            <div class='sql-box'>
-                                SQL Executado:<br>
-                                INSERT INTO modelos_impressora (nome, fabricante_id) VALUES ('{nome_modelo}', {fabricante_id})
-                            </div>
-                            """, unsafe_allow_html=True)
-            else:
-                st.warning("Cadastre primeiro um fabricante na aba 'Fabricantes'")
-        
-        with col2:
-            st.markdown("<h3 class='sub-header'>Modelos Cadastrados</h3>", unsafe_allow_html=True)
-            query = """
-                SELECT mi.id, mi.nome, f.nome as fabricante, 
-                       strftime('%d/%m/%Y %H:%M', mi.data_criacao) as data_criacao
-                FROM modelos_impressora mi
-                JOIN fabricantes f ON mi.fabricante_id = f.id
-                ORDER BY mi.nome
-            """
-            modelos_df = executar_sql(query, fetch=True)
-            
-            if modelos_df is not None and not modelos_df.empty:
-                st.dataframe(modelos_df, use_container_width=True, hide_index=True)
-            else:
-                st.info("Nenhum modelo de impressora cadastrado.")
-    
-    # TAB 3: Cores
-    with tabs[2]:
-        col1, col2 = st.columns([1, 2])
-        
-        with col1:
-            st.markdown("<h3 class='sub-header'>Cadastrar Nova Cor</h3>", unsafe_allow_html=True)
-            
-            with st.form("form_cor", clear_on_submit=True):
-                nome_cor = st.text_input("Nome da Cor", placeholder="Ex: Black, Cyan, Magenta")
-                codigo_hex = st.color_picker("Código Hex", "#000000")
-                submitted = st.form_submit_button("✅ Cadastrar Cor")
-                
-                if submitted and nome_cor:
-                    query = "INSERT INTO cores_referencia (nome, codigo_hex) VALUES (?, ?)"
-                    if executar_sql(query, params=(nome_cor, codigo_hex)):
-                        st.success(f"✅ Cor '{nome_cor}' cadastrada com sucesso!")
-                        st.markdown(f"""
-                        <div class='sql-box'>
-                            SQL Executado:<br>
-                            INSERT INTO cores_referencia (nome, codigo_hex) VALUES ('{nome_cor}', '{codigo_hex}')
-                        </div>
-                        """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown("<h3 class='sub-header'>Cores Cadastradas</h3>", unsafe_allow_html=True)
-            query = "SELECT id, nome, codigo_hex, strftime('%d/%m/%Y %H:%M', data_criacao) as data_criacao FROM cores_referencia ORDER BY nome"
-            cores_df = executar_sql(query, fetch=True)
-            
-            if cores_df is not None and not cores_df.empty:
-                st.dataframe(cores_df, use_container_width=True, hide_index=True)
-            else:
-                st.info("Nenhuma cor cadastrada.")
-    
-    # TAB 4: Capacidades
-    with tabs[3]:
-        col1, col2 = st.columns([1, 2])
-        
-        with col1:
-            st.markdown("<h3 class='sub-header'>Cadastrar Nova Capacidade</h3>", unsafe_allow_html=True)
-            
-            with st.form("form_capacidade", clear_on_submit=True):
-                capacidade_ml = st.number_input("Capacidade (ml)", min_value=1, step=1, value=100)
-                submitted = st.form_submit_button("✅ Cadastrar Capacidade")
-                
-                if submitted:
-                    query = "INSERT INTO capacidades (capacidade_ml) VALUES (?)"
-                    if executar_sql(query, params=(int(capacidade_ml),)):
-                        st.success(f"✅ Capacidade de {capacidade_ml}ml cadastrada com sucesso!")
-                        st.markdown(f"""
-                        <div class='sql-box'>
-                            SQL Executado:<br>
-                            INSERT INTO capacidades (capacidade_ml) VALUES ({capacidade_ml})
-                        </div>
-                        """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown("<h3 class='sub-header'>Capacidades Cadastradas</h3>", unsafe_allow_html=True)
-            query = "SELECT id, capacidade_ml, strftime('%d/%m/%Y %H:%M', data_criacao) as data_criacao FROM capacidades ORDER BY capacidade_ml"
-            capacidades_df = executar_sql(query, fetch=True)
-            
-            if capacidades_df is not None and not capacidades_df.empty:
-                st.dataframe(capacidades_df, use_container_width=True, hide_index=True)
-            else:
-                st.info("Nenhuma capacidade cadastrada.")
-    
-    # TAB 5: Cartuchos
-    with tabs[4]:
-        st.markdown("<h3 class='sub-header'>Cadastrar Novo Cartucho</h3>", unsafe_allow_html=True)
-        
-        # Carregar dados para selects
-        cores_query = "SELECT id, nome FROM cores_referencia ORDER BY nome"
-        modelos_query = "SELECT id, nome FROM modelos_impressora ORDER BY nome"
-        capacidades_query = "SELECT id, capacidade_ml FROM capacidades ORDER BY capacidade_ml"
-        
-        cores_df = executar_sql(cores_query, fetch=True)
-        modelos_df = executar_sql(modelos_query, fetch=True)
-        capacidades_df = executar_sql(capacidades_query, fetch=True)
-        
-        if (cores_df is not None and not cores_df.empty and 
-            modelos_df is not None and not modelos_df.empty and 
-            capacidades_df is not None and not capacidades_df.empty):
-            
-            with st.form("form_cartucho", clear_on_submit=True):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    modelo_cartucho = st.text_input("Modelo do Cartucho*", placeholder="Ex: 1073120 Black")
-                    codigo_referencia = st.text_input("Código de Referência", placeholder="Ex: 1073120")
-                
-                with col2:
-                    cor_selecionada = st.selectbox("Cor*", options=cores_df['nome'].tolist())
-                    modelo_selecionado = st.selectbox("Modelo de Impressora*", options=modelos_df['nome'].tolist())
-                
-                # Seleção múltipla de capacidades
-                capacidades_opcoes = capacidades_df['capacidade_ml'].astype(str) + "ml"
-                capacidades_selecionadas = st.multiselect(
-                    "Capacidades Disponíveis",
-                    options=capacidades_opcoes.tolist(),
-                    default=capacidades_opcoes.tolist()[:2] if len(capacidades_opcoes) > 1 else capacidades_opcoes.tolist()
-                )
-                
-                submitted = st.form_submit_button("✅ Cadastrar Cartucho")
-                
-                if submitted and modelo_cartucho:
-                    # Obter IDs
-                    cor_id = int(cores_df[cores_df['nome'] == cor_selecionada].iloc[0]['id'])
-                    modelo_id = int(modelos_df[modelos_df['nome'] == modelo_selecionado].iloc[0]['id'])
-                    
-                    # Inserir cartucho
-                    query_cartucho = """
-                        INSERT INTO cartuchos (modelo_cartucho, cor_id, modelo_impressora_id, codigo_referencia)
-                        VALUES (?, ?, ?, ?)
-                    """
-                    
-                    try:
-                        conn = get_connection()
-                        cursor = conn.cursor()
-                        
-                        # Inserir cartucho e obter o ID
-                        cursor.execute(query_cartucho, (modelo_cartucho, cor_id, modelo_id, codigo_referencia))
-                        cartucho_id = cursor.lastrowid
-                        conn.commit()
-                        
-                        # Associar capacidades
-                        for cap_str in capacidades_selecionadas:
-                            capacidade_ml = int(cap_str.replace("ml", ""))
-                            capacidade_id = int(capacidades_df[capacidades_df['capacidade_ml'] == capacidade_ml].iloc[0]['id'])
-                            query_associar = """
-                                INSERT INTO cartucho_capacidades (cartucho_id, capacidade_id)
-                                VALUES (?, ?)
-                            """
-                            cursor.execute(query_associar, (cartucho_id, capacidade_id))
-                        
-                        conn.commit()
-                        cursor.close()
-                        conn.close()
-                        
-                        st.success(f"✅ Cartucho '{modelo_cartucho}' cadastrado com sucesso!")
-                        
-                        # Mostrar SQL executado
-                        sql_executado = f"""
-                            INSERT INTO cartuchos (modelo_cartucho, cor_id, modelo_impressora_id, codigo_referencia)
-                            VALUES ('{modelo_cartucho}', {cor_id}, {modelo_id}, '{codigo_referencia}')
-                        """
-                        
-                        if capacidades_selecionadas:
-                            sql_executado += "\n\nINSERTs em cartucho_capacidades:"
-                            for cap_str in capacidades_selecionadas:
-                                capacidade_ml = int(cap_str.replace("ml", ""))
-                                capacidade_id = int(capacidades_df[capacidades_df['capacidade_ml'] == capacidade_ml].iloc[0]['id'])
-                                sql_executado += f"\nINSERT INTO cartucho_capacidades VALUES ({cartucho_id}, {capacidade_id})"
-                        
-                        st.markdown(f"""
-                        <div class='sql-box'>
-                            SQL Executado:<br>
-                            {sql_executado}
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                    except Exception as e:
-                        st.error(f"❌ Erro: {str(e)}")
-        else:
-            st.warning("⚠️ Cadastre primeiro Cores, Modelos e Capacidades nas abas anteriores.")
-        
-        st.divider()
-        # Listar cartuchos existentes
-        st.markdown("<h3 class='sub-header'>Cartuchos Cadastrados</h3>", unsafe_allow_html=True)
-        query = """
-            SELECT 
-                c.id,
-                c.modelo_cartucho,
-                c.codigo_referencia,
-                cr.nome as cor,
-                mi.nome as modelo_impressora,
-                f.nome as fabricante,
-                GROUP_CONCAT(cap.capacidade_ml) as capacidades,
-                strftime('%d/%m/%Y %H:%M', c.data_criacao) as data_criacao
-            FROM cartuchos c
-            JOIN cores_referencia cr ON c.cor_id = cr.id
-            JOIN modelos_impressora mi ON c.modelo_impressora_id = mi.id
-            JOIN fabricantes f ON mi.fabricante_id = f.id
-            LEFT JOIN cartucho_capacidades cc ON c.id = cc.cartucho_id
-            LEFT JOIN capacidades cap ON cc.capacidade_id = cap.id
-            GROUP BY c.id
-            ORDER BY c.modelo_cartucho
-        """
-        cartuchos_df = executar_sql(query, fetch=True)
-        
-        if cartuchos_df is not None and not cartuchos_df.empty:
-            st.dataframe(cartuchos_df, use_container_width=True, hide_index=True)
-        else:
-            st.info("Nenhum cartucho cadastrado.")
+    # Apenas a aba selecionada é renderizada, então as abas ocultas não
+    # executam suas consultas
+    abas_cadastro = {
+        "🖨️ Fabricantes": aba_fabricantes,
+        "🖨️ Modelos": aba_modelos,
+        "🎨 Cores": aba_cores,
+        "📦 Capacidades": aba_capacidades,
+        "🖨️ Cartuchos": aba_cartuchos,
+        "🔗 Compatibilidade": aba_compatibilidade,
+        "📥 Importar": aba_importar,
+    }
+    aba_selecionada = st.radio(
+        "Aba",
+        options=list(abas_cadastro.keys()),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="aba_cadastro"
+    )
+    abas_cadastro[aba_selecionada]()
 
 # ===== PÁGINA: CONSULTAS =====
 elif selected == "🔍 Consultas":
     st.markdown("<h1 class='main-header'>🔍 Consulta de Cartuchos</h1>", unsafe_allow_html=True)
     
+    # Busca textual (índice FTS5): cada palavra é um prefixo, resultado por relevância
+    st.markdown("<h3 class='sub-header'>Busca Rápida</h3>", unsafe_allow_html=True)
+    texto_busca = st.text_input(
+        "Buscar por modelo, código, impressora, fabricante ou cor",
+        placeholder="Ex: t664 epson l355",
+        key="texto_busca"
+    )
+    if texto_busca:
+        inicio = time.perf_counter()
+        try:
+            with get_gerenciador().leitura() as conn:
+                colunas, linhas = buscar_cartuchos(conn, texto_busca)
+        except sqlite3.Error as e:
+            st.error(f"❌ Erro na busca: {str(e)}")
+        else:
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            if linhas:
+                mostrar_tabela(tabela_das_linhas(colunas, linhas), use_container_width=True, hide_index=True)
+                st.caption(f"{len(linhas)} resultado(s) mais relevantes em {duracao_ms:.1f} ms")
+            else:
+                st.info("Nenhum cartucho encontrado.")
+    
+    st.divider()
+    
     # Consulta SQL personalizada
     with st.expander("🔧 Consulta SQL Personalizada"):
         sql_query = st.text_area(
@@ -638,98 +1006,225 @@ elif selected == "🔍 Consultas":
             height=100
         )
         
-        if st.button("Executar Consulta", key="executar_sql"):
-            result = executar_sql(sql_query, fetch=True)
-            if result is not None:
-                st.dataframe(result, use_container_width=True)
-                st.success(f"✅ {len(result)} registros encontrados")
+        # Sempre em modo somente leitura, com prazo e teto de linhas
+        executor_protegido(
+            "consulta_personalizada", sql_query, st.button("Executar Consulta", key="executar_sql")
+        )
     
     st.divider()
     
     # Filtros avançados
     st.markdown("<h3 class='sub-header'>Filtros Avançados</h3>", unsafe_allow_html=True)
     
+    referencias = obter_referencias()
+    
+    # Facetas: contagem de cada opção sob os demais filtros, lidos do estado
+    # atual dos seletores (em cache por estado dos filtros)
+    filtros_atuais = {
+        "cor": valor_filtro("filtro_cor"),
+        "fabricante": valor_filtro("filtro_fabricante"),
+        "capacidade_ml": valor_filtro("filtro_capacidade"),
+        "modelo_impressora_id":
+            st.session_state.get("filtro_modelo_id") if st.session_state.get("filtro_por_impressora") else None,
+    }
+    try:
+        facetas = get_cache_contagens().facetas(**filtros_atuais)
+    except sqlite3.Error as e:
+        st.error(f"❌ Erro SQL: {str(e)}")
+        facetas = Facetas(None, None, None)
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        cores_df = executar_sql("SELECT nome FROM cores_referencia ORDER BY nome", fetch=True)
-        cores_lista = ["Todos"] + cores_df['nome'].tolist() if cores_df is not None else ["Todos"]
-        filtro_cor = st.selectbox("Filtrar por Cor", options=cores_lista)
+        filtro_cor = st.selectbox(
+            "Filtrar por Cor", options=["Todos"] + referencias.cores.nomes, key="filtro_cor",
+            format_func=rotulo_com_contagem(facetas.cor)
+        )
     
     with col2:
-        fabricantes_df = executar_sql("SELECT nome FROM fabricantes ORDER BY nome", fetch=True)
-        fabricantes_lista = ["Todos"] + fabricantes_df['nome'].tolist() if fabricantes_df is not None else ["Todos"]
-        filtro_fabricante = st.selectbox("Filtrar por Fabricante", options=fabricantes_lista)
+        filtro_fabricante = st.selectbox(
+            "Filtrar por Fabricante", options=["Todos"] + referencias.fabricantes.nomes, key="filtro_fabricante",
+            format_func=rotulo_com_contagem(facetas.fabricante)
+        )
     
     with col3:
-        capacidades_df = executar_sql("SELECT capacidade_ml FROM capacidades ORDER BY capacidade_ml", fetch=True)
-        if capacidades_df is not None:
-            capacidades_lista = ["Todas"] + (capacidades_df['capacidade_ml'].astype(str) + "ml").tolist()
-        else:
-            capacidades_lista = ["Todas"]
-        filtro_capacidade = st.selectbox("Filtrar por Capacidade", options=capacidades_lista)
+        filtro_capacidade = st.selectbox(
+            "Filtrar por Capacidade", options=["Todas"] + list(referencias.capacidades.nomes),
+            key="filtro_capacidade",
+            format_func=rotulo_com_contagem(facetas.capacidade_ml, lambda ml: f"{ml}ml")
+        )
+    
+    # Impressora compatível: seletor com busca, só quando pedido
+    filtro_modelo_id = None
+    if st.checkbox("Filtrar por Impressora", key="filtro_por_impressora"):
+        filtro_modelo_id = seletor_com_busca("Impressora", "modelos", "filtro_modelo")
     
-    # Construir query dinamicamente
+    # Filtros ficam na sessão para sobreviver à navegação entre páginas
     if st.button("🔍 Aplicar Filtros", type="primary"):
-        query_base = """
-            SELECT 
-                c.modelo_cartucho,
-                c.codigo_referencia,
-                cr.nome as cor,
-                mi.nome as modelo_impressora,
-                f.nome as fabricante,
-                GROUP_CONCAT(cap.capacidade_ml) as capacidades
-            FROM cartuchos c
-            JOIN cores_referencia cr ON c.cor_id = cr.id
-            JOIN modelos_impressora mi ON c.modelo_impressora_id = mi.id
-            JOIN fabricantes f ON mi.fabricante_id = f.id
-            LEFT JOIN cartucho_capacidades cc ON c.id = cc.cartucho_id
-            LEFT JOIN capacidades cap ON cc.capacidade_id = cap.id
-            WHERE 1=1
-        """
-        
-        params = []
-        
-        if filtro_cor != "Todos":
-            query_base += " AND cr.nome = ?"
-            params.append(filtro_cor)
-        
-        if filtro_fabricante != "Todos":
-            query_base += " AND f.nome = ?"
-            params.append(filtro_fabricante)
-        
-        if filtro_capacidade != "Todas":
-            capacidade_ml = int(filtro_capacidade.replace("ml", ""))
-            query_base += " AND cap.capacidade_ml = ?"
-            params.append(capacidade_ml)
-        
-        query_base += " GROUP BY c.id ORDER BY c.modelo_cartucho"
-        
-        # Mostrar query gerada
+        st.session_state["filtros_consulta"] = {
+            "cor": filtro_cor if filtro_cor != "Todos" else None,
+            "fabricante": filtro_fabricante if filtro_fabricante != "Todos" else None,
+            "capacidade_ml": filtro_capacidade if filtro_capacidade != "Todas" else None,
+            "modelo_impressora_id": filtro_modelo_id,
+        }
+    
+    filtros = st.session_state.get("filtros_consulta")
+    if filtros is not None:
+        # Mostrar query gerada (primeira página)
+        query_pagina, params = montar_pagina_cartuchos(**filtros)
         st.markdown(f"""
         <div class='sql-box'>
             SQL Gerado:<br>
-            {query_base}<br>
+            {query_pagina}<br>
             Parâmetros: {params}
         </div>
         """, unsafe_allow_html=True)
         
-        resultados = executar_sql(query_base, params=params if params else None, fetch=True)
+        st.markdown("### 📋 Resultados da Pesquisa")
+        listagem_cartuchos("consulta", filtros)
         
-        if resultados is not None and not resultados.empty:
-            st.markdown(f"### 📋 Resultados da Pesquisa ({len(resultados)} encontrados)")
-            st.dataframe(resultados, use_container_width=True, hide_index=True)
-            
-            # Opção de exportação
-            csv = resultados.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Exportar para CSV",
-                data=csv,
-                file_name="cartuchos_filtrados.csv",
-                mime="text/csv"
+        # Exportação: o resultado completo só é lido quando pedido
+        if st.button("📥 Preparar exportação CSV"):
+            query_base, params = montar_filtro_cartuchos(**filtros)
+            resultados = executar_sql(query_base, params=params if params else None, fetch=True)
+            if resultados is not None:
+                st.download_button(
+                    label=f"📥 Baixar CSV ({len(resultados)} cartuchos)",
+                    data=resultados.to_csv(index=False).encode('utf-8'),
+                    file_name="cartuchos_filtrados.csv",
+                    mime="text/csv"
+                )
+
+# ===== PÁGINA: ANÚNCIOS =====
+elif selected == "📣 Anúncios":
+    st.markdown("<h1 class='main-header'>📣 Geração de Anúncios</h1>", unsafe_allow_html=True)
+    st.caption(
+        "Um anúncio por cartucho × capacidade × impressora compatível. Use `{campo}` nos modelos: "
+        "`{modelo_cartucho}`, `{codigo_referencia}`, `{cor}`, `{codigo_hex}`, `{capacidade_ml}`, "
+        "`{modelo_impressora}`, `{modelo_impressora_id}`, `{fabricante}`, `{cartucho_id}`."
+    )
+
+    with st.expander("✏️ Modelos", expanded=True):
+        modelos = {
+            "titulo": st.text_input("Título", value=MODELOS_PADRAO["titulo"]),
+            "descricao": st.text_area("Descrição", value=MODELOS_PADRAO["descricao"]),
+            "sku": st.text_input("SKU", value=MODELOS_PADRAO["sku"]),
+        }
+        atributos = st.data_editor(
+            pd.DataFrame({
+                "atributo": list(MODELOS_PADRAO["atributos"]),
+                "modelo": list(MODELOS_PADRAO["atributos"].values()),
+            }),
+            num_rows="dynamic",
+            hide_index=True,
+            use_container_width=True,
+            key="modelos_atributos"
+        )
+        modelos["atributos"] = {
+            linha.atributo.strip(): linha.modelo or ""
+            for linha in atributos.itertuples()
+            if isinstance(linha.atributo, str) and linha.atributo.strip()
+        }
+
+    try:
+        previa = previa_anuncios(get_gerenciador(), modelos)
+    except ErroModelo as e:
+        st.error(f"❌ {str(e)}")
+        previa = None
+    except Exception as e:
+        st.error(f"❌ Erro ao montar a prévia: {str(e)}")
+        previa = None
+
+    if previa is not None:
+        st.metric("Anúncios a gerar", f"{contar_anuncios(get_gerenciador()):,}")
+        st.markdown("### 👀 Prévia")
+        st.dataframe(previa, use_container_width=True, hide_index=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            formato_anuncios = st.selectbox(
+                "Formato",
+                options=["csv.gz", "jsonl.gz", "csv", "jsonl"],
+            )
+        with col2:
+            processos = st.number_input(
+                "Processos em paralelo", min_value=1, max_value=os.cpu_count() or 1,
+                value=os.cpu_count() or 1
             )
+
+        if st.button("📣 Gerar Anúncios", type="primary", use_container_width=True):
+            total_previsto = contar_anuncios(get_gerenciador())
+            barra = st.progress(0.0, text="Gerando anúncios...")
+
+            def mostrar_progresso(total):
+                fracao = min(total / total_previsto, 1.0) if total_previsto else 1.0
+                barra.progress(fracao, text=f"{total:,} de {total_previsto:,} anúncios")
+
+            destino = os.path.join(
+                ANUNCIOS_DIR, f"anuncios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato_anuncios}"
+            )
+            try:
+                resultado = exportar_anuncios(
+                    get_gerenciador(), destino, modelos, processos=int(processos), progresso=mostrar_progresso
+                )
+            except Exception as e:
+                st.error(f"❌ Erro ao gerar anúncios: {str(e)}")
+            else:
+                barra.progress(1.0, text=f"{resultado.total:,} anúncios em {resultado.duracao:.2f}s")
+                st.success(
+                    f"✅ {resultado.total:,} anúncios gerados em {resultado.duracao:.2f}s "
+                    f"({resultado.tamanho_bytes / 1024:.1f} KB): `{resultado.caminho}`"
+                )
+                with open(resultado.caminho, "rb") as arquivo_anuncios:
+                    st.download_button(
+                        label=f"📥 Download {os.path.basename(resultado.caminho)}",
+                        data=arquivo_anuncios,
+                        file_name=os.path.basename(resultado.caminho),
+                        mime="application/gzip" if resultado.caminho.endswith(".gz") else "text/plain"
+                    )
+
+    # Feed incremental: só o que mudou desde a última exportação
+    st.divider()
+    st.markdown("### 📤 Feed Incremental")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        nome_feed = st.text_input("Nome do feed", value=FEED_PADRAO, key="nome_feed").strip() or FEED_PADRAO
+    with col2:
+        formato_feed = st.selectbox("Formato do feed", options=["xml.gz", "csv.gz", "jsonl.gz", "xml", "csv", "jsonl"])
+    with col3:
+        feed_completo = st.checkbox("Catálogo completo", help="Ignora a marca e exporta todos os cartuchos")
+
+    # Preenchidas depois do botão, para já refletirem uma exportação feita agora
+    col_pendentes, col_ultima = st.columns(2)
+
+    if st.button("📤 Exportar Feed", use_container_width=True):
+        destino = os.path.join(
+            ANUNCIOS_DIR, f"feed_{nome_feed}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato_feed}"
+        )
+        try:
+            with st.spinner("Exportando feed..."):
+                resultado = exportar_feed(get_gerenciador(), destino, nome_feed, completo=feed_completo)
+        except Exception as e:
+            st.error(f"❌ Erro ao exportar feed: {str(e)}")
         else:
-            st.warning("Nenhum cartucho encontrado com os filtros selecionados.")
+            st.success(
+                f"✅ {resultado.novos:,} novos, {resultado.alterados:,} alterados e {resultado.excluidos:,} "
+                f"excluídos em {resultado.duracao:.2f}s ({resultado.tamanho_bytes / 1024:.1f} KB): `{resultado.caminho}`"
+            )
+            with open(resultado.caminho, "rb") as arquivo_feed:
+                st.download_button(
+                    label=f"📥 Download {os.path.basename(resultado.caminho)}",
+                    data=arquivo_feed,
+                    file_name=os.path.basename(resultado.caminho),
+                    mime="application/gzip" if resultado.caminho.endswith(".gz") else "text/plain",
+                    key="download_feed"
+                )
+
+    with get_gerenciador().leitura() as conn:
+        marca = marca_feed(conn, nome_feed)
+        pendentes = contar_pendentes(conn, nome_feed)
+    col_pendentes.metric("Cartuchos alterados desde a última exportação", f"{pendentes:,}")
+    col_ultima.metric("Última exportação", marca.data_exportacao or "nunca")
 
 # ===== PÁGINA: SQL EXECUTOR =====
 elif selected == "🗄️ SQL Executor":
@@ -761,36 +1256,38 @@ elif selected == "🗄️ SQL Executor":
             ["SELECT", "INSERT", "UPDATE", "DELETE", "CREATE", "DROP", "ALTER", "TRUNCATE"]
         )
     
+    # Proteções: prazo por busca, linhas por bloco e conexão somente leitura
     col1, col2, col3 = st.columns(3)
+    with col1:
+        somente_leitura = st.checkbox(
+            "🔒 Somente leitura (mode=ro)", value=True,
+            help="Abre o banco em mode=ro: o SQLite recusa qualquer escrita"
+        )
+    with col2:
+        tempo_limite = st.number_input(
+            "Tempo limite (s)", min_value=0.5, max_value=300.0, value=TEMPO_LIMITE_PADRAO, step=0.5
+        )
+    with col3:
+        linhas_por_bloco = st.number_input(
+            "Linhas por bloco", min_value=100, max_value=50_000, value=LINHAS_POR_BLOCO, step=500
+        )
     
+    col1, col2 = st.columns(2)
     with col1:
-        if st.button("🚀 Executar SQL", type="primary"):
-            if sql_code.strip():
-                with st.spinner("Executando..."):
-                    try:
-                        # Verificar se é SELECT ou outro comando
-                        if sql_code.strip().upper().startswith('SELECT'):
-                            result = executar_sql(sql_code, fetch=True)
-                            if result is not None:
-                                st.success(f"✅ Comando executado! {len(result)} registros retornados.")
-                                st.dataframe(result, use_container_width=True)
-                        else:
-                            # Para INSERT, UPDATE, DELETE, etc.
-                            resultado = executar_sql(sql_code)
-                            if resultado is not None:
-                                st.success(f"✅ Comando executado com sucesso! {resultado} linha(s) afetada(s).")
-                                st.rerun()
-                        
-                        # Mostrar o SQL executado
-                        st.markdown(f"""
-                        <div class='sql-box'>
-                            SQL Executado:<br>
-                            {sql_code}
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                    except Exception as e:
-                        st.error(f"❌ Erro: {str(e)}")
+        modo_script = st.checkbox(
+            "📜 Modo script", key="sql_executor_modo_script",
+            help="Vários comandos separados por ';', numa única transação: se um falhar, nada é gravado"
+        )
+    with col2:
+        explicar = st.checkbox(
+            "🔍 EXPLAIN QUERY PLAN", key="sql_executor_explicar",
+            help="Mostra o plano de cada comando junto com o resultado"
+        )
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        executar = st.button("🚀 Executar SQL", type="primary")
     
     with col2:
         if st.button("📋 Exemplos SQL"):
@@ -804,7 +1301,8 @@ elif selected == "🗄️ SQL Executor":
                     """SELECT c.modelo_cartucho, cr.nome as cor, f.nome as fabricante
                        FROM cartuchos c
                        JOIN cores_referencia cr ON c.cor_id = cr.id
-                       JOIN modelos_impressora mi ON c.modelo_impressora_id = mi.id
+                       JOIN cartucho_impressoras ci ON ci.cartucho_id = c.id
+                       JOIN modelos_impressora mi ON ci.modelo_impressora_id = mi.id
                        JOIN fabricantes f ON mi.fabricante_id = f.id
                        LIMIT 10;"""
                 ],
@@ -821,44 +1319,55 @@ elif selected == "🗄️ SQL Executor":
     
     with col3:
         if st.button("🔄 Limpar"):
+            execucao_anterior = st.session_state.pop("sql_executor_execucao", None)
+            if execucao_anterior is not None:
+                execucao_anterior.fechar()
+            st.session_state.pop("sql_executor_script", None)
             st.rerun()
     
+    if sql_code.strip():
+        executor_protegido(
+            "sql_executor", sql_code, executar, somente_leitura=somente_leitura,
+            tempo_limite=float(tempo_limite), linhas_por_bloco=int(linhas_por_bloco),
+            script=modo_script, explicar=explicar
+        )
+        if executar:
+            # Mostrar o SQL executado
+            st.markdown(f"""
+            <div class='sql-box'>
+                SQL Executado:<br>
+                {sql_code}
+            </div>
+            """, unsafe_allow_html=True)
+    
     st.divider()
     
     # Estrutura do banco
     st.markdown("<h3 class='sub-header'>📋 Estrutura do Banco</h3>", unsafe_allow_html=True)
     
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Listar tabelas
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-        tabelas = cursor.fetchall()
+        # Listar tabelas (sem as tabelas internas do FTS5) e estrutura de cada uma
+        repositorio = get_repositorio()
+        tabelas = repositorio.tabelas()
+        estruturas = {tabela: repositorio.colunas(tabela) for tabela in tabelas}
         
         if tabelas:
-            for (tabela,) in tabelas:
+            for tabela in tabelas:
                 with st.expander(f"📁 {tabela}"):
-                    # Obter estrutura da tabela
-                    cursor.execute(f"PRAGMA table_info({tabela})")
-                    colunas_info = cursor.fetchall()
-                    
-                    # Converter para DataFrame
-                    colunas_df = pd.DataFrame(colunas_info, columns=['cid', 'name', 'type', 'notnull', 'dflt_value', 'pk'])
-                    st.dataframe(colunas_df[['name', 'type', 'notnull', 'pk']].rename(
-                        columns={'name': 'Coluna', 'type': 'Tipo', 'notnull': 'Obrigatório', 'pk': 'Chave Primária'}
+                    # Estrutura da tabela
+                    colunas_df = pd.DataFrame(estruturas[tabela])
+                    st.dataframe(colunas_df[['nome', 'tipo', 'obrigatorio', 'chave_primaria']].rename(
+                        columns={'nome': 'Coluna', 'tipo': 'Tipo', 'obrigatorio': 'Obrigatório',
+                                 'chave_primaria': 'Chave Primária'}
                     ), hide_index=True)
                     
                     # Mostrar dados de exemplo
                     dados_exemplo = executar_sql(f"SELECT * FROM {tabela} LIMIT 5", fetch=True)
                     if dados_exemplo is not None and not dados_exemplo.empty:
                         st.write(f"**Dados de exemplo (5 primeiros registros):**")
-                        st.dataframe(dados_exemplo, hide_index=True)
+                        mostrar_tabela(dados_exemplo, hide_index=True)
         else:
             st.info("Nenhuma tabela encontrada no banco de dados.")
-        
-        cursor.close()
-        conn.close()
     except Exception as e:
         st.error(f"❌ Erro ao listar estrutura: {str(e)}")
 
@@ -895,36 +1404,124 @@ elif selected == "⚙️ Configurações":
     # Estatísticas
     st.markdown("### 📊 Estatísticas do Banco")
     
-    # Query para estatísticas detalhadas
-    estatisticas_query = """
-        SELECT 
-            (SELECT COUNT(*) FROM fabricantes) as fabricantes,
-            (SELECT COUNT(*) FROM modelos_impressora) as modelos,
-            (SELECT COUNT(*) FROM cores_referencia) as cores,
-            (SELECT COUNT(*) FROM capacidades) as capacidades,
-            (SELECT COUNT(*) FROM cartuchos) as cartuchos,
-            (SELECT COUNT(*) FROM cartucho_capacidades) as associacoes
-    """
-    
-    estatisticas = executar_sql(estatisticas_query, fetch=True)
+    estatisticas = ler(get_repositorio().estatisticas)
     
     if estatisticas is not None:
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Fabricantes", estatisticas.iloc[0]['fabricantes'])
-            st.metric("Modelos", estatisticas.iloc[0]['modelos'])
+            st.metric("Fabricantes", estatisticas.fabricantes)
+            st.metric("Modelos", estatisticas.modelos)
         
         with col2:
-            st.metric("Cores", estatisticas.iloc[0]['cores'])
-            st.metric("Capacidades", estatisticas.iloc[0]['capacidades'])
+            st.metric("Cores", estatisticas.cores)
+            st.metric("Capacidades", estatisticas.capacidades)
         
         with col3:
-            st.metric("Cartuchos", estatisticas.iloc[0]['cartuchos'])
-            st.metric("Associações", estatisticas.iloc[0]['associacoes'])
+            st.metric("Cartuchos", estatisticas.cartuchos)
+            st.metric("Associações", estatisticas.associacoes)
+            st.metric("Compatibilidades", estatisticas.compatibilidades)
     else:
         st.warning("Não foi possível obter estatísticas do banco.")
     
+    # Estado do pool de conexões compartilhado
+    st.markdown("#### 🔌 Pool de Conexões")
+    pool = get_gerenciador().estatisticas()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Conexões Abertas", pool['conexoes_abertas'])
+    col2.metric("Leitores em Uso", f"{pool['leitores_em_uso']}/{pool['max_leitores']}")
+    col3.metric("Taxa de Acerto", f"{pool['taxa_acerto']:.1%}")
+    col4.metric("Checkouts", pool['checkouts'])
+
+    # Fila de escrita: pedidos das sessões gravados em lotes pela thread do escritor
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Fila de Escrita", f"{pool['fila_escrita']}/{pool['max_fila']}")
+    col2.metric("Lotes Gravados", pool['lotes_escrita'])
+    col3.metric("Pedidos por Lote", f"{pool['media_lote']:.1f}", help=f"Maior lote: {pool['maior_lote']}")
+    col4.metric("Fila Cheia", pool['filas_cheias'], help="Vezes em que uma sessão esperou por espaço na fila")
+    st.caption(
+        f"Esperas por leitor livre: {pool['esperas']} · esperas pelo escritor: {pool['esperas_escrita']} "
+        f"({pool['espera_escrita_ms']:.0f} ms no total)"
+    )
+    
+    # Tempo das chamadas a executar_sql, agrupadas pela impressão digital do SQL
+    st.markdown("#### ⏱️ Performance")
+    instrumentacao = get_instrumentacao()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        instrumentacao.limiar_ms = st.number_input(
+            "Limiar de consulta lenta (ms)", min_value=1, step=50, value=int(instrumentacao.limiar_ms)
+        )
+    with col2:
+        st.metric("Consultas lentas", instrumentacao.lentas)
+    with col3:
+        if st.button("🧹 Zerar estatísticas", use_container_width=True):
+            instrumentacao.limpar()
+        if os.path.exists(instrumentacao.caminho_log):
+            with open(instrumentacao.caminho_log, "rb") as f:
+                st.download_button(
+                    "📥 Log de consultas lentas", data=f.read(), file_name="consultas_lentas.log",
+                    mime="text/plain", use_container_width=True
+                )
+    
+    estatisticas_consultas = instrumentacao.resumo(limite=20)
+    if estatisticas_consultas:
+        st.dataframe(
+            pd.DataFrame(
+                [(e.impressao, e.formato_params, e.chamadas, e.total_ms, e.media_ms, e.p50_ms, e.p95_ms,
+                  e.p99_ms, e.maximo_ms, e.linhas, e.erros, ", ".join(e.paginas))
+                 for e in estatisticas_consultas],
+                columns=["Consulta", "Parâmetros", "Chamadas", "Total (ms)", "Média (ms)", "p50 (ms)",
+                         "p95 (ms)", "p99 (ms)", "Máx (ms)", "Linhas", "Erros", "Páginas"]
+            ).round(2),
+            use_container_width=True,
+            hide_index=True
+        )
+        # Plano das que mais somam tempo, com os parâmetros da última chamada
+        with get_gerenciador().leitura() as conn:
+            planos_lentas = [plano_consulta(conn, e.sql, e.params or ()) for e in estatisticas_consultas[:5]]
+        for e, plano in zip(estatisticas_consultas, planos_lentas):
+            varreduras = varreduras_completas(plano)
+            marcador = f"⚠️ leitura completa de {', '.join(varreduras)}" if varreduras else "✅ usa índices"
+            with st.expander(f"{e.total_ms:,.1f} ms em {e.chamadas} chamada(s) — {marcador}"):
+                st.code(e.sql.strip(), language="sql")
+                st.code("\n".join(plano), language="text")
+                if e.ultimo_erro:
+                    st.error(f"Último erro: {e.ultimo_erro}")
+    else:
+        st.info("Nenhuma consulta registrada ainda.")
+    
+    # Versão do esquema e planos de execução das consultas do app
+    with st.expander("🧬 Esquema e Índices"):
+        with get_gerenciador().leitura() as conn:
+            versao = versao_atual(conn)
+            planos = planos_consultas(conn)
+        st.write(f"**Versão do esquema:** {versao} (`PRAGMA user_version`)")
+        st.dataframe(
+            pd.DataFrame(
+                [(m.versao, m.descricao, "✅" if m.versao <= versao else "⏳") for m in MIGRACOES],
+                columns=["Versão", "Migração", "Aplicada"]
+            ),
+            hide_index=True
+        )
+        
+        relatorio = get_gerenciador().relatorio_inicializacao
+        comparar = relatorio is not None and relatorio.planos_depois is not None
+        if comparar:
+            st.caption(f"Migrado da versão {relatorio.versao_inicial} para {relatorio.versao_final} nesta execução.")
+        
+        for nome, plano in planos.items():
+            varreduras = varreduras_completas(plano)
+            marcador = f"⚠️ leitura completa de {', '.join(varreduras)}" if varreduras else "✅ usa índices"
+            st.markdown(f"**{nome}** — {marcador}")
+            antes = relatorio.planos_antes.get(nome) if comparar else None
+            if antes and not antes[0].startswith("ERRO"):
+                col1, col2 = st.columns(2)
+                col1.code("\n".join(antes), language="text")
+                col2.code("\n".join(plano), language="text")
+            else:
+                st.code("\n".join(plano), language="text")
+    
     st.divider()
     
     # Backup de dados
@@ -933,58 +1530,37 @@ elif selected == "⚙️ Configurações":
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("📤 Gerar Backup SQL", use_container_width=True):
-            # Gerar script SQL de backup
-            backup_sql = f"-- Backup do Sistema de Cartuchos\n-- Banco: {DB_PATH}\n-- Data: {pd.Timestamp.now().strftime('%d/%m/%Y %H:%M:%S')}\n\n"
-            
+        formato_backup = st.radio(
+            "Formato do backup",
+            options=[FORMATO_SQL_GZ, FORMATO_BINARIO],
+            format_func=lambda f: "Dump SQL compactado (.sql.gz)" if f == FORMATO_SQL_GZ else "Snapshot binário (.db)",
+            horizontal=True
+        )
+        if st.button("📤 Gerar Backup", use_container_width=True):
             try:
-                conn = get_connection()
-                cursor = conn.cursor()
+                with st.spinner("Gerando backup..."):
+                    resultado = gerar_backup(get_gerenciador(), BACKUP_DIR, formato_backup)
                 
-                # Listar tabelas
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-                tabelas = cursor.fetchall()
-                
-                for (tabela,) in tabelas:
-                    # Dados da tabela
-                    dados = executar_sql(f"SELECT * FROM {tabela}", fetch=True)
-                    if dados is not None and not dados.empty:
-                        backup_sql += f"\n-- Dados da tabela: {tabela}\n"
-                        
-                        # Gerar INSERTs
-                        for _, row in dados.iterrows():
-                            colunas = ', '.join(row.index)
-                            valores = []
-                            for v in row.values:
-                                if pd.isna(v):  # Tratar valores NaN
-                                    valores.append('NULL')
-                                elif isinstance(v, str):
-                                    # Escapar aspas simples
-                                    v_escaped = v.replace("'", "''")
-                                    valores.append(f"'{v_escaped}'")
-                                elif isinstance(v, (int, float)):
-                                    valores.append(str(v))
-                                elif v is None:
-                                    valores.append('NULL')
-                                else:
-                                    valores.append(f"'{str(v)}'")
-                            
-                            valores_str = ', '.join(valores)
-                            backup_sql += f"INSERT INTO {tabela} ({colunas}) VALUES ({valores_str});\n"
-                
-                cursor.close()
-                conn.close()
+                st.success(
+                    f"✅ Backup gerado em {resultado.duracao:.2f}s "
+                    f"({resultado.tamanho_bytes / 1024:.1f} KB): `{resultado.caminho}`"
+                )
                 
                 # Mostrar e permitir download
-                st.download_button(
-                    label="📥 Download Backup.sql",
-                    data=backup_sql,
-                    file_name=f"backup_cartuchos_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.sql",
-                    mime="text/plain"
-                )
+                with open(resultado.caminho, "rb") as arquivo_backup:
+                    st.download_button(
+                        label=f"📥 Download {os.path.basename(resultado.caminho)}",
+                        data=arquivo_backup,
+                        file_name=os.path.basename(resultado.caminho),
+                        mime="application/gzip" if resultado.formato == FORMATO_SQL_GZ else "application/octet-stream"
+                    )
                 
-                with st.expander("📝 Visualizar Backup"):
-                    st.code(backup_sql, language="sql")
+                if resultado.formato == FORMATO_SQL_GZ:
+                    with st.expander("📝 Visualizar Backup"):
+                        previa, truncado = previa_backup(resultado.caminho)
+                        st.code(previa, language="sql")
+                        if truncado:
+                            st.caption("Prévia limitada ao início do arquivo.")
                 
             except Exception as e:
                 st.error(f"❌ Erro ao gerar backup: {str(e)}")
@@ -996,21 +1572,75 @@ elif selected == "⚙️ Configurações":
             
             if confirmar and st.button("✅ Confirmar Exclusão", type="primary"):
                 try:
-                    # Fechar conexões
-                    conn = get_connection()
-                    conn.close()
+                    # Fechar conexões do pool antes de remover os arquivos
+                    get_gerenciador().fechar()
                     
-                    # Remover arquivo do banco
+                    # Remover arquivo do banco (e os arquivos auxiliares do WAL)
                     if os.path.exists(DB_PATH):
                         os.remove(DB_PATH)
+                        for sufixo in ("-wal", "-shm"):
+                            if os.path.exists(DB_PATH + sufixo):
+                                os.remove(DB_PATH + sufixo)
                         st.success("✅ Banco de dados excluído com sucesso!")
                         st.rerun()
                 except Exception as e:
                     st.error(f"❌ Erro ao excluir banco: {str(e)}")
     
+    # Restauração de backup
+    st.markdown("### ♻️ Restaurar Backup")
+    
+    origem_restauracao = st.radio(
+        "Origem",
+        options=["Enviar arquivo", "Backup existente"],
+        horizontal=True,
+        key="origem_restauracao"
+    )
+    if origem_restauracao == "Enviar arquivo":
+        arquivo_restauracao = st.file_uploader(
+            "Arquivo de backup (.sql, .sql.gz ou .db)", type=["sql", "gz", "db"]
+        )
+        backup_existente = None
+    else:
+        arquivo_restauracao = None
+        backups = sorted(os.listdir(BACKUP_DIR), reverse=True) if os.path.isdir(BACKUP_DIR) else []
+        backup_existente = st.selectbox("Backup", options=backups) if backups else None
+        if not backups:
+            st.info("Nenhum backup encontrado em `" + BACKUP_DIR + "`.")
+    
+    confirmar_restauracao = st.checkbox("Confirmo que os dados atuais serão substituídos pelo backup")
+    if (arquivo_restauracao is not None or backup_existente) and confirmar_restauracao:
+        if st.button("♻️ Restaurar", type="primary"):
+            caminho_temporario = None
+            try:
+                if arquivo_restauracao is not None:
+                    # O upload vai para um arquivo temporário (snapshots precisam de um caminho)
+                    with tempfile.NamedTemporaryFile(delete=False, suffix=".backup") as temporario:
+                        shutil.copyfileobj(arquivo_restauracao, temporario)
+                        caminho_temporario = temporario.name
+                    caminho = caminho_temporario
+                else:
+                    caminho = os.path.join(BACKUP_DIR, backup_existente)
+                
+                with st.spinner("Restaurando..."):
+                    resultado = restaurar_backup(get_gerenciador(), caminho)
+                
+                st.success(f"✅ Backup restaurado em {resultado.duracao:.2f}s ({resultado.formato})")
+                st.dataframe(
+                    pd.DataFrame(list(resultado.linhas_por_tabela.items()), columns=["tabela", "linhas"]),
+                    hide_index=True
+                )
+                for aviso in resultado.avisos:
+                    st.warning(f"⚠️ {aviso}")
+            except ErroRestauracao as e:
+                st.error(f"❌ Backup não restaurado: {str(e)}")
+            finally:
+                if caminho_temporario and os.path.exists(caminho_temporario):
+                    os.remove(caminho_temporario)
+    
     # Limpar cache
     st.divider()
     if st.button("🗑️ Limpar Cache da Aplicação"):
+        get_gerenciador().fechar()
         st.cache_resource.clear()
         st.success("✅ Cache limpo!")
         st.rerun()
@@ -0,0 +1,85 @@
+"""Fixtures: banco novo já migrado e banco/backup no formato do app original"""
+import sqlite3
+
+import pytest
+
+from getanuncio.conexao import GerenciadorConexoes
+from getanuncio.migracoes import MIGRACOES, inserir_dados_iniciais, migrar
+
+# Cartuchos do app original: uma linha por impressora, com a impressora na
+# própria tabela (modelo, cor_id, modelo_impressora_id, codigo_referencia)
+CARTUCHOS_LEGADOS = [
+    ("T664", 1, 1, "T6641"),
+    ("T664", 3, 2, "T6641"),  # mesmo cartucho, outra impressora e a cor repetida
+    ("T664", 2, 1, "T6642"),
+    ("664XL", 1, 3, None),    # excluído depois, deixando a capacidade para trás
+    ("T544", 1, 4, "T5441"),  # aponta para um modelo excluído
+]
+
+
+@pytest.fixture
+def gerenciador(tmp_path):
+    """Banco novo, migrado e com os dados iniciais"""
+    g = GerenciadorConexoes(str(tmp_path / "cartuchos.db"), ao_abrir_escritor=migrar)
+    with g.escrita() as conn:
+        inserir_dados_iniciais(conn)
+    yield g
+    g.fechar()
+
+
+@pytest.fixture
+def banco_legado(tmp_path):
+    """Caminho de um banco criado pelo app original, com as sujeiras que ele deixava
+
+    "Inicializar Banco" clicado duas vezes duplicava fabricantes, cores e
+    capacidades, e as exclusões rodavam com as chaves estrangeiras desligadas.
+    """
+    caminho = str(tmp_path / "legado.db")
+    conn = sqlite3.connect(caminho)
+    conn.executescript(MIGRACOES[0].sql)
+    for _ in range(2):
+        conn.executemany("INSERT OR IGNORE INTO fabricantes (nome) VALUES (?)", [("Epson",), ("HP",)])
+        conn.executemany("INSERT OR IGNORE INTO cores_referencia (nome, codigo_hex) VALUES (?, ?)",
+                         [("Black", "#000000"), ("Cyan", "#00FFFF")])
+        conn.executemany("INSERT OR IGNORE INTO capacidades (capacidade_ml) VALUES (?)", [(50,), (100,)])
+    conn.executemany("INSERT INTO modelos_impressora (nome, fabricante_id) VALUES (?, ?)",
+                     [("L355", 1), ("L365", 3), ("DeskJet 2774", 2), ("L120", 1)])
+    conn.executemany("INSERT INTO cartuchos (modelo_cartucho, cor_id, modelo_impressora_id, codigo_referencia) "
+                     "VALUES (?, ?, ?, ?)", CARTUCHOS_LEGADOS)
+    conn.executemany("INSERT INTO cartucho_capacidades VALUES (?, ?)",
+                     [(1, 1), (2, 3), (2, 2), (3, 1), (4, 4), (5, 1)])
+    conn.execute("DELETE FROM modelos_impressora WHERE nome = 'L120'")
+    conn.execute("DELETE FROM cartuchos WHERE modelo_cartucho = '664XL'")
+    conn.commit()
+    conn.close()
+    return caminho
+
+
+@pytest.fixture
+def backup_legado(banco_legado, tmp_path):
+    """Backup do banco legado como o botão "Gerar Backup SQL" gerava: só INSERTs, sem versão"""
+    conn = sqlite3.connect(banco_legado)
+    partes = ["-- Backup do Sistema de Cartuchos\n-- Banco: cartuchos.db\n-- Data: 01/03/2024 10:00:00\n\n"]
+    for (tabela,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall():
+        cursor = conn.execute(f"SELECT * FROM {tabela}")
+        colunas = [d[0] for d in cursor.description]
+        linhas = cursor.fetchall()
+        if not linhas:
+            continue
+        # O app passava pelo pandas: colunas inteiras com NULL viravam float
+        com_nulo = {i for i in range(len(colunas)) if any(linha[i] is None for linha in linhas)}
+        partes.append(f"\n-- Dados da tabela: {tabela}\n")
+        for linha in linhas:
+            valores = []
+            for i, v in enumerate(linha):
+                if v is None:
+                    valores.append("NULL")
+                elif isinstance(v, str):
+                    valores.append("'%s'" % v.replace("'", "''"))
+                else:
+                    valores.append(str(float(v)) if i in com_nulo else str(v))
+            partes.append(f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join(valores)});\n")
+    conn.close()
+    caminho = tmp_path / "backup_cartuchos_20240301_100000.sql"
+    caminho.write_text("".join(partes), encoding="utf-8")
+    return str(caminho)
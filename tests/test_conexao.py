@@ -0,0 +1,31 @@
+import sqlite3
+import threading
+
+import pytest
+
+
+def test_fila_de_escrita_desfaz_so_o_pedido_que_falhou(gerenciador):
+    # Enquanto a escrita está ocupada os pedidos se acumulam e vão num só lote
+    liberar = threading.Event()
+    bloqueio = gerenciador.enfileirar(lambda conn: liberar.wait(5))
+    futuros = [gerenciador.executar_escrita("INSERT INTO fabricantes (nome) VALUES (?)", (nome,))
+               for nome in ("Fabricante A", "Fabricante A", "Fabricante B")]
+    liberar.set()
+    bloqueio.result(timeout=5)
+
+    assert futuros[0].result(timeout=5).rowcount == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        futuros[1].result(timeout=5)
+    assert futuros[2].result(timeout=5).rowcount == 1
+    with gerenciador.leitura() as conn:
+        nomes = [n for (n,) in conn.execute("SELECT nome FROM fabricantes WHERE nome LIKE 'Fabricante %'")]
+    assert sorted(nomes) == ["Fabricante A", "Fabricante B"]
+
+
+def test_fechar_grava_a_fila_e_encerra_a_thread(gerenciador):
+    futuro = gerenciador.executar_escrita("INSERT INTO fabricantes (nome) VALUES ('Fabricante C')")
+    gerenciador.fechar()
+    assert futuro.result(timeout=0).rowcount == 1
+    assert not any(t.name == "escritor-sqlite" and t.is_alive() for t in threading.enumerate())
+    # Continua utilizável depois de fechado
+    assert gerenciador.executar_escrita("DELETE FROM fabricantes WHERE nome = 'Fabricante C'").result(5).rowcount == 1
@@ -0,0 +1,99 @@
+import io
+
+from getanuncio.importacao import importar_catalogo
+from getanuncio.migracoes import reconstruir_derivados
+
+CABECALHO = "cartucho;codigo;cor;impressora;fabricante;capacidade\n"
+
+
+def importar(gerenciador, linhas, **opcoes):
+    arquivo = io.BytesIO((CABECALHO + "".join(f"{linha}\n" for linha in linhas)).encode("utf-8"))
+    return importar_catalogo(gerenciador, arquivo, "csv", **opcoes)
+
+
+def impressoras(conn, codigo):
+    return [nome for (nome,) in conn.execute(
+        "SELECT mi.nome FROM cartuchos c JOIN cartucho_impressoras ci ON ci.cartucho_id = c.id "
+        "JOIN modelos_impressora mi ON mi.id = ci.modelo_impressora_id "
+        "WHERE c.codigo_referencia = ? ORDER BY mi.nome", (codigo,))]
+
+
+def seq_alteracao(conn, codigo):
+    return conn.execute("SELECT a.seq FROM alteracoes_cartuchos a JOIN cartuchos c ON c.id = a.cartucho_id "
+                        "WHERE c.codigo_referencia = ?", (codigo,)).fetchone()[0]
+
+
+def test_importa_e_funde_linhas_do_mesmo_cartucho(gerenciador):
+    resumo = importar(gerenciador, [
+        "T664;T6641;Black;L355 | L365;Epson;70",
+        "T664;T6641;Black;L375;Epson;70",
+        "GI-190;GI-190BK;Black;G3110;Canon;135",
+    ], tamanho_lote=2)
+    assert resumo.erros == []
+    assert (resumo.cartuchos_inseridos, resumo.linhas_mescladas) == (2, 1)
+    assert (resumo.compatibilidades_inseridas, resumo.associacoes_inseridas) == (4, 2)
+    with gerenciador.leitura() as conn:
+        assert impressoras(conn, "T6641") == ["L355", "L365", "L375"]
+        assert impressoras(conn, "GI-190BK") == ["G3110"]
+
+
+def test_carga_em_lote_mantem_busca_e_alteracoes(gerenciador):
+    importar(gerenciador, [
+        "T664;T6641;Black;L355;Epson;70",
+        "GI-190;GI-190BK;Black;G3110;Canon;135",
+    ])
+    with gerenciador.leitura() as conn:
+        antes = {codigo: seq_alteracao(conn, codigo) for codigo in ("T6641", "GI-190BK")}
+
+    # Só o T664 ganha impressora: só ele muda no registro e na busca
+    resumo = importar(gerenciador, [
+        "T664;T6641;Black;L395;Epson;70",
+        "GI-190;GI-190BK;Black;G3110;Canon;135",
+        "T544;T5441;Black;L3150;Epson;65",
+    ])
+    assert (resumo.cartuchos_inseridos, resumo.compatibilidades_inseridas) == (1, 2)
+    with gerenciador.leitura() as conn:
+        assert seq_alteracao(conn, "T6641") > antes["T6641"]
+        assert seq_alteracao(conn, "GI-190BK") == antes["GI-190BK"]
+        assert conn.execute("SELECT COUNT(*) FROM carga_em_lote").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM cartuchos WHERE data_atualizacao IS NULL").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM alteracoes_cartuchos").fetchone()[0] == 3
+        # O índice de busca tem o mesmo documento que os triggers gravariam
+        indexados = conn.execute(
+            "SELECT rowid, modelo_cartucho, codigo_referencia, modelo_impressora, fabricante, cor "
+            "FROM busca_cartuchos ORDER BY rowid").fetchall()
+        assert indexados == conn.execute("SELECT * FROM documentos_busca ORDER BY id").fetchall()
+
+
+def test_erros_por_linha_e_dry_run(gerenciador):
+    with gerenciador.leitura() as conn:
+        antes = conn.execute("SELECT COUNT(*) FROM cartuchos").fetchone()[0]
+    resumo = importar(gerenciador, [
+        "T664;T6641;Black;L355;Epson;70",
+        "T664;T6642;;L355;Epson;70",
+        "T664;T6643;Cyan;L355;Epson;setenta",
+        "T664;T6644;Magenta;Impressora Nova;;70",
+    ], dry_run=True)
+    assert resumo.cartuchos_inseridos == 1
+    assert [numero for numero, _ in resumo.erros] == [3, 4, 5]
+    with gerenciador.leitura() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM cartuchos").fetchone()[0] == antes
+
+
+def test_carga_em_lote_mantem_o_resumo_do_dashboard(gerenciador):
+    importar(gerenciador, [
+        "T664;T6641;Black;L355 | L365;Epson;70",
+        "GI-190;GI-190BK;Black;G3110;Canon;135",
+    ])
+    # O T664 ganha uma impressora de outro fabricante e outra da Epson
+    resumo = importar(gerenciador, [
+        "T664;T6641;Black;L395 | G3110;Epson;70 | 100",
+        "T544;T5441;Cyan;L3150;Epson;65",
+    ], tamanho_lote=1)
+    assert resumo.erros == []
+    with gerenciador.leitura() as conn:
+        mantido = conn.execute("SELECT * FROM estatisticas_catalogo ORDER BY 1, 2").fetchall()
+    with gerenciador.escrita() as conn:
+        reconstruir_derivados(conn)
+        recontado = conn.execute("SELECT * FROM estatisticas_catalogo ORDER BY 1, 2").fetchall()
+    assert mantido == recontado
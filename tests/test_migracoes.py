@@ -0,0 +1,62 @@
+import sqlite3
+
+from getanuncio.busca import buscar_cartuchos
+from getanuncio.conexao import GerenciadorConexoes
+from getanuncio.migracoes import VERSAO_ESQUEMA, inserir_dados_iniciais, migrar, versao_atual
+
+
+def compatibilidade(conn):
+    """{(modelo, código): ([impressoras], [capacidades em ml])}"""
+    resultado = {}
+    for id_, modelo, codigo in conn.execute("SELECT id, modelo_cartucho, codigo_referencia FROM cartuchos"):
+        impressoras = [nome for (nome,) in conn.execute(
+            "SELECT mi.nome FROM cartucho_impressoras ci JOIN modelos_impressora mi "
+            "ON ci.modelo_impressora_id = mi.id WHERE ci.cartucho_id = ? ORDER BY mi.nome", (id_,))]
+        capacidades = [ml for (ml,) in conn.execute(
+            "SELECT c.capacidade_ml FROM cartucho_capacidades cc JOIN capacidades c "
+            "ON cc.capacidade_id = c.id WHERE cc.cartucho_id = ? ORDER BY c.capacidade_ml", (id_,))]
+        resultado[(modelo, codigo)] = (impressoras, capacidades)
+    return resultado
+
+
+def test_migra_banco_do_app_original(banco_legado):
+    gerenciador = GerenciadorConexoes(banco_legado, ao_abrir_escritor=migrar)
+    try:
+        with gerenciador.leitura() as conn:
+            assert versao_atual(conn) == VERSAO_ESQUEMA
+            assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+            assert [n for (n,) in conn.execute("SELECT nome FROM fabricantes ORDER BY id")] == ["Epson", "HP"]
+            assert [n for (n,) in conn.execute("SELECT nome FROM cores_referencia ORDER BY id")] == ["Black", "Cyan"]
+            # As duas linhas do T6641 viram um cartucho com as duas impressoras; a
+            # capacidade do cartucho excluído e a impressora excluída não voltam
+            assert compatibilidade(conn) == {
+                ("T664", "T6641"): (["L355", "L365"], [50, 100]),
+                ("T664", "T6642"): (["L355"], [50]),
+                ("T544", "T5441"): ([], [50]),
+            }
+            assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+            _, linhas = buscar_cartuchos(conn, "L365")
+            assert len(linhas) == 1
+    finally:
+        gerenciador.fechar()
+
+
+def test_migrar_de_novo_nao_faz_nada(banco_legado):
+    conn = sqlite3.connect(banco_legado)
+    try:
+        assert migrar(conn).aplicadas
+        relatorio = migrar(conn)
+        assert relatorio.aplicadas == []
+        assert relatorio.versao_inicial == relatorio.versao_final == VERSAO_ESQUEMA
+    finally:
+        conn.close()
+
+
+def test_dados_iniciais_contam_so_as_linhas_inseridas(gerenciador):
+    # A fixture já inseriu os dados iniciais; um cartucho dispara os triggers
+    # de busca e de alterações, que não entram na contagem
+    with gerenciador.escrita() as conn:
+        assert inserir_dados_iniciais(conn) == 0
+        dados = {"cartuchos": [{"modelo_cartucho": "T664", "codigo_referencia": "T6641", "cor_id": 1}]}
+        assert inserir_dados_iniciais(conn, dados) == 1
+        assert inserir_dados_iniciais(conn, dados) == 0
@@ -0,0 +1,78 @@
+import pytest
+
+from getanuncio.backup import backup_binario, dump_sql_gzip
+from getanuncio.busca import buscar_cartuchos
+from getanuncio.conexao import GerenciadorConexoes
+from getanuncio.migracoes import VERSAO_ESQUEMA, migrar, versao_atual
+from getanuncio.restauracao import ErroRestauracao, restaurar_backup
+
+TABELAS = (
+    "fabricantes", "modelos_impressora", "cores_referencia", "capacidades", "cartuchos",
+    "cartucho_impressoras", "cartucho_capacidades", "alteracoes_cartuchos", "sqlite_sequence",
+)
+
+
+def conteudo(gerenciador):
+    with gerenciador.leitura() as conn:
+        return {tabela: sorted(conn.execute(f"SELECT * FROM {tabela}").fetchall()) for tabela in TABELAS}
+
+
+@pytest.fixture
+def catalogo(gerenciador):
+    """Banco novo com dois cartuchos cadastrados"""
+    with gerenciador.escrita() as conn:
+        conn.executemany("INSERT INTO cartuchos (modelo_cartucho, cor_id, codigo_referencia) VALUES (?, ?, ?)",
+                         [("T664", 1, "T6641"), ("T664", 2, "T6642")])
+        conn.execute("INSERT INTO cartucho_impressoras SELECT c.id, m.id FROM cartuchos c, "
+                     "(SELECT id FROM modelos_impressora ORDER BY id LIMIT 2) m")
+        conn.execute("INSERT INTO cartucho_capacidades SELECT c.id, min(k.id) FROM cartuchos c, capacidades k "
+                     "GROUP BY c.id")
+    return gerenciador
+
+
+@pytest.mark.parametrize("gerar", [dump_sql_gzip, backup_binario], ids=["sql.gz", "db"])
+def test_restaura_o_backup_gerado(catalogo, tmp_path, gerar):
+    antes = conteudo(catalogo)
+    caminho = str(tmp_path / "backup")
+    gerar(catalogo, caminho)
+
+    with catalogo.escrita() as conn:
+        conn.execute("DELETE FROM cartuchos WHERE codigo_referencia = 'T6641'")
+        conn.execute("INSERT INTO fabricantes (nome) VALUES ('Outro')")
+
+    resultado = restaurar_backup(catalogo, caminho)
+    assert resultado.avisos == []
+    assert conteudo(catalogo) == antes
+    with catalogo.leitura() as conn:
+        assert versao_atual(conn) == VERSAO_ESQUEMA
+        _, linhas = buscar_cartuchos(conn, "T6641")
+        assert len(linhas) == 1
+
+
+def test_restaura_backup_do_app_original(backup_legado, tmp_path):
+    gerenciador = GerenciadorConexoes(str(tmp_path / "novo.db"), ao_abrir_escritor=migrar)
+    try:
+        resultado = restaurar_backup(gerenciador, backup_legado)
+        assert resultado.linhas_por_tabela["cartuchos"] == 4
+        with gerenciador.leitura() as conn:
+            assert versao_atual(conn) == VERSAO_ESQUEMA
+            # As migrações rodam sobre os dados do backup: repetidos fundidos
+            assert conn.execute("SELECT COUNT(*) FROM fabricantes").fetchone()[0] == 2
+            assert conn.execute("SELECT COUNT(*) FROM cartuchos").fetchone()[0] == 3
+            assert conn.execute("SELECT COUNT(*) FROM cartucho_impressoras").fetchone()[0] == 3
+            assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+            sequencias = [nome for (nome,) in conn.execute("SELECT name FROM sqlite_sequence")]
+            assert len(sequencias) == len(set(sequencias))
+            _, linhas = buscar_cartuchos(conn, "L365")
+            assert len(linhas) == 1
+    finally:
+        gerenciador.fechar()
+
+
+def test_backup_invalido_nao_altera_o_banco(catalogo, tmp_path):
+    antes = conteudo(catalogo)
+    caminho = tmp_path / "quebrado.sql"
+    caminho.write_text("PRAGMA user_version=1;\nINSERT INTO fabricantes (nome) VALUES ('X'", encoding="utf-8")
+    with pytest.raises(ErroRestauracao):
+        restaurar_backup(catalogo, str(caminho))
+    assert conteudo(catalogo) == antes